@@ -4,6 +4,8 @@ import sys
 
 import psutil
 
+HEADLESS_ENV = "OSRS_HEADLESS"
+
 
 def argparse_wrapper(func):
     """Wrap a converter function to turn KeyError into ArgumentTypeError."""
@@ -15,11 +17,15 @@ def argparse_wrapper(func):
     return wrapped
 
 
-def script_running_in_cmd_guard():
+def script_running_in_cmd_guard(headless: bool = False):
     """
         Guard clause to try and ensure the script is executed from a real terminal
         (cmd, PowerShell, bash, zsh, etc.), not by double-clicking in a file manager.
+        Bypassed for headless runs (cron, CI, pipelines) with `headless` or the `OSRS_HEADLESS=1` environment variable.
     """
+    if headless or os.environ.get(HEADLESS_ENV, "").lower() in {"1", "true", "yes"}:
+        return
+
     if not sys.stdin.isatty() or not sys.stdout.isatty():
         _exit_with_message(
             "This script must be run from a terminal, not as a background process.")
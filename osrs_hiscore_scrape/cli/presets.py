@@ -2,9 +2,18 @@ import re
 from argparse import ArgumentParser
 
 from osrs_hiscore_scrape.cli.helpers import argparse_wrapper
+from osrs_hiscore_scrape.request.constants import SAFE_REQUESTS_PER_SECOND
 from osrs_hiscore_scrape.request.dto import HSFilterEntry
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryInfoMode
+from osrs_hiscore_scrape.statistic.sampling import (DEFAULT_CONFIDENCE,
+                                                    DEFAULT_PRECISION,
+                                                    DEFAULT_STRATA)
+from osrs_hiscore_scrape.statistic.sketch import DEFAULT_QUANTILE_ERROR
+from osrs_hiscore_scrape.util.player_store import (DEFAULT_MAX_AGE,
+                                                   DEFAULT_NOT_FOUND_TTL)
+from osrs_hiscore_scrape.util.snapshot import CategoryOutputFormat
 from osrs_hiscore_scrape.worker.constants import DEFAULT_WORKER_SIZE
 
 
@@ -28,7 +37,7 @@ class OSRSArgumentParser(ArgumentParser):
             "-o",
             dest="output_file",
             required=required,
-            help="Path to the output file"
+            help="Path to the output file, '-' streams records to stdout"
         )
         return self
 
@@ -124,6 +133,253 @@ class OSRSArgumentParser(ArgumentParser):
 
         return self
 
+    def category_info_mode(self, required: bool = False, default: CategoryInfoMode = CategoryInfoMode.exact) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--stats-mode",
+            dest="stats_mode",
+            default=default,
+            required=required,
+            type=argparse_wrapper(CategoryInfoMode.from_string),
+            choices=list(CategoryInfoMode),
+            help="How category statistics are aggregated, streaming runs in constant memory"
+        )
+
+        self.add_argument(
+            "--quantile-error",
+            dest="quantile_error",
+            default=DEFAULT_QUANTILE_ERROR,
+            required=required,
+            type=float,
+            help="Normalized rank error bound of the quantile sketch (streaming mode)"
+        )
+
+        self.add_argument(
+            "--percentiles",
+            dest="percentiles",
+            default=[],
+            type=argparse_wrapper(_parse_percentiles),
+            help="Comma separated percentiles (0-100) added to the summary, e.g. '1,10,90,99.9' (columnar mode)"
+        )
+
+        self.add_argument(
+            "--histogram-bins",
+            dest="histogram_bins",
+            default=0,
+            type=int,
+            help="Add a histogram of the scores with N equal width bins to the summary, 0 leaves it out (columnar mode)"
+        )
+
+        return self
+
+    def shards(self, required: bool = False, default: int = 1) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--shards",
+            dest="shards",
+            default=default,
+            required=required,
+            type=int,
+            help="Number of processes the rank range gets split over"
+        )
+        return self
+
+    def sampling(self) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--sample",
+            dest="sample",
+            action="store_true",
+            help="Estimate the statistics from a stratified random sample of pages instead of scraping every page"
+        )
+
+        self.add_argument(
+            "--precision",
+            dest="precision",
+            default=DEFAULT_PRECISION,
+            type=float,
+            help="Relative half width of the mean's confidence interval the sample stops at, e.g. 0.01 for ±1%%"
+        )
+
+        self.add_argument(
+            "--confidence",
+            dest="confidence",
+            default=DEFAULT_CONFIDENCE,
+            type=float,
+            help="Confidence level of the sampled estimates"
+        )
+
+        self.add_argument(
+            "--strata",
+            dest="strata",
+            default=DEFAULT_STRATA,
+            type=int,
+            help="Number of contiguous page ranges the sample is drawn from separately"
+        )
+
+        return self
+
+    def fields(self, required: bool = False) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--fields",
+            dest="fields",
+            type=argparse_wrapper(_parse_fields),
+            required=required,
+            help="Comma separated stats to keep in the output, e.g. 'username,overall,zulrah,combat'. Keeps every stat if omitted"
+        )
+        return self
+
+    def output_format(self, required: bool = False, default: CategoryOutputFormat = CategoryOutputFormat.jsonl) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--out-format",
+            dest="output_format",
+            default=default,
+            required=required,
+            type=argparse_wrapper(CategoryOutputFormat.from_string),
+            choices=list(CategoryOutputFormat),
+            help="Format of the output file, snapshot is a compact binary columnar format"
+        )
+        return self
+
+    def write_policy(self, required: bool = False, default: float = 0.0) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--flush-interval",
+            dest="flush_interval",
+            default=default,
+            required=required,
+            type=float,
+            help="Minimum seconds between output flushes, 0 flushes every written batch (compressed outputs flush per member)"
+        )
+
+        self.add_argument(
+            "--fsync",
+            dest="fsync",
+            action="store_true",
+            help="Force flushed output (and the resume journal) to disk"
+        )
+
+        return self
+
+    def index_stride(self, required: bool = False, default: int = 0) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--index-stride",
+            dest="index_stride",
+            default=default,
+            required=required,
+            type=int,
+            help="Write a sidecar rank to byte offset index ('<out>.idx') with an entry every N ranks, 0 disables it"
+        )
+        return self
+
+    def player_store(self, required: bool = False, default_max_age: float = DEFAULT_MAX_AGE) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--store",
+            dest="store_file",
+            required=required,
+            help="Path to a local player record store (SQLite), stored records are reused instead of looked up again"
+        )
+
+        self.add_argument(
+            "--max-age",
+            dest="max_age",
+            default=default_max_age,
+            type=argparse_wrapper(_parse_duration),
+            help="Maximum age of reused stored records, seconds or a number with s/m/h/d suffix. 0 always looks up, -1 never expires"
+        )
+
+        self.add_argument(
+            "--not-found-ttl",
+            dest="not_found_ttl",
+            default=DEFAULT_NOT_FOUND_TTL,
+            type=argparse_wrapper(_parse_duration),
+            help="How long players the hiscores don't know are skipped without a lookup, 0 disables it, -1 never expires"
+        )
+
+        return self
+
+    def category_index(self, required: bool = False) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--category-index",
+            dest="category_index_file",
+            required=required,
+            help="Path to an index of scraped category pages (SQLite), see index_categories.py"
+        )
+
+        self.add_argument(
+            "--index-max-age",
+            dest="index_max_age",
+            default=DEFAULT_MAX_AGE,
+            type=argparse_wrapper(_parse_duration),
+            help="Maximum age of used category listings, seconds or a number with s/m/h/d suffix. -1 never expires"
+        )
+
+        return self
+
+    def plan(self) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--plan",
+            dest="plan",
+            action="store_true",
+            help="Dry run, only discover the rank range and print the requests, throughput, duration and recommended workers per stage as json"
+        )
+
+        self.add_argument(
+            "--rate-per-proxy",
+            dest="rate_per_proxy",
+            default=SAFE_REQUESTS_PER_SECOND,
+            type=float,
+            help="Requests per second a single proxy (or the own ip) is assumed to keep up without getting blocked, used by --plan"
+        )
+
+        return self
+
+    def headless(self) -> 'OSRSArgumentParser':
+        self.add_argument(
+            "--headless",
+            dest="headless",
+            action="store_true",
+            help="Skip the interactive terminal check, for cron jobs, CI and pipelines"
+        )
+        return self
+
+
+def _parse_fields(arg) -> list[HSType]:
+    result = []
+
+    for field in arg.split(','):
+        field = field.strip()
+        # username is always part of the output
+        if not field or field.lower() == "username":
+            continue
+
+        hs_type = HSType.from_string(field)
+        if hs_type not in result:
+            result.append(hs_type)
+
+    return result
+
+
+def _parse_percentiles(arg) -> list[float]:
+    result = []
+
+    for value in arg.split(','):
+        if not value.strip():
+            continue
+        percent = float(value)
+        if not 0 <= percent <= 100:
+            raise ValueError(
+                f"Percentile has to be between 0 and 100, got {value.strip()}")
+        result.append(percent)
+
+    return result
+
+
+def _parse_duration(arg) -> float:
+    units = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+    arg = arg.strip().lower()
+    unit = units.get(arg[-1:], None)
+    try:
+        return float(arg[:-1] if unit else arg) * (unit or 1)
+    except ValueError:
+        raise ValueError(f"Invalid duration: '{arg}'")
+
 
 def _parse_key_value_pairs(arg) -> list[HSFilterEntry]:
     kv_pairs = arg.split(',')
@@ -157,6 +413,7 @@ def _parse_key_value_pairs(arg) -> list[HSFilterEntry]:
         else:
             raise ValueError(f"Unsupported operator: '{op}'")
 
-        result.append(HSFilterEntry(hstype=key, predicate=func))
+        result.append(HSFilterEntry(hstype=key, predicate=func,
+                                    comparison="==" if op == "=" else op, value=value))
 
     return result
@@ -1,21 +1,16 @@
 import argparse
-import json
 import sys
 
 from ..cli.helpers import script_running_in_cmd_guard
 from ..log.logger import get_logger
+from ..util.external_sort import sort_records
 
 logger = get_logger(__name__)
 
 
 def main(in_file):
-    with open(in_file, "r") as file:
-        lines = file.readlines()
-
-    sorted_lines = sorted(lines, key=lambda x: json.loads(x)["rank"])
-
-    with open(in_file, "w") as file:
-        file.writelines(sorted_lines)
+    """ Sorts a file by rank in place """
+    sort_records(in_file=in_file, out_file=in_file, key="rank")
 
 
 if __name__ == '__main__':
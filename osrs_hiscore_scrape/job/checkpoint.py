@@ -0,0 +1,201 @@
+import os
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterator
+
+from ..log.logger import get_logger
+from ..util import json_wrapper
+
+logger = get_logger(__name__)
+ENCODING = "utf-8"
+
+
+class IntervalSet:
+    """ Set of integers stored as sorted, disjoint and inclusive intervals. """
+
+    def __init__(self, intervals: list[tuple[int, int]] | None = None):
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for start, end in intervals or []:
+            self.add_range(start, end)
+
+    def add(self, n: int) -> None:
+        self.add_range(n, n)
+
+    def add_range(self, start: int, end: int) -> None:
+        """ Add every integer between `start` and `end` (inclusive). """
+        if start > end:
+            return
+
+        # fast path, priorities mostly get committed in order
+        if not self._starts or start > self._ends[-1] + 1:
+            self._starts.append(start)
+            self._ends.append(end)
+            return
+        if start >= self._starts[-1]:
+            self._ends[-1] = max(self._ends[-1], end)
+            return
+
+        i = bisect_left(self._ends, start - 1)
+        j = bisect_right(self._starts, end + 1)
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def __contains__(self, n: int) -> bool:
+        i = bisect_right(self._starts, n) - 1
+        return i >= 0 and n <= self._ends[i]
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(zip(self._starts, self._ends))
+
+    def next_missing(self, n: int) -> int:
+        """ Smallest integer >= `n` that is not in the set. """
+        i = bisect_right(self._starts, n) - 1
+        if i >= 0 and n <= self._ends[i]:
+            return self._ends[i] + 1
+        return n
+
+    def missing(self, start: int, end: int) -> list[tuple[int, int]]:
+        """ Returns the gaps (inclusive intervals) between `start` and `end` that are not in the set. """
+        gaps = []
+        current = self.next_missing(start)
+        while current <= end:
+            i = bisect_right(self._starts, current)
+            gap_end = min(end, self._starts[i] -
+                          1) if i < len(self._starts) else end
+            gaps.append((current, gap_end))
+            current = self.next_missing(gap_end + 1)
+        return gaps
+
+
+class JobJournal:
+    """
+    Write-ahead journal of committed job priorities and the output byte offset after each commit.
+
+    The first line holds the run parameters and the planned job range (so range discovery
+    doesn't have to run again), every following line is a `priority offset` commit.
+    An entry is only appended after the output it covers has been flushed, so on restart
+    everything after the last committed offset can be truncated from the output.
+    Without a `file_path` (output streamed to stdout, nothing to resume) commits are only tracked in memory.
+    """
+
+    def __init__(self, file_path: str | None, fsync: bool = False):
+        self.file_path = file_path
+        self.fsync = fsync
+        self.committed = IntervalSet()
+        self.offset = 0
+        self.plan: dict[str, Any] | None = None
+        self._started = False
+        self._f = None
+
+    def load(self, params: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        Load an existing journal that was started with the same `params`.
+        Returns the stored plan, or None if there is nothing to resume.
+        """
+        valid_size = self._read(params)
+        if valid_size is None:
+            return None
+
+        # drop a partially written trailing entry
+        with open(self.file_path, "r+b") as f:
+            f.truncate(valid_size)
+
+        self._f = open(self.file_path, "a", encoding=ENCODING)
+        self._started = True
+        return self.plan
+
+    def peek(self, params: dict[str, Any]) -> dict[str, Any] | None:
+        """ Like `load`, but the journal is only read: nothing gets truncated and it can't be committed to. """
+        return self.plan if self._read(params) is not None else None
+
+    def _read(self, params: dict[str, Any]) -> int | None:
+        """ Reads the plan and commits of a journal started with `params`, returns the size of its valid part. """
+        if self.file_path is None or not os.path.isfile(self.file_path):
+            return None
+
+        valid_size = 0
+        with open(self.file_path, "rb") as f:
+            header = f.readline()
+            try:
+                data = json_wrapper.from_json(header.decode(ENCODING))
+            except Exception as e:
+                logger.warning(
+                    f"Ignoring invalid journal {self.file_path}: {e}")
+                return None
+
+            if not header.endswith(b"\n") or data.get("params") != params:
+                logger.warning(
+                    f"Ignoring journal {self.file_path}, it belongs to a different run")
+                return None
+
+            self.plan = data["plan"]
+            self.offset = data["offset"]
+            valid_size = len(header)
+
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    priority, offset = (int(x) for x in line.split())
+                except ValueError:
+                    break
+                self.committed.add(priority)
+                self.offset = offset
+                valid_size += len(line)
+        return valid_size
+
+    def start(self, params: dict[str, Any], plan: dict[str, Any], offset: int) -> None:
+        """ Start a new journal, `offset` is the output size before anything gets written. """
+        self.plan = plan
+        self.offset = offset
+        self.committed = IntervalSet()
+        self._started = True
+        if self.file_path is None:
+            return
+        self._f = open(self.file_path, "w", encoding=ENCODING)
+        self._f.write(json_wrapper.to_json(
+            {"params": params, "plan": plan, "offset": offset}, separators=(',', ':')) + "\n")
+        self._sync()
+
+    def commit(self, priority: int, offset: int) -> None:
+        """ Record `priority` as done, the output it produced ends at byte `offset`. """
+        self.commit_many([(priority, offset)])
+
+    def commit_many(self, entries: list[tuple[int, int]]) -> None:
+        """ Record several `(priority, offset)` commits in order with a single sync. """
+        assert self._started, "journal has to be loaded or started first"
+        if not entries:
+            return
+        if self._f is not None:
+            self._f.write(
+                "".join(f"{priority} {offset}\n" for priority, offset in entries))
+            self._sync()
+        for priority, _ in entries:
+            self.committed.add(priority)
+        self.offset = entries[-1][1]
+
+    def _sync(self) -> None:
+        assert self._f is not None
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def remove(self) -> None:
+        """ Close and delete the journal, done once a run finished. """
+        self.close()
+        if self.file_path is not None and os.path.isfile(self.file_path):
+            os.remove(self.file_path)
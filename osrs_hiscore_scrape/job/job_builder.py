@@ -2,7 +2,8 @@ from typing import List
 
 from ..request.constants import HS_PAGE_SIZE
 from ..request.dto import (GetFilteredPageRangeRequest,
-                           GetMaxHighscorePageRequest)
+                           GetMaxHighscorePageRequest,
+                           GetMaxHighscorePageResult)
 from ..request.request import Requests
 from .records import HSCategoryJob
 
@@ -14,6 +15,19 @@ async def get_hs_page_job(req: Requests, start_rank: int, end_rank: int, max_pag
     This function calculates which hiscore pages correspond to the given
     rank range, and retrieves the maximum available page and rank.
 
+    Raises:
+        ValueError: If `start_rank` is less than 1, or if
+            `start_rank > end_rank` when `end_rank` > 0.
+    """
+    res = await req.get_max_page(max_page_req=max_page_req)
+    return build_hs_page_job(start_rank=start_rank, end_rank=end_rank, max_page_res=res, max_page_req=max_page_req)
+
+
+def build_hs_page_job(start_rank: int, end_rank: int, max_page_res: GetMaxHighscorePageResult, max_page_req: GetMaxHighscorePageRequest) -> List[HSCategoryJob]:
+    """
+    Generate jobs for fetching OSRS hiscore pages within a rank range
+    from an already known maximum page and rank.
+
     Raises:
         ValueError: If `start_rank` is less than 1, or if
             `start_rank > end_rank` when `end_rank` > 0.
@@ -21,8 +35,7 @@ async def get_hs_page_job(req: Requests, start_rank: int, end_rank: int, max_pag
     start_page, end_page = _extract_page_nr_from_rank(
         start_rank=start_rank, end_rank=end_rank)
 
-    res = await req.get_max_page(max_page_req=max_page_req)
-    max_page_page, max_page_rank = res.page_nr, res.rank_nr
+    max_page_page, max_page_rank = max_page_res.page_nr, max_page_res.rank_nr
 
     if end_rank <= 0 or max_page_rank < end_rank:
         end_page = max_page_page
@@ -1,10 +1,17 @@
 from asyncio import Queue
 
+from ..log.logger import get_logger
 from ..request.dto import (GetHighscorePageRequest, GetPlayerRequest,
                            HSFilterEntry)
-from ..request.records import CategoryInfo
+from ..request.hs_types import HSType
+from ..request.records import BaseCategoryInfo
 from ..request.request import Requests
-from .records import HSCategoryJob, HSLookupJob, IJob, JobQueue
+from ..util.category_index import CategoryIndex
+from ..util.player_store import PlayerStore, username_key
+from .checkpoint import IntervalSet
+from .records import HSCategoryJob, HSLookupJob, IJob, JobQueue, SkippedJob
+
+logger = get_logger(__name__)
 
 
 async def request_hs_page(req: Requests, job: HSCategoryJob):
@@ -17,38 +24,93 @@ async def request_user_stats(req: Requests, job: HSLookupJob):
     job.result = await req.get_user_stats(GetPlayerRequest(username=job.username, account_type=job.account_type))
 
 
+def is_known_missing(req: Requests, job: HSLookupJob) -> bool:
+    """ Whether the player store of `req` knows the player of a lookup job isn't on the hiscores. """
+    return req.store is not None and req.store.is_not_found(job.account_type, job.username)
+
+
+def is_skippable(req: Requests, job: HSLookupJob, index: CategoryIndex | None = None,
+                 hs_filter: list[HSFilterEntry] | None = None) -> bool:
+    """
+    Whether a lookup job doesn't need a request: the player is known to be missing (see `is_known_missing`)
+    or the category `index` knows they can't meet `hs_filter`.
+    """
+    return is_known_missing(req, job) or (
+        index is not None and bool(hs_filter) and index.rejects(job.account_type, hs_filter, job.username))
+
+
+async def request_changed_user_stats(req: Requests, job: HSLookupJob, hs_type: HSType):
+    """
+    Fetch player stats for a player whose `hs_type` score changed (or isn't known), stored records are bypassed.
+    The score the player got looked up at is kept in the player store for the next refresh.
+    """
+    job.result = await req.get_user_stats(GetPlayerRequest(username=job.username, account_type=job.account_type), max_age=0)
+    if req.store is not None and job.score is not None:
+        req.store.put_score(job.account_type, hs_type, job.username, job.score)
+
+
+def carry_forward_unchanged(store: PlayerStore, hs_type: HSType, jobs: list[HSLookupJob]) -> int:
+    """
+    Sets the stored record as the result of lookup jobs (of one account type) whose `hs_type` score is the one
+    the record was looked up at, workers don't look those up again. Returns the amount of jobs carried forward.
+    """
+    if not jobs:
+        return 0
+
+    scores = store.get_scores(jobs[0].account_type, hs_type, [
+                              job.username for job in jobs])
+    carried = 0
+    for job in jobs:
+        if job.score is None or scores.get(username_key(job.username)) != job.score:
+            continue
+        record = store.get(job.account_type, job.username, max_age=-1)
+        if record is not None:
+            job.result = record
+            carried += 1
+    return carried
+
+
 async def enqueue_hs_page(queue: JobQueue | Queue, job: HSCategoryJob):
     """ Enqueue a processed hiscore page job into the given queue. """
     await queue.put(job)
 
 
-async def enqueue_analyse_page_category(queue: JobQueue | Queue, job: HSCategoryJob, category_info: CategoryInfo):
+async def enqueue_analyse_page_category(queue: JobQueue | Queue, job: HSCategoryJob, category_info: BaseCategoryInfo):
     """
     Process a hiscore page job and add its relevant records to a category,
     then enqueue the job for further processing.
     """
-    for record in job.result[job.start_idx:job.end_idx]:
-        category_info.add(record=record)
+    category_info.add_many(job.result[job.start_idx:job.end_idx])
     await queue.put(job)
 
 
-async def enqueue_page_usernames(queue: JobQueue | Queue, job: HSCategoryJob):
+async def enqueue_page_usernames(queue: JobQueue | Queue, job: HSCategoryJob, committed: IntervalSet | None = None,
+                                 store: PlayerStore | None = None):
     """
     Convert each record in a hiscore page job into individual HSLookupJob
     instances for username-based processing and enqueue them.
+    Ranks in `committed` were already handled by a previous run and are left out.
+    With a `store`, players whose score didn't change since they were stored are carried forward (see `carry_forward_unchanged`).
     """
-    for record in job.result[job.start_idx:job.end_idx]:
-        outjob = HSLookupJob(
-            priority=record.rank, username=record.username, account_type=job.account_type)
+    outjobs = [HSLookupJob(priority=record.rank, username=record.username, account_type=job.account_type, score=record.score)
+               for record in job.result[job.start_idx:job.end_idx]
+               if not (committed and record.rank in committed)]
+
+    if store is not None:
+        carried = carry_forward_unchanged(store, job.hs_type, outjobs)
+        logger.debug(
+            f"page {job.page_num}: {carried}/{len(outjobs)} unchanged players carried forward")
+
+    for outjob in outjobs:
         await queue.put(outjob)
 
 
 async def enqueue_user_stats_filter(queue: JobQueue[IJob] | Queue[IJob], job: HSLookupJob, hs_filter: list[HSFilterEntry]):
     """
     Enqueue a HSLookupJob if its result meets specified filter requirements;
-    otherwise enqueue None to indicate the job does not match.
+    otherwise enqueue a SkippedJob to indicate the job does not match.
     """
     if job.result.meets_requirements(hs_filter):
         await queue.put(job)
     else:
-        await queue.put(None)  # type: ignore
+        await queue.put(SkippedJob(priority=job.priority))
@@ -17,7 +17,7 @@ def map_player_records_to_lookup_jobs(account_type: HSAccountTypes, input: list[
 
 def map_category_record_to_lookup_job(priority: int, account_type: HSAccountTypes, input: CategoryRecord) -> HSLookupJob:
     """ function that maps a `CategoryRecord` to a `HSLookupJob` """
-    return HSLookupJob(priority=priority, account_type=account_type, username=input.username)
+    return HSLookupJob(priority=priority, account_type=account_type, username=input.username, score=input.score)
 
 
 def map_category_records_to_lookup_jobs(account_type: HSAccountTypes, input: list[CategoryRecord]) -> list[HSLookupJob]:
@@ -0,0 +1,97 @@
+import math
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from ..request.constants import SAFE_REQUESTS_PER_SECOND
+from ..request.request import Requests
+
+# latency assumed when range discovery didn't need any request (e.g. resumed from a journal)
+DEFAULT_LATENCY: float = 1.0
+
+
+@dataclass
+class Stage:
+    """ Requests a stage of a run is going to make and the amount of workers making them. """
+    name: str
+    requests: int
+    workers: int
+
+
+@dataclass
+class StagePlan:
+    """ Projection of a stage, `recommended_workers` is the least amount that keeps up its share of the proxy pool. """
+    name: str
+    requests: int
+    workers: int
+    recommended_workers: int
+    requests_per_second: float
+    seconds: float
+
+
+@dataclass
+class RunPlan:
+    """ Projected cost of a run, from the requests range discovery made. """
+    discovery_requests: int
+    discovery_seconds: float
+    rate_limited: int
+    latency: float
+    latency_measured: bool
+    proxies: int
+    pool_requests_per_second: float
+    stages: list[StagePlan]
+    seconds: float
+
+    def requests(self) -> int:
+        return sum(stage.requests for stage in self.stages)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "discovery": {"requests": self.discovery_requests, "seconds": self.discovery_seconds,
+                          "rate_limited": self.rate_limited},
+            "latency": self.latency,
+            "latency_measured": self.latency_measured,
+            "proxies": self.proxies,
+            "pool_requests_per_second": self.pool_requests_per_second,
+            "stages": [{"name": stage.name, "requests": stage.requests, "workers": stage.workers,
+                        "recommended_workers": stage.recommended_workers,
+                        "requests_per_second": stage.requests_per_second, "seconds": stage.seconds}
+                       for stage in self.stages],
+            "requests": self.requests(),
+            "eta_seconds": self.seconds,
+            "eta": str(timedelta(seconds=round(self.seconds))),
+        }
+
+
+def plan_run(req: Requests, stages: list[Stage], rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND,
+             concurrent: bool = False) -> RunPlan:
+    """
+    Projects the throughput and duration of the stages of a run under the proxy pool of `req`.
+
+    The pool keeps up `rate_per_proxy` requests per second per proxy (a run without proxies is a single ip),
+    a worker makes a request per latency measured over the requests `req` made so far. A stage runs at the
+    slower of both, going faster than the pool only gets it blocked. `concurrent` stages (a pipeline) share
+    the pool in proportion to their requests and the run takes as long as its slowest stage, otherwise
+    every stage gets the whole pool and the durations add up.
+    """
+    measured = req.stats.latency()
+    latency = measured if measured is not None else DEFAULT_LATENCY
+    proxies = len(req.proxy_list) if req.proxy_list else 1
+    pool_rate = proxies * rate_per_proxy
+    total = sum(stage.requests for stage in stages)
+
+    plans = []
+    for stage in stages:
+        share = pool_rate * stage.requests / total if concurrent and total else pool_rate
+        rate = min(stage.workers / latency, share)
+        recommended = max(1, min(stage.requests, math.ceil(
+            share * latency))) if stage.requests else 0
+        plans.append(StagePlan(name=stage.name, requests=stage.requests, workers=stage.workers,
+                               recommended_workers=recommended, requests_per_second=rate,
+                               seconds=stage.requests / rate if stage.requests and rate else 0.0))
+
+    durations = [plan.seconds for plan in plans]
+    return RunPlan(discovery_requests=req.stats.requests, discovery_seconds=req.stats.seconds,
+                   rate_limited=req.stats.rate_limited, latency=latency, latency_measured=measured is not None,
+                   proxies=proxies, pool_requests_per_second=pool_rate, stages=plans,
+                   seconds=(max(durations, default=0.0) if concurrent else sum(durations)))
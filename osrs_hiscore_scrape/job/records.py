@@ -6,6 +6,7 @@ from typing import Any, Generic, List, TypeVar
 from ..request.hs_account_types import HSAccountTypes
 from ..request.hs_types import HSType
 from ..request.records import CategoryRecord, PlayerRecord
+from .checkpoint import IntervalSet
 
 
 class IJob(ABC):
@@ -41,18 +42,32 @@ class HSLookupJob(IJob):
 
     Each job targets one username on a specific hiscore endpoint. 
     The result is populated in a `PlayerRecord` once the lookup succesfully completes.
+    `score` is the player's score in the category the job came from, if it's known.
     """
     priority: int
     username: str
     account_type: HSAccountTypes
     result: PlayerRecord = None  # type: ignore
+    score: int | None = None
+
+
+@dataclass(order=True)
+class SkippedJob(IJob):
+    """
+    Placeholder for a job that was processed but has nothing to write.
+
+    Keeps the priority around so writers can still account for the job, e.g. in a checkpoint journal.
+    """
+    priority: int
+    result: Any = None
 
 
 class JobManager:
     """ A job utility class for tracking and awaiting job progress, signals when jobs are finished. """
 
-    def __init__(self, start: int, end: int, end_inclusive: bool = True):
-        self.v = start
+    def __init__(self, start: int, end: int, end_inclusive: bool = True, skip: IntervalSet | None = None):
+        self.skip = skip
+        self.v = self._skip(start)
         self.end = end
         self.end_inclusive = end_inclusive
         self.nextcalled = asyncio.Event()
@@ -62,6 +77,10 @@ class JobManager:
     def value(self):
         return self.v
 
+    def _skip(self, n: int) -> int:
+        """ Jump over priorities in `skip`, used when resuming from a checkpoint journal. """
+        return self.skip.next_missing(n) if self.skip else n
+
     def is_finished(self) -> bool:
         return self.v > self.end if self.end_inclusive else self.v >= self.end
 
@@ -72,7 +91,7 @@ class JobManager:
         """ set the value to `n` and signal waiting tasks. """
         if self.is_finished():
             return
-        self.v = n
+        self.v = self._skip(n)
         self.nextcalled.set()
         if self.is_finished():
             self.finished_event.set()
@@ -81,7 +100,7 @@ class JobManager:
         """ Increment the counter by `n` (default 1) and signal waiting tasks. """
         if self.is_finished():
             return
-        self.v += n
+        self.v = self._skip(self.v + n)
         self.nextcalled.set()
         if self.is_finished():
             self.finished_event.set()
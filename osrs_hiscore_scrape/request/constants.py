@@ -1,2 +1,4 @@
 HS_PAGE_SIZE: int = 25
 MAX_CATEGORY_SIZE: int = 80_000
+# requests per second a single ip (proxy) is assumed to keep up before the hiscores start blocking it
+SAFE_REQUESTS_PER_SECOND: float = 2.0
@@ -7,9 +7,14 @@ from .hs_types import HSType
 
 @dataclass
 class HSFilterEntry:
-    """ Wrapper object to handle filter requests """
+    """
+    Wrapper object to handle filter requests, parsed filters also keep the comparison and value
+    of the predicate so it can be evaluated elsewhere (e.g. by an indexed query of the player store).
+    """
     hstype: HSType
     predicate: Callable[[int | float], bool]
+    comparison: str | None = None
+    value: int | float | None = None
 
 
 @dataclass
@@ -1,14 +1,30 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
 from functools import total_ordering
-from typing import Any, List
+from itertools import groupby
+from typing import Any, List, Sequence
 
+from ..log.logger import get_logger
 from ..statistic.calculators import calc_combat_level
+from ..statistic.moments import RunningMoments
+from ..statistic.sampling import (DEFAULT_CONFIDENCE, DEFAULT_STRATA,
+                                  StratifiedPageSample)
+from ..statistic.sketch import DEFAULT_QUANTILE_ERROR, KLLSketch
 from ..util import json_wrapper
+from .constants import HS_PAGE_SIZE
 from .dto import HSFilterEntry
 from .hs_types import HS_TYPE_BUCKET_MAP, HSType
 
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for the columnar category mode
+    np = None
+
+logger = get_logger(__name__)
+
 
 class PlayerRecordInfo(ABC):
     @abstractmethod
@@ -205,45 +221,68 @@ class PlayerRecord:
             return False
         return not self < other and not other < self
 
-    def to_dict(self) -> dict[str, Any]:
-        return {
+    def to_dict(self, fields: list[HSType] | None = None) -> dict[str, Any]:
+        """
+        Serializable representation of the record. When `fields` is given only those stats are kept,
+        username and timestamp are always included so the projection still loads with `from_dict`.
+        """
+        if fields is None:
+            return {
+                "username": self.username,
+                "timestamp": self.ts.isoformat(),
+                "combat_lvl": self.combat_lvl.get_value(),
+                "skills": {k: v.to_dict() for k, v in self.skills.items()},
+                "seasonal_modes": {k: v.to_dict() for k, v in self.seasonal_modes.items()},
+                "clues": {k: v.to_dict() for k, v in self.clues.items()},
+                "minigames": {k: v.to_dict() for k, v in self.minigames.items()},
+                "misc": {k: v.to_dict() for k, v in self.misc.items()},
+                "bosses": {k: v.to_dict() for k, v in self.bosses.items()},
+            }
+
+        data: dict[str, Any] = {
             "username": self.username,
             "timestamp": self.ts.isoformat(),
-            "combat_lvl": self.combat_lvl.get_value(),
-            "skills": {k: v.to_dict() for k, v in self.skills.items()},
-            "seasonal_modes": {k: v.to_dict() for k, v in self.seasonal_modes.items()},
-            "clues": {k: v.to_dict() for k, v in self.clues.items()},
-            "minigames": {k: v.to_dict() for k, v in self.minigames.items()},
-            "misc": {k: v.to_dict() for k, v in self.misc.items()},
-            "bosses": {k: v.to_dict() for k, v in self.bosses.items()},
         }
+        for hs_type in fields:
+            if hs_type is HSType.combat:
+                data["combat_lvl"] = self.combat_lvl.get_value()
+                continue
+
+            bucket = HS_TYPE_BUCKET_MAP[hs_type.name]
+            stat = getattr(self, bucket).get(hs_type.name)
+            if stat is not None:
+                data.setdefault(bucket, {})[hs_type.name] = stat.to_dict()
+
+        return data
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> 'PlayerRecord':
+        """ Inverse of `to_dict`, stats missing from a projection are left out. """
         ts = datetime.fromisoformat(data["timestamp"])
 
         obj = cls(data["username"], [], ts)
 
-        obj.combat_lvl = PlayerRecordScalarInfo(data["combat_lvl"])
+        if "combat_lvl" in data:
+            obj.combat_lvl = PlayerRecordScalarInfo(data["combat_lvl"])
 
         obj.skills = {k: PlayerRecordSkillInfo(
-            **v) for k, v in data["skills"].items()}
+            **v) for k, v in data.get("skills", {}).items()}
 
         obj.seasonal_modes = {k: PlayerRecordActivityInfo(
-            **v) for k, v in data["seasonal_modes"].items()}
+            **v) for k, v in data.get("seasonal_modes", {}).items()}
         obj.clues = {k: PlayerRecordActivityInfo(
-            **v) for k, v in data["clues"].items()}
+            **v) for k, v in data.get("clues", {}).items()}
         obj.minigames = {k: PlayerRecordActivityInfo(
-            **v) for k, v in data["minigames"].items()}
+            **v) for k, v in data.get("minigames", {}).items()}
         obj.misc = {k: PlayerRecordActivityInfo(
-            **v) for k, v in data["misc"].items()}
+            **v) for k, v in data.get("misc", {}).items()}
         obj.bosses = {k: PlayerRecordActivityInfo(
-            **v) for k, v in data["bosses"].items()}
+            **v) for k, v in data.get("bosses", {}).items()}
 
         return obj
 
     def __str__(self):
-        return json_wrapper.to_json(self.to_dict(), separators=(',', ':'))
+        return json_wrapper.dumps(self.to_dict())
 
 
 @total_ordering
@@ -284,23 +323,20 @@ class CategoryRecord:
         return self.rank == other.rank
 
     def __str__(self) -> str:
-        return json_wrapper.to_json(self.to_dict(), separators=(',', ':'))
+        return json_wrapper.dumps(self.to_dict())
 
 
-class CategoryInfo:
-    """ Aggregates statistics for a highscore category over multiple records. """
+class BaseCategoryInfo(ABC):
+    """ Shared summary output for highscore category aggregations, subclasses decide how statistics are kept. """
+    # whether the partial state stays small regardless of the record count
+    compact_state: bool = False
 
     def __init__(self, name: str, ts: datetime):
         self.name = name
         self.ts = ts
         self._max = None
         self._min = None
-        self._records: list[CategoryRecord] = []
-        self._is_sorted = True
         self._total_score = 0
-        self._cached_sum_squared_delta = 0
-        self._cached_sum_cubed_delta = 0
-        self._cached_sum_quartic_delta = 0
 
     @property
     def max(self) -> CategoryRecord | None:
@@ -312,9 +348,7 @@ class CategoryInfo:
 
     def add(self, record: CategoryRecord) -> None:
         """ Add a CategoryRecord to the aggregation """
-        self._is_sorted = False
         self._total_score += record.score
-        self._records.append(record)
 
         if not self._max or self._max.is_worse_rank_than(record):
             self._max = record
@@ -322,54 +356,160 @@ class CategoryInfo:
         if not self._min or self._min.is_better_rank_than(record):
             self._min = record
 
+    def add_many(self, records: Sequence[CategoryRecord]) -> None:
+        """
+        Add several CategoryRecords, e.g. the records of a scraped page.
+        Modes with columnar storage override this to ingest them in bulk.
+        """
+        for record in records:
+            self.add(record=record)
+
+    def add_column(self, first_rank: int, scores: Sequence[int], usernames: Sequence[str]) -> None:
+        """
+        Add records of contiguous ranks starting at `first_rank` given as columns.
+        Modes that don't keep records override this to skip creating an object per row.
+        """
+        for i, score in enumerate(scores):
+            self.add(CategoryRecord(rank=first_rank + i,
+                     score=score, username=usernames[i]))
+
+    def add_runs(self, first_rank: int, runs: Sequence[tuple[int, int]], usernames: Sequence[str]) -> None:
+        """
+        Add records of contiguous ranks starting at `first_rank` given as `(score, count)` runs of tied scores.
+        Modes that don't keep records override this to update their statistics once per run.
+        """
+        self.add_column(first_rank=first_rank,
+                        scores=[score for score,
+                                count in runs for _ in range(count)],
+                        usernames=usernames)
+
+    def _add_column_bounds(self, first_rank: int, scores: Sequence[int], usernames: Sequence[str]) -> None:
+        """ updates the total and best/worst rank for a column, only the outer records get created """
+        if scores:
+            self._add_bounds(first_rank, len(scores), sum(
+                scores), scores[0], scores[-1], usernames)
+
+    def _add_runs_bounds(self, first_rank: int, runs: Sequence[tuple[int, int]], usernames: Sequence[str]) -> None:
+        """ updates the total and best/worst rank for score runs """
+        if runs:
+            self._add_bounds(first_rank, sum(count for _, count in runs),
+                             sum(score * count for score, count in runs), runs[0][0], runs[-1][0], usernames)
+
+    def _add_bounds(self, first_rank: int, count: int, total: int, first_score: int, last_score: int, usernames: Sequence[str]) -> None:
+        self._total_score += total
+
+        best = CategoryRecord(
+            rank=first_rank, score=first_score, username=usernames[0])
+        if not self._max or self._max.is_worse_rank_than(best):
+            self._max = best
+
+        worst = CategoryRecord(rank=first_rank + count - 1,
+                               score=last_score, username=usernames[count - 1])
+        if not self._min or self._min.is_better_rank_than(worst):
+            self._min = worst
+
     def is_empty(self) -> bool:
-        return len(self._records) == 0
+        return self.count() == 0
 
-    def _sort(self):
-        if not self._is_sorted:
-            self._records.sort()
-            self._is_sorted = True
-            mean = self._total_score / len(self._records)
-            for record in self._records:
-                self._cached_sum_squared_delta += (record.score - mean) ** 2
-                self._cached_sum_cubed_delta += (record.score - mean) ** 3
-                self._cached_sum_quartic_delta += (record.score - mean) ** 4
+    @abstractmethod
+    def count(self) -> int:
+        pass
 
-    def to_dict(self) -> dict[str, Any]:
-        def percentile(percent: int) -> float | None:
-            if (self.is_empty()):
-                return None
+    @abstractmethod
+    def _percentile(self, percent: int) -> float | None:
+        pass
+
+    @abstractmethod
+    def _median(self) -> float | None:
+        pass
+
+    @abstractmethod
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        """ sum of squared, cubed and quartic deltas from the mean in that order """
+
+    @abstractmethod
+    def _merge(self, other: Any) -> None:
+        """ merges the mode specific partial state of `other` into this aggregation """
+
+    @abstractmethod
+    def _state(self) -> dict[str, Any]:
+        """ mode specific partial state, has to be json serializable """
+
+    @classmethod
+    @abstractmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> Any:
+        """ creates an aggregation with the mode specific partial state restored """
+
+    def _prepare(self) -> None:
+        """ hook that runs before the summary gets calculated """
+
+    def merge(self, other: 'BaseCategoryInfo') -> None:
+        """
+        Merge the partial aggregation of another category info into this one.
+        Merging is associative, so shards can be combined in any grouping.
+
+        Raises:
+            TypeError: If `other` uses a different aggregation mode.
+        """
+        if type(other) is not type(self):
+            raise TypeError(
+                f"cannot merge {type(other).__name__} into {type(self).__name__}")
 
-            records = self._records
-            # have to reverse this since data goes from large to small
-            percent = 100 - percent
+        self._total_score += other._total_score
 
-            k = (n - 1) * (percent / 100)
-            f = int(k)
-            c = min(f + 1, n - 1)
-            return records[f].score + (records[c].score - records[f].score) * (k - f)
+        if other._max and (not self._max or self._max.is_worse_rank_than(other._max)):
+            self._max = other._max
 
+        if other._min and (not self._min or self._min.is_better_rank_than(other._min)):
+            self._min = other._min
+
+        self._merge(other)
+
+    def to_state(self) -> dict[str, Any]:
+        """ Serializable partial state of the aggregation, restore it with `CategoryInfoMode.from_state`. """
+        return {
+            "mode": CategoryInfoMode(type(self)).name,
+            "name": self.name,
+            "timestamp": self.ts.isoformat(),
+            "total_score": self._total_score,
+            "max": self._max.to_dict() if self._max else None,
+            "min": self._min.to_dict() if self._min else None,
+            "state": self._state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> 'BaseCategoryInfo':
+        obj = cls._from_state(name=state["name"], ts=datetime.fromisoformat(
+            state["timestamp"]), state=state["state"])
+        obj._total_score = state["total_score"]
+        obj._max = CategoryRecord(**state["max"]) if state["max"] else None
+        obj._min = CategoryRecord(**state["min"]) if state["min"] else None
+        return obj
+
+    def to_dict(self) -> dict[str, Any]:
         def calc_univariate_analysis(sample: bool) -> tuple[float | None, float | None, float | None, float | None]:
             """ calculates variance, standard deviation, skewness and kurtosis and returns them in that order """
-            n = len(self._records)
+            n = self.count()
             n = n if not sample else n - 1
 
             if n <= 0:
                 return (None, None, None, None)
 
-            var = self._cached_sum_squared_delta / n
+            sum_squared_delta, sum_cubed_delta, sum_quartic_delta = self._central_moment_sums()
+
+            var = sum_squared_delta / n
             std = var ** 0.5
-            skew = (self._cached_sum_cubed_delta / n) / (std ** 3)
-            kurt = (self._cached_sum_quartic_delta / n) / (std ** 4) - 3
+            skew = (sum_cubed_delta / n) / (std ** 3)
+            kurt = (sum_quartic_delta / n) / (std ** 4) - 3
 
             return (var, std, skew, kurt)
 
-        self._sort()
+        self._prepare()
 
-        # can most likely simplify this entire thing by just using pandas or numpy
-        n = len(self._records)
+        n = self.count()
         mean = median = None
-        q1, q2, q3 = percentile(25), percentile(50), percentile(75)
+        q1, q2, q3 = self._percentile(
+            25), self._percentile(50), self._percentile(75)
         var_population, std_population, skewness_population, kurtosis_population \
             = calc_univariate_analysis(sample=False)
         var_sample, std_sample, skewness_sample, kurtosis_sample \
@@ -377,9 +517,7 @@ class CategoryInfo:
 
         if n:
             mean = self._total_score / n
-            mid = n >> 1
-            median = self._records[mid].score if (n & 1) == 0 \
-                else (self._records[mid-1].score + self._records[mid].score) / 2
+            median = self._median()
 
         return {
             "name": self.name,
@@ -412,3 +550,568 @@ class CategoryInfo:
 
     def __str__(self) -> str:
         return json_wrapper.to_json(self.to_dict(), separators=(',', ':'))
+
+
+class CategoryInfo(BaseCategoryInfo):
+    """ Aggregates statistics for a highscore category over multiple records. """
+
+    def __init__(self, name: str, ts: datetime):
+        super().__init__(name=name, ts=ts)
+        self._records: list[CategoryRecord] = []
+        self._is_sorted = True
+        self._cached_sum_squared_delta = 0
+        self._cached_sum_cubed_delta = 0
+        self._cached_sum_quartic_delta = 0
+
+    def add(self, record: CategoryRecord) -> None:
+        """ Add a CategoryRecord to the aggregation """
+        super().add(record=record)
+        self._is_sorted = False
+        self._records.append(record)
+
+    def count(self) -> int:
+        return len(self._records)
+
+    def _sort(self):
+        if not self._is_sorted:
+            self._records.sort()
+            self._is_sorted = True
+            self._cached_sum_squared_delta = 0
+            self._cached_sum_cubed_delta = 0
+            self._cached_sum_quartic_delta = 0
+            mean = self._total_score / len(self._records)
+            # sorted on rank, so tied scores are next to each other and only get calculated once per run
+            for score, run in groupby(record.score for record in self._records):
+                count = sum(1 for _ in run)
+                self._cached_sum_squared_delta += count * (score - mean) ** 2
+                self._cached_sum_cubed_delta += count * (score - mean) ** 3
+                self._cached_sum_quartic_delta += count * (score - mean) ** 4
+
+    def _prepare(self) -> None:
+        self._sort()
+
+    def _percentile(self, percent: int) -> float | None:
+        if (self.is_empty()):
+            return None
+
+        records = self._records
+        f, c, fraction = _percentile_positions(n=len(records), percent=percent)
+        return records[f].score + (records[c].score - records[f].score) * fraction
+
+    def _median(self) -> float | None:
+        if self.is_empty():
+            return None
+
+        f, c = _median_positions(n=len(self._records))
+        return self._records[f].score if f == c \
+            else (self._records[f].score + self._records[c].score) / 2
+
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        return (self._cached_sum_squared_delta, self._cached_sum_cubed_delta, self._cached_sum_quartic_delta)
+
+    def _merge(self, other: 'CategoryInfo') -> None:
+        self._records.extend(other._records)
+        self._is_sorted = False
+
+    def _state(self) -> dict[str, Any]:
+        return {"records": [[r.rank, r.score, r.username] for r in self._records]}
+
+    @classmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> 'CategoryInfo':
+        obj = cls(name=name, ts=ts)
+        obj._records = [CategoryRecord(rank=rank, score=score, username=username)
+                        for rank, score, username in state["records"]]
+        obj._is_sorted = not obj._records
+        return obj
+
+
+class StreamingCategoryInfo(BaseCategoryInfo):
+    """
+    Aggregates statistics for a highscore category in constant memory.
+
+    Moments are updated in one pass, quantiles come from a KLL sketch with a
+    configurable normalized rank error.
+    """
+
+    compact_state = True
+
+    def __init__(self, name: str, ts: datetime, quantile_error: float = DEFAULT_QUANTILE_ERROR, seed: int | None = None):
+        super().__init__(name=name, ts=ts)
+        self._moments = RunningMoments()
+        self._sketch = KLLSketch.from_error(quantile_error, seed=seed)
+
+    def add(self, record: CategoryRecord) -> None:
+        """ Add a CategoryRecord to the aggregation """
+        super().add(record=record)
+        self._moments.add(record.score)
+        self._sketch.update(record.score)
+
+    def add_column(self, first_rank: int, scores: Sequence[int], usernames: Sequence[str]) -> None:
+        """ Add records of contiguous ranks starting at `first_rank` given as columns. """
+        self._add_column_bounds(first_rank, scores, usernames)
+        for score in scores:
+            self._moments.add(score)
+            self._sketch.update(score)
+
+    def add_runs(self, first_rank: int, runs: Sequence[tuple[int, int]], usernames: Sequence[str]) -> None:
+        """ Add `(score, count)` runs of tied scores starting at `first_rank`, statistics are updated once per run. """
+        self._add_runs_bounds(first_rank, runs, usernames)
+        for score, count in runs:
+            self._moments.add(score, count)
+            self._sketch.update(score, count)
+
+    def count(self) -> int:
+        return self._moments.n
+
+    def _percentile(self, percent: int) -> float | None:
+        return self._sketch.quantile(percent / 100)
+
+    def _median(self) -> float | None:
+        return self._sketch.quantile(0.5)
+
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        return self._moments.sums()
+
+    def _merge(self, other: 'StreamingCategoryInfo') -> None:
+        self._moments.merge(other._moments)
+        self._sketch.merge(other._sketch)
+
+    def _state(self) -> dict[str, Any]:
+        return {"moments": self._moments.to_dict(), "sketch": self._sketch.to_dict()}
+
+    @classmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> 'StreamingCategoryInfo':
+        obj = cls(name=name, ts=ts)
+        obj._moments = RunningMoments.from_dict(state["moments"])
+        obj._sketch = KLLSketch.from_dict(state["sketch"])
+        return obj
+
+
+class RankedCategoryInfo(BaseCategoryInfo):
+    """
+    Aggregates statistics for a highscore category with exact quartiles in O(1) memory.
+
+    Highscore pages are already sorted on score, so when the final count is known up front
+    only the scores at the ranks needed for the quartiles and median have to be kept, no sort needed.
+    """
+
+    compact_state = True
+
+    def __init__(self, name: str, ts: datetime, expected_count: int, first_rank: int = 1):
+        super().__init__(name=name, ts=ts)
+        self.expected_count = expected_count
+        self.first_rank = first_rank
+        self._moments = RunningMoments()
+        self._scores: dict[int, int] = {}
+        self._valid_positions = False
+        self._needed_positions: set[int] = set()
+
+        if expected_count > 0:
+            self._needed_positions.update(_median_positions(n=expected_count))
+            for percent in (25, 50, 75):
+                f, c, _ = _percentile_positions(
+                    n=expected_count, percent=percent)
+                self._needed_positions.update((f, c))
+
+    def add(self, record: CategoryRecord) -> None:
+        """ Add a CategoryRecord to the aggregation """
+        super().add(record=record)
+        self._moments.add(record.score)
+
+        position = record.rank - self.first_rank
+        if position in self._needed_positions:
+            self._scores[position] = record.score
+
+    def add_column(self, first_rank: int, scores: Sequence[int], usernames: Sequence[str]) -> None:
+        """ Add records of contiguous ranks starting at `first_rank` given as columns. """
+        self._add_column_bounds(first_rank, scores, usernames)
+        for score in scores:
+            self._moments.add(score)
+
+        offset = first_rank - self.first_rank
+        for position in self._needed_positions:
+            if 0 <= position - offset < len(scores):
+                self._scores[position] = scores[position - offset]
+
+    def add_runs(self, first_rank: int, runs: Sequence[tuple[int, int]], usernames: Sequence[str]) -> None:
+        """ Add `(score, count)` runs of tied scores starting at `first_rank`, statistics are updated once per run. """
+        self._add_runs_bounds(first_rank, runs, usernames)
+
+        starts = []
+        position = first_rank - self.first_rank
+        for score, count in runs:
+            self._moments.add(score, count)
+            starts.append(position)
+            position += count
+
+        for needed in self._needed_positions:
+            i = bisect_right(starts, needed) - 1
+            if i >= 0 and needed < starts[i] + runs[i][1]:
+                self._scores[needed] = runs[i][0]
+
+    def count(self) -> int:
+        return self._moments.n
+
+    def _has_positions(self) -> bool:
+        if self.is_empty():
+            return False
+
+        if self.count() != self.expected_count or len(self._scores) != len(self._needed_positions):
+            logger.warning(
+                f"'{self.name}' expected {self.expected_count} records but got {self.count()}, cannot determine quartiles")
+            return False
+
+        return True
+
+    def _prepare(self) -> None:
+        self._valid_positions = self._has_positions()
+
+    def _percentile(self, percent: int) -> float | None:
+        if not self._valid_positions:
+            return None
+
+        f, c, fraction = _percentile_positions(
+            n=self.expected_count, percent=percent)
+        return self._scores[f] + (self._scores[c] - self._scores[f]) * fraction
+
+    def _median(self) -> float | None:
+        if not self._valid_positions:
+            return None
+
+        f, c = _median_positions(n=self.expected_count)
+        return self._scores[f] if f == c \
+            else (self._scores[f] + self._scores[c]) / 2
+
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        return self._moments.sums()
+
+    def _merge(self, other: 'RankedCategoryInfo') -> None:
+        if (self.expected_count, self.first_rank) != (other.expected_count, other.first_rank):
+            raise ValueError(
+                "cannot merge ranked category infos with a different expected count or first rank")
+        self._moments.merge(other._moments)
+        self._scores.update(other._scores)
+
+    def _state(self) -> dict[str, Any]:
+        return {
+            "expected_count": self.expected_count,
+            "first_rank": self.first_rank,
+            "moments": self._moments.to_dict(),
+            "scores": [[position, score] for position, score in self._scores.items()],
+        }
+
+    @classmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> 'RankedCategoryInfo':
+        obj = cls(name=name, ts=ts,
+                  expected_count=state["expected_count"], first_rank=state["first_rank"])
+        obj._moments = RunningMoments.from_dict(state["moments"])
+        obj._scores = {position: score for position, score in state["scores"]}
+        return obj
+
+
+class ColumnarCategoryInfo(BaseCategoryInfo):
+    """
+    Aggregates statistics for a highscore category in growable int64 NumPy columns.
+
+    Ranks and scores are stored column wise instead of as `CategoryRecord` objects,
+    all statistics, percentiles and histograms are calculated vectorized.
+    The summary additionally holds the given `percentiles` and a histogram of `histogram_bins` bins (0 leaves it out).
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+
+    def __init__(self, name: str, ts: datetime, capacity: int = 1024, percentiles: Sequence[float] = (),
+                 histogram_bins: int = 0):
+        if np is None:
+            raise ImportError(
+                "the columnar category mode requires numpy, install it with 'pip install numpy'")
+
+        super().__init__(name=name, ts=ts)
+        self.percentiles = list(percentiles)
+        self.histogram_bins = histogram_bins
+        self._n = 0
+        self._ranks = np.empty(max(capacity, 1), dtype=np.int64)
+        self._scores = np.empty(max(capacity, 1), dtype=np.int64)
+
+    @property
+    def ranks(self):
+        return self._ranks[:self._n]
+
+    @property
+    def scores(self):
+        return self._scores[:self._n]
+
+    def _grow(self) -> None:
+        capacity = len(self._scores) * 2
+        ranks = np.empty(capacity, dtype=np.int64)
+        scores = np.empty(capacity, dtype=np.int64)
+        ranks[:self._n] = self._ranks[:self._n]
+        scores[:self._n] = self._scores[:self._n]
+        self._ranks, self._scores = ranks, scores
+
+    def add(self, record: CategoryRecord) -> None:
+        """ Add a CategoryRecord to the aggregation """
+        super().add(record=record)
+
+        if self._n == len(self._scores):
+            self._grow()
+
+        self._ranks[self._n] = record.rank
+        self._scores[self._n] = record.score
+        self._n += 1
+
+    def add_many(self, records: Sequence[CategoryRecord]) -> None:
+        """ Add several CategoryRecords with a single column copy instead of a scalar assignment per record. """
+        if not records:
+            return
+
+        # plain lists convert faster than np.fromiter for page sized batches
+        ranks = [record.rank for record in records]
+        scores = [record.score for record in records]
+        self._total_score += sum(scores)
+
+        best, worst = records[ranks.index(
+            min(ranks))], records[ranks.index(max(ranks))]
+        if not self._max or self._max.is_worse_rank_than(best):
+            self._max = best
+        if not self._min or self._min.is_better_rank_than(worst):
+            self._min = worst
+
+        self._extend(ranks, scores)
+
+    def add_column(self, first_rank: int, scores: Sequence[int], usernames: Sequence[str]) -> None:
+        """ Add records of contiguous ranks starting at `first_rank` given as columns. """
+        self._add_column_bounds(first_rank, scores, usernames)
+        self._extend(np.arange(first_rank, first_rank + len(scores), dtype=np.int64),
+                     np.asarray(scores, dtype=np.int64))
+
+    def add_runs(self, first_rank: int, runs: Sequence[tuple[int, int]], usernames: Sequence[str]) -> None:
+        """ Add `(score, count)` runs of tied scores starting at `first_rank`, runs are expanded vectorized. """
+        self._add_runs_bounds(first_rank, runs, usernames)
+        if not runs:
+            return
+        run_scores, counts = zip(*runs)
+        count = sum(counts)
+        self._extend(np.arange(first_rank, first_rank + count, dtype=np.int64),
+                     np.repeat(np.asarray(run_scores, dtype=np.int64), counts))
+
+    def count(self) -> int:
+        return self._n
+
+    def percentile(self, percent: float) -> float | None:
+        """ Calculate an arbitrary percentile (0-100) with linear interpolation. """
+        if self.is_empty():
+            return None
+        return float(np.percentile(self.scores, percent))
+
+    def histogram(self, bins: int | list[float] = 10) -> tuple[list[int], list[float]]:
+        """ Calculate a histogram of the scores, returns the counts per bin and the bin edges. """
+        if self.is_empty():
+            return ([], [])
+        counts, edges = np.histogram(self.scores, bins=bins)
+        return (counts.tolist(), edges.tolist())
+
+    def _percentile(self, percent: int) -> float | None:
+        return self.percentile(percent)
+
+    def _median(self) -> float | None:
+        if self.is_empty():
+            return None
+
+        n = self._n
+        f, c = _median_positions(n=n)
+        # positions are counted from the best rank, scores are partitioned ascending
+        partitioned = np.partition(self.scores, (n - 1 - f, n - 1 - c))
+        low, high = int(partitioned[n - 1 - f]), int(partitioned[n - 1 - c])
+        return low if f == c else (low + high) / 2
+
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        if self.is_empty():
+            return (0, 0, 0)
+
+        delta = self.scores - self._total_score / self._n
+        squared = delta * delta
+        return (float(squared.sum()), float((squared * delta).sum()), float((squared * squared).sum()))
+
+    def _extend(self, ranks: Any, scores: Any) -> None:
+        while self._n + len(scores) > len(self._scores):
+            self._grow()
+        self._ranks[self._n:self._n + len(ranks)] = ranks
+        self._scores[self._n:self._n + len(scores)] = scores
+        self._n += len(scores)
+
+    def _merge(self, other: 'ColumnarCategoryInfo') -> None:
+        self._extend(other.ranks, other.scores)
+
+    def _state(self) -> dict[str, Any]:
+        return {"ranks": self.ranks.tolist(), "scores": self.scores.tolist(),
+                "percentiles": self.percentiles, "histogram_bins": self.histogram_bins}
+
+    @classmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> 'ColumnarCategoryInfo':
+        obj = cls(name=name, ts=ts, capacity=len(state["scores"]), percentiles=state.get("percentiles", ()),
+                  histogram_bins=state.get("histogram_bins", 0))
+        obj._extend(state["ranks"], state["scores"])
+        return obj
+
+    def to_dict(self) -> dict[str, Any]:
+        result = super().to_dict()
+        if self.percentiles:
+            result["percentiles"] = {f"{percent:g}": self.percentile(
+                percent) for percent in self.percentiles}
+        if self.histogram_bins > 0:
+            counts, edges = self.histogram(self.histogram_bins)
+            result["histogram"] = {"counts": counts, "edges": edges}
+        return result
+
+
+class SampledCategoryInfo(BaseCategoryInfo):
+    """
+    Estimates the statistics of a highscore category of `expected_count` records from a sample of its pages.
+
+    Pages are sorted on score, so the quartiles, median, best and worst record are exact from the few pages holding
+    their ranks (`required_pages`). Total, mean and the moments are estimated from the randomly drawn pages of
+    a `StratifiedPageSample`, the summary gets the confidence interval of the mean and total as `estimate`.
+    """
+
+    def __init__(self, name: str, ts: datetime, expected_count: int, strata: int = DEFAULT_STRATA,
+                 confidence: float = DEFAULT_CONFIDENCE, seed: int | None = None):
+        super().__init__(name=name, ts=ts)
+        self.expected_count = expected_count
+        self.sample = StratifiedPageSample(record_count=expected_count, page_size=HS_PAGE_SIZE, strata=strata,
+                                           confidence=confidence, seed=seed)
+        self._scores: dict[int, int] = {}
+        self._needed_positions: set[int] = set()
+
+        if expected_count > 0:
+            self._needed_positions.update(_median_positions(n=expected_count))
+            for percent in (25, 50, 75):
+                f, c, _ = _percentile_positions(
+                    n=expected_count, percent=percent)
+                self._needed_positions.update((f, c))
+
+    def required_pages(self) -> list[int]:
+        """ Pages holding the best and worst record and the ranks the quartiles and median are taken from. """
+        if self.expected_count <= 0:
+            return []
+        pages = {1, self.sample.page_count}
+        pages.update(position // HS_PAGE_SIZE +
+                     1 for position in self._needed_positions)
+        return sorted(pages)
+
+    def add(self, record: CategoryRecord) -> None:
+        """ Add a CategoryRecord for the exact statistics, only pages added with `add_page` count for the estimates. """
+        if not self._max or self._max.is_worse_rank_than(record):
+            self._max = record
+        if not self._min or self._min.is_better_rank_than(record):
+            self._min = record
+
+        position = record.rank - 1
+        if position in self._needed_positions:
+            self._scores[position] = record.score
+
+    def add_page(self, page_num: int, records: Sequence[CategoryRecord]) -> None:
+        """ Add the records of a fetched page, pages drawn by the sample also count for the estimates. """
+        for record in records:
+            self.add(record)
+        if self.sample.is_drawn(page_num):
+            self.sample.add_page(
+                page_num, [record.score for record in records])
+
+    def count(self) -> int:
+        return self.expected_count
+
+    def _prepare(self) -> None:
+        self._total_score = round(self.sample.total())
+
+    def _percentile(self, percent: int) -> float | None:
+        if self.is_empty() or len(self._scores) != len(self._needed_positions):
+            return None
+
+        f, c, fraction = _percentile_positions(
+            n=self.expected_count, percent=percent)
+        return self._scores[f] + (self._scores[c] - self._scores[f]) * fraction
+
+    def _median(self) -> float | None:
+        if self.is_empty() or len(self._scores) != len(self._needed_positions):
+            return None
+
+        f, c = _median_positions(n=self.expected_count)
+        return self._scores[f] if f == c \
+            else (self._scores[f] + self._scores[c]) / 2
+
+    def _central_moment_sums(self) -> tuple[float, float, float]:
+        return self.sample.central_moment_sums(self._total_score / self.expected_count if self.expected_count else 0.0)
+
+    def _merge(self, other: 'SampledCategoryInfo') -> None:
+        raise ValueError(
+            "sampled category infos can't be merged, their samples were drawn independently")
+
+    def _state(self) -> dict[str, Any]:
+        raise ValueError("sampled category infos don't keep a partial state")
+
+    @classmethod
+    def _from_state(cls, name: str, ts: datetime, state: dict[str, Any]) -> 'SampledCategoryInfo':
+        raise ValueError("sampled category infos don't keep a partial state")
+
+    def to_dict(self) -> dict[str, Any]:
+        result = super().to_dict()
+        mean_low, mean_high = self.sample.mean_interval()
+        result["estimate"] = {
+            "pages": self.sample.pages(),
+            "page_count": self.sample.page_count,
+            "confidence": self.sample.confidence,
+            "relative_error": self.sample.relative_error(),
+            "mean": [mean_low, mean_high],
+            "total_score": [mean_low * self.expected_count, mean_high * self.expected_count],
+        }
+        return result
+
+
+def _percentile_positions(n: int, percent: int) -> tuple[int, int, float]:
+    """
+    Returns the two positions (best rank first) to interpolate between and the interpolation fraction
+    for a percentile of `n` scores ordered from large to small.
+    """
+    # have to reverse this since data goes from large to small
+    percent = 100 - percent
+
+    k = (n - 1) * (percent / 100)
+    f = int(k)
+    c = min(f + 1, n - 1)
+    return (f, c, k - f)
+
+
+def _median_positions(n: int) -> tuple[int, int]:
+    """ Returns the two positions that are averaged into the median of `n` ordered scores. """
+    mid = n >> 1
+    return (mid, mid) if (n & 1) == 0 else (mid - 1, mid)
+
+
+class CategoryInfoMode(Enum):
+    """ Enum of the available category aggregation strategies. """
+    exact = CategoryInfo
+    streaming = StreamingCategoryInfo
+    ranked = RankedCategoryInfo
+    columnar = ColumnarCategoryInfo
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def from_string(s: str) -> 'CategoryInfoMode':
+        try:
+            return CategoryInfoMode[s.lower()]
+        except KeyError:
+            valid_values = ', '.join(CategoryInfoMode.__members__.keys())
+            raise KeyError(f'value given: {s}, valid values [{valid_values}]')
+
+    def create(self, name: str, ts: datetime, **kwargs) -> BaseCategoryInfo:
+        """ Instantiate the aggregation for this mode, `kwargs` are mode specific options. """
+        return self.value(name=name, ts=ts, **kwargs)
+
+    @staticmethod
+    def from_state(state: dict[str, Any]) -> BaseCategoryInfo:
+        """ Restore an aggregation from the output of `BaseCategoryInfo.to_state`. """
+        return CategoryInfoMode.from_string(state["mode"]).value.from_state(state)
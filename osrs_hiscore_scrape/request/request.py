@@ -1,5 +1,7 @@
 import datetime
 import threading
+import time
+from dataclasses import dataclass
 from typing import Any, Callable, Dict
 
 from aiohttp import ClientConnectionError, ClientSession, ClientTimeout
@@ -10,6 +12,7 @@ from ..exception.records import (IsRateLimited, NotFound, ParsingFailed,
                                  RequestFailed, ServerBusy)
 from ..log.logger import get_logger
 from ..statistic.calculators import calc_skill_level
+from ..util.player_store import PlayerStore
 from ..util.predicate_utils import get_comparison
 from ..util.retry_handler import retry
 from .constants import HS_PAGE_SIZE, MAX_CATEGORY_SIZE
@@ -22,15 +25,29 @@ from .records import CategoryRecord, PlayerRecord
 logger = get_logger(__name__)
 
 
+@dataclass
+class RequestStats:
+    """ Accounting of the http requests made through a `Requests`, failed ones included. """
+    requests: int = 0
+    seconds: float = 0.0
+    rate_limited: int = 0
+
+    def latency(self) -> float | None:
+        """ Mean seconds a request took, None before the first one. """
+        return self.seconds / self.requests if self.requests else None
+
+
 class Requests():
     """
     Wrapper for an aiohttp ClientSession that optionally supports
-    rotating proxies and cookie management.
+    rotating proxies, cookie management and a local store of player records.
     """
 
-    def __init__(self, session: ClientSession, proxy_list: list[str] | None = None):
+    def __init__(self, session: ClientSession, proxy_list: list[str] | None = None, store: PlayerStore | None = None):
         self.session = session
         self.proxy_list = proxy_list
+        self.store = store
+        self.stats = RequestStats()
         self._proxy_idx = 0
         self._proxy_lock = threading.Lock()
         self._session_lock = threading.Lock()
@@ -172,11 +189,38 @@ class Requests():
             f"Page range found: {start_page}-{end_page} ({start_rank}-{end_rank})")
         return GetFilteredPageRangeResult(start_page=start_page, start_rank=start_rank, end_page=end_page, end_rank=end_rank)
 
-    async def get_user_stats(self, player_req: GetPlayerRequest) -> PlayerRecord:
-        """ Fetch and parse a player's stats from OSRS hiscores. """
-        csv = await self.https_request(player_req.account_type.api_csv(), {'player': player_req.username})
+    async def get_user_stats(self, player_req: GetPlayerRequest, max_age: float | None = None) -> PlayerRecord:
+        """
+        Fetch and parse a player's stats from OSRS hiscores.
+        With a player store, records stored within `max_age` (the store's by default) are returned
+        without a request and fetched ones are stored. Players the store knows to be missing raise NotFound without a request.
+
+        Raises:
+            NotFound: If the player isn't on the hiscores.
+        """
+        if self.store is not None:
+            record = self.store.get(
+                player_req.account_type, player_req.username, max_age=max_age)
+            if record is not None:
+                return record
+            if self.store.is_not_found(player_req.account_type, player_req.username):
+                raise NotFound("Not found (cached)", details={"username": player_req.username,
+                                                              "account_type": player_req.account_type.name})
+
+        try:
+            csv = await self.https_request(player_req.account_type.api_csv(), {'player': player_req.username})
+        except NotFound:
+            if self.store is not None:
+                self.store.put_not_found(
+                    player_req.account_type, player_req.username)
+            raise
         csv = [line for line in csv.split('\n') if line]
-        return PlayerRecord(username=player_req.username, csv=csv, ts=datetime.datetime.now(datetime.timezone.utc))
+        record = PlayerRecord(username=player_req.username, csv=csv,
+                              ts=datetime.datetime.now(datetime.timezone.utc))
+
+        if self.store is not None:
+            self.store.put(player_req.account_type, record)
+        return record
 
     async def get_hs_page(self, page_req: GetHighscorePageRequest) -> list[CategoryRecord]:
         """ Fetch and parse a page of highscores for a specific category and account type. """
@@ -209,10 +253,12 @@ class Requests():
         proxy = self.get_proxy()
         session = self.get_session()
 
+        start = time.perf_counter()
         try:
             async with session.get(url, headers=headers, params=params, proxy=proxy, timeout=ClientTimeout(total=30)) as resp:
                 text = await resp.text()
                 if resp.status == 429 or _is_rate_limited(text):
+                    self.stats.rate_limited += 1
                     raise IsRateLimited(
                         f"rate limited: '{url}'", details={"url": resp.url, "params": params, "proxy": proxy, "headers": resp.headers})
 
@@ -229,6 +275,9 @@ class Requests():
             raise ServerBusy("timed out")
         except ClientConnectionError as e:
             raise RequestFailed(f"client connection error: {e}")
+        finally:
+            self.stats.requests += 1
+            self.stats.seconds += time.perf_counter() - start
 
     async def get_hs_ranks(self, page_req: GetHighscorePageRequest) -> list[int]:
         """ Gets the ranks of a hs page, empty list if page doesnt exist """
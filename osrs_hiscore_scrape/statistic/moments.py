@@ -0,0 +1,83 @@
+class RunningMoments:
+    """
+    One-pass accumulator for the mean and the 2nd, 3rd and 4th central moment sums.
+
+    Updates use the numerically stable formulas from Terriberry/Pébay, so values
+    never have to be kept around for a second pass.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def add(self, x: int | float, count: int = 1) -> None:
+        """ Add an observation, `count` adds a run of identical observations in one step. """
+        if count != 1:
+            if count > 0:
+                run = RunningMoments()
+                run.n, run.mean = count, x
+                self.merge(run)
+            return
+
+        n1 = self.n
+        self.n += 1
+        n = self.n
+
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) \
+            + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    def sums(self) -> tuple[float, float, float]:
+        """ Returns the sum of squared, cubed and quartic deltas from the mean in that order. """
+        return (self.m2, self.m3, self.m4)
+
+    def merge(self, other: 'RunningMoments') -> None:
+        """ Merge the observations of another accumulator into this one (Pébay's pairwise update). """
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean, other.m2, other.m3, other.m4
+            return
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+
+        mean = self.mean + delta * nb / n
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = self.m3 + other.m3 \
+            + delta2 * delta * na * nb * (na - nb) / (n * n) \
+            + 3 * delta * (na * other.m2 - nb * self.m2) / n
+        m4 = self.m4 + other.m4 \
+            + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n * n * n) \
+            + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / (n * n) \
+            + 4 * delta * (na * other.m3 - nb * self.m3) / n
+
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+
+    def to_dict(self) -> dict[str, int | float]:
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "m2": self.m2,
+            "m3": self.m3,
+            "m4": self.m4,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, int | float]) -> 'RunningMoments':
+        obj = cls()
+        obj.n = int(data["n"])
+        obj.mean, obj.m2, obj.m3, obj.m4 = data["mean"], data["m2"], data["m3"], data["m4"]
+        return obj
@@ -0,0 +1,263 @@
+import math
+import random
+from statistics import NormalDist
+from typing import Sequence
+
+DEFAULT_STRATA: int = 10
+DEFAULT_CONFIDENCE: float = 0.95
+DEFAULT_PRECISION: float = 0.01
+# pages every stratum gets before its spread is trusted
+MIN_STRATUM_PAGES: int = 5
+
+
+class StratifiedPageSample:
+    """
+    Stratified random sample of the pages of a category, estimating its total and mean score.
+
+    The `page_count` pages are split into `strata` contiguous page ranges of geometrically growing size. Hiscore pages
+    are sorted on score, so pages within a stratum are alike and few of them estimate its total well, while the
+    few top pages that spread the most are (nearly) taken in full. Every sampled page is a cluster
+    of its scores, the estimator is the stratified (Horvitz-Thompson) total with the analytic variance of
+    sampling pages without replacement. `next_pages` grows the sample with Neyman allocation, strata with
+    the most spread get the most pages.
+    """
+
+    def __init__(self, record_count: int, page_size: int, strata: int = DEFAULT_STRATA,
+                 confidence: float = DEFAULT_CONFIDENCE, seed: int | None = None):
+        if not 0 < confidence < 1:
+            raise ValueError(
+                f"Confidence has to be between 0 and 1, got {confidence}")
+        self.record_count = record_count
+        self.page_size = page_size
+        self.page_count = -(-record_count // page_size)
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self._rng = random.Random(seed)
+
+        # stratum i ends at page page_count^(i/strata), sizes grow geometrically from the top down
+        ends = sorted({max(1, round(self.page_count ** (i / max(strata, 1))))
+                      for i in range(1, max(strata, 1) + 1)})
+        self.strata = [(first + 1, last) for first,
+                       last in zip([0] + ends, ends)] if self.page_count else []
+        self._pages: list[dict[int, Sequence[int]]] = [{} for _ in self.strata]
+        self._unsampled = [list(range(first, last + 1))
+                           for first, last in self.strata]
+        self._drawn: set[int] = set()
+
+    def pages(self) -> int:
+        """ Amount of sampled pages. """
+        return sum(len(pages) for pages in self._pages)
+
+    def is_complete(self) -> bool:
+        """ Whether every page got sampled, the estimates are exact from there. """
+        return self.pages() == self.page_count
+
+    def is_drawn(self, page_num: int) -> bool:
+        """ Whether a page was drawn by `next_pages`, only those count for the estimates. """
+        return page_num in self._drawn
+
+    def add_page(self, page_num: int, scores: Sequence[int]) -> None:
+        """ Adds the scores of a drawn page. """
+        self._pages[self._stratum(page_num)][page_num] = scores
+
+    def next_pages(self, count: int) -> list[int]:
+        """
+        Draws up to `count` pages that weren't sampled yet. Strata below `MIN_STRATUM_PAGES` are filled first,
+        the rest is spread proportional to each stratum's page count times the spread of its page totals.
+        """
+        draws = [min(len(unsampled), max(0, MIN_STRATUM_PAGES - len(self._pages[h])))
+                 for h, unsampled in enumerate(self._unsampled)]
+        weights = [self._stratum_size(h) * self._stratum_deviation(h)
+                   for h in range(len(self.strata))]
+        if not any(weights):
+            # no spread anywhere (yet), spread evenly
+            weights = [1.0] * len(self.strata)
+
+        # every next page goes to the stratum furthest below its share of the whole sample
+        for _ in range(count - sum(draws)):
+            open_strata = [h for h in range(len(self.strata)) if len(
+                self._unsampled[h]) > draws[h] and weights[h]]
+            if not open_strata:
+                break
+            h = max(
+                open_strata, key=lambda h: weights[h] / (len(self._pages[h]) + draws[h] + 1))
+            draws[h] += 1
+
+        drawn = []
+        for h, amount in enumerate(draws):
+            unsampled = self._unsampled[h]
+            for _ in range(amount):
+                # swap remove, order of the unsampled pages doesn't matter
+                i = self._rng.randrange(len(unsampled))
+                unsampled[i], unsampled[-1] = unsampled[-1], unsampled[i]
+                drawn.append(unsampled.pop())
+        self._drawn.update(drawn)
+        return sorted(drawn)
+
+    def total(self) -> float:
+        """ Estimated sum of the scores of every record. """
+        return sum(self._stratum_size(h) * _mean([sum(scores) for scores in pages.values()])
+                   for h, pages in enumerate(self._pages) if pages)
+
+    def mean(self) -> float:
+        return self.total() / self.record_count if self.record_count else 0.0
+
+    def total_variance(self) -> float:
+        """ Variance of the estimated total, unknown (infinite) while a stratum has less than `MIN_STRATUM_PAGES` sampled pages. """
+        variance = 0.0
+        for h, pages in enumerate(self._pages):
+            size, sampled = self._stratum_size(h), len(pages)
+            if sampled == size:
+                continue
+            if sampled < MIN_STRATUM_PAGES:
+                return math.inf
+            variance += size * size * \
+                (1 - sampled / size) * \
+                _variance([sum(s) for s in pages.values()]) / sampled
+        return variance
+
+    def mean_interval(self) -> tuple[float, float]:
+        """ Confidence interval of the mean score. """
+        half = self.z * math.sqrt(self.total_variance()) / \
+            self.record_count if self.record_count else 0.0
+        mean = self.mean()
+        return (mean - half, mean + half)
+
+    def relative_error(self) -> float:
+        """ Half width of the mean's confidence interval relative to the mean. """
+        low, high = self.mean_interval()
+        half = (high - low) / 2
+        mean = abs(self.mean())
+        return half / mean if mean else (0.0 if half == 0 else math.inf)
+
+    def pages_needed(self, precision: float) -> int:
+        """
+        Sample size the Neyman allocation needs for a relative error of `precision` given the spread
+        seen so far, at least the current size. Every page if the spread of some stratum isn't known yet.
+        """
+        if any(len(pages) < MIN_STRATUM_PAGES and len(pages) < self._stratum_size(h) for h, pages in enumerate(self._pages)):
+            return self.page_count
+
+        target = (precision * self.total() / self.z) ** 2
+        spread = sum(self._stratum_size(h) * self._stratum_deviation(h)
+                     for h in range(len(self.strata)))
+        correction = sum(self._stratum_size(
+            h) * self._stratum_deviation(h) ** 2 for h in range(len(self.strata)))
+        if target + correction <= 0:
+            return self.pages()
+        return min(self.page_count, max(self.pages(), math.ceil(spread * spread / (target + correction))))
+
+    def central_moment_sums(self, mean: float) -> tuple[float, float, float]:
+        """ Estimated sum of squared, cubed and quartic deltas from `mean` over every record. """
+        sums = [0.0, 0.0, 0.0]
+        for h, pages in enumerate(self._pages):
+            if not pages:
+                continue
+            weight = self._stratum_size(h) / len(pages)
+            for scores in pages.values():
+                for score in scores:
+                    delta = score - mean
+                    sums[0] += weight * delta ** 2
+                    sums[1] += weight * delta ** 3
+                    sums[2] += weight * delta ** 4
+        return (sums[0], sums[1], sums[2])
+
+    def _stratum(self, page_num: int) -> int:
+        for h, (first, last) in enumerate(self.strata):
+            if first <= page_num <= last:
+                return h
+        raise ValueError(
+            f"page {page_num} isn't part of the category (1-{self.page_count})")
+
+    def _stratum_size(self, h: int) -> int:
+        first, last = self.strata[h]
+        return last - first + 1
+
+    def _stratum_deviation(self, h: int) -> float:
+        totals = [sum(scores) for scores in self._pages[h].values()]
+        return math.sqrt(_variance(totals)) if len(totals) > 1 else 0.0
+
+
+def split_strata(first: int, last: int, strata: int = DEFAULT_STRATA) -> list[tuple[int, int]]:
+    """ Splits the inclusive range `first`-`last` into at most `strata` contiguous ranges of about equal size. """
+    size = last - first + 1
+    strata = max(1, min(strata, size))
+    bounds = [first + size * i // strata for i in range(strata + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(strata)]
+
+
+def draw_stratified(strata: list[tuple[int, int]], sample_size: int, rng: random.Random) -> list[tuple[int, int]]:
+    """
+    Draws about `sample_size` distinct values of the strata, proportional to their size and at least one
+    of every stratum. Returns `(stratum, value)` pairs ordered by value.
+    """
+    total = sum(last - first + 1 for first, last in strata)
+    drawn = []
+    for h, (first, last) in enumerate(strata):
+        size = last - first + 1
+        amount = min(size, max(1, round(sample_size * size / total)))
+        drawn.extend((h, value)
+                     for value in rng.sample(range(first, last + 1), amount))
+    return sorted(drawn, key=lambda draw: draw[1])
+
+
+class StratifiedProportion:
+    """
+    Stratified estimate of the share of a population meeting a condition, from simple random samples
+    (without replacement) of its strata of `sizes`.
+    """
+
+    def __init__(self, sizes: list[int], confidence: float = DEFAULT_CONFIDENCE):
+        if not 0 < confidence < 1:
+            raise ValueError(
+                f"Confidence has to be between 0 and 1, got {confidence}")
+        self.sizes = sizes
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self._hits = [0] * len(sizes)
+        self._samples = [0] * len(sizes)
+
+    def add(self, stratum: int, hit: bool) -> None:
+        self._samples[stratum] += 1
+        self._hits[stratum] += hit
+
+    def samples(self) -> int:
+        return sum(self._samples)
+
+    def proportion(self) -> float:
+        """ Estimated share, strata without samples count as the average of the sampled ones. """
+        sampled = [(size, self._hits[h] / self._samples[h])
+                   for h, size in enumerate(self.sizes) if self._samples[h]]
+        if not sampled:
+            return 0.0
+        return sum(size * share for size, share in sampled) / sum(size for size, _ in sampled)
+
+    def interval(self) -> tuple[float, float]:
+        """ Confidence interval of the share, clipped to 0-1. """
+        total = sum(size for h, size in enumerate(
+            self.sizes) if self._samples[h])
+        if not total:
+            return (0.0, 1.0)
+
+        variance = 0.0
+        for h, size in enumerate(self.sizes):
+            n = self._samples[h]
+            if not n or n >= size:
+                continue
+            # Agresti-Coull adjusted share, so a stratum without (or only) hits still has some spread
+            share = (self._hits[h] + 1) / (n + 2)
+            variance += (size / total) ** 2 * (1 - n / size) * \
+                share * (1 - share) / n
+
+        half = self.z * math.sqrt(variance)
+        proportion = self.proportion()
+        return (max(0.0, proportion - half), min(1.0, proportion + half))
+
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values)
+
+
+def _variance(values: Sequence[float]) -> float:
+    mean = _mean(values)
+    return sum((value - mean) ** 2 for value in values) / (len(values) - 1)
@@ -0,0 +1,175 @@
+import math
+import random
+from typing import Any
+
+DEFAULT_QUANTILE_ERROR: float = 0.01
+_MIN_K: int = 8
+
+
+def k_for_error(error: float) -> int:
+    """
+    Estimate the KLL `k` parameter for a normalized rank error bound.
+
+    Uses the empirical fit of the Apache DataSketches KLL implementation
+    (error ~= 2.296 / k^0.9723), e.g. an error of 0.0133 gives k=200.
+
+    Raises:
+        ValueError: If `error` is not between 0 and 1.
+    """
+    if not 0 < error < 1:
+        raise ValueError(
+            f"Quantile error has to be between 0 and 1, got {error}")
+    return max(_MIN_K, math.ceil((2.296 / error) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty).
+
+    Keeps a hierarchy of compactors where an item at height `h` represents `2**h`
+    original items, memory is bounded by roughly `3k` items regardless of the stream size.
+    While no compaction has happened yet, quantiles are exact.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: int | None = None):
+        if k < _MIN_K:
+            raise ValueError(f"k has to be at least {_MIN_K}, got {k}")
+        self.k = k
+        self.c = c
+        self.n = 0
+        self._rng = random.Random(seed)
+        self._compactors: list[list[int | float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    @classmethod
+    def from_error(cls, error: float, seed: int | None = None) -> 'KLLSketch':
+        """ Create a sketch sized for the given normalized rank error. """
+        return cls(k=k_for_error(error), seed=seed)
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self._compactors) - height - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _grow(self) -> None:
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(h)
+                             for h in range(len(self._compactors)))
+
+    def _compact(self, height: int) -> None:
+        compactor = self._compactors[height]
+        compactor.sort()
+
+        # odd sized compactors keep their largest item at the current height
+        leftover = [compactor.pop()] if len(compactor) & 1 else []
+        offset = self._rng.getrandbits(1)
+
+        self._compactors[height + 1].extend(compactor[offset::2])
+        self._compactors[height] = leftover
+
+    def _compress(self) -> None:
+        for h in range(len(self._compactors)):
+            if len(self._compactors[h]) >= self._capacity(h):
+                if h + 1 >= len(self._compactors):
+                    self._grow()
+                self._compact(h)
+                self._size = sum(len(c) for c in self._compactors)
+                if self._size < self._max_size:
+                    break
+
+    def update(self, item: int | float, weight: int = 1) -> None:
+        """
+        Add an item to the sketch, `weight` adds a run of identical items in one step
+        by placing the item at the heights of the set bits of `weight`.
+        """
+        if weight == 1:
+            self._compactors[0].append(item)
+            self._size += 1
+            self.n += 1
+            if self._size >= self._max_size:
+                self._compress()
+            return
+
+        if weight <= 0:
+            return
+
+        while len(self._compactors) < weight.bit_length():
+            self._grow()
+
+        self.n += weight
+        for height in range(weight.bit_length()):
+            if weight >> height & 1:
+                self._compactors[height].append(item)
+                self._size += 1
+
+        while self._size >= self._max_size:
+            self._compress()
+
+    def is_empty(self) -> bool:
+        return self.n == 0
+
+    def _weighted_items(self) -> list[tuple[int | float, int]]:
+        items = [(item, 1 << h) for h, compactor in enumerate(self._compactors)
+                 for item in compactor]
+        items.sort(key=lambda x: x[0])
+        return items
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Approximate the `q` quantile (0 <= q <= 1) using linear interpolation
+        between the closest ranks, `None` when the sketch is empty.
+        """
+        if self.is_empty():
+            return None
+
+        items = self._weighted_items()
+        total = sum(w for _, w in items)
+
+        k = (total - 1) * q
+        f = int(k)
+        c = min(f + 1, total - 1)
+
+        low = high = None
+        cumulative = 0
+        for item, weight in items:
+            cumulative += weight
+            if low is None and f < cumulative:
+                low = item
+            if c < cumulative:
+                high = item
+                break
+
+        assert low is not None and high is not None
+        return low + (high - low) * (k - f)
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """ Merge another sketch into this one, both sketches should share the same `k`. """
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+
+        for h, compactor in enumerate(other._compactors):
+            self._compactors[h].extend(compactor)
+
+        self.n += other.n
+        self._size = sum(len(c) for c in self._compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "k": self.k,
+            "c": self.c,
+            "n": self.n,
+            "compactors": [list(c) for c in self._compactors],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], seed: int | None = None) -> 'KLLSketch':
+        obj = cls(k=data["k"], c=data["c"], seed=seed)
+        obj.n = data["n"]
+        obj._compactors = [list(c) for c in data["compactors"]]
+        obj._max_size = sum(obj._capacity(h)
+                            for h in range(len(obj._compactors)))
+        obj._size = sum(len(c) for c in obj._compactors)
+        return obj
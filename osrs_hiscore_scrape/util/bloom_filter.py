@@ -0,0 +1,41 @@
+import hashlib
+import math
+
+DEFAULT_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """
+    Compact probabilistic set of strings: `in` never misses an added key, but may report a key that wasn't added
+    with about `error_rate` probability once `capacity` keys were added. Keys can't be removed, so answers
+    that matter have to be confirmed elsewhere.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        # double hashing, two 64 bit halves of one digest stand in for `hashes` independent hash functions
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(
+            digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def is_full(self) -> bool:
+        """ Whether more than `capacity` keys were added, the error rate grows beyond `error_rate` from there. """
+        return self.count > self.capacity
@@ -0,0 +1,201 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from ..log.logger import get_logger
+from ..request.records import CategoryRecord, PlayerRecord
+from . import json_wrapper
+from .compression import codec_for, open_reader
+from .snapshot import CategorySnapshot, is_snapshot
+
+logger = get_logger(__name__)
+CHUNK_SIZE = 8 << 20
+
+
+@dataclass
+class ReadStats:
+    """ Line accounting of a bulk read, malformed lines are counted instead of logged one by one. """
+    records: int = 0
+    malformed: int = 0
+
+
+@dataclass
+class CategoryBatch:
+    """ Columns of consecutive category records of a file. """
+    ranks: list[int] = field(default_factory=list)
+    scores: list[int] = field(default_factory=list)
+    usernames: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def records(self) -> Iterator[CategoryRecord]:
+        for rank, score, username in zip(self.ranks, self.scores, self.usernames):
+            yield CategoryRecord(rank=rank, score=score, username=username)
+
+
+def chunk_bounds(file_path: str, chunk_size: int = CHUNK_SIZE) -> list[tuple[int, int]]:
+    """ Splits a file into `(start, end)` byte ranges of about `chunk_size`, every range ends at a line boundary. """
+    size = os.path.getsize(file_path)
+    bounds = []
+    with open(file_path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _read_lines(file_path: str, start: int, end: int) -> list[bytes]:
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start).splitlines()
+
+
+def _decode_category_chunk(file_path: str, start: int, end: int, backend: str) -> tuple[CategoryBatch, int]:
+    """ Decodes the category records of a byte range into columns, runs in a worker process. """
+    json_wrapper.use_backend(backend)
+    return _decode_category_lines(_read_lines(file_path, start, end))
+
+
+def _decode_category_lines(lines: list[bytes]) -> tuple[CategoryBatch, int]:
+    batch, malformed = CategoryBatch(), 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json_wrapper.loads(line)
+            rank, score, username = data["rank"], data["score"], data["username"]
+        except Exception:
+            malformed += 1
+            continue
+        batch.ranks.append(rank)
+        batch.scores.append(score)
+        batch.usernames.append(username)
+    return batch, malformed
+
+
+def _decode_player_chunk(file_path: str, start: int, end: int, backend: str) -> tuple[list[PlayerRecord], int]:
+    """ Decodes the player records of a byte range, runs in a worker process. """
+    json_wrapper.use_backend(backend)
+    return _decode_player_lines(_read_lines(file_path, start, end))
+
+
+def _decode_player_lines(lines: list[bytes]) -> tuple[list[PlayerRecord], int]:
+    records, malformed = [], 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            parsed = json_wrapper.loads(line)
+            records.append(PlayerRecord.from_dict(
+                parsed.get("record", parsed)))
+        except Exception:
+            malformed += 1
+    return records, malformed
+
+
+def _map_ordered(pool: Executor, fn: Callable, file_path: str, bounds: list[tuple[int, int]], window: int) -> Iterator:
+    """ Like `pool.map` but keeps at most `window` chunks in flight, so decoded chunks don't pile up in memory. """
+    backend = json_wrapper.backend()
+    pending: deque[Future] = deque()
+    chunks = iter(bounds)
+    for start, end in chunks:
+        pending.append(pool.submit(fn, file_path, start, end, backend))
+        if len(pending) >= window:
+            break
+
+    while pending:
+        result = pending.popleft().result()
+        next_chunk = next(chunks, None)
+        if next_chunk is not None:
+            pending.append(pool.submit(fn, file_path, *next_chunk, backend))
+        yield result
+
+
+def _read_compressed_chunks(file_path: str, decode: Callable, chunk_size: int) -> Iterator:
+    with open_reader(file_path) as f:
+        while lines := f.readlines(chunk_size):
+            yield decode(lines)
+
+
+def _read_chunks(file_path: str, fn: Callable, decode: Callable, workers: int | None, chunk_size: int, stats: ReadStats) -> Iterator:
+    """
+    Decodes the chunks of a file in file order, in a process pool when there is more than one chunk and worker.
+    Compressed files can't be split at byte offsets, those are decompressed and decoded in process.
+    """
+    if codec_for(file_path):
+        yield from _account(_read_compressed_chunks(file_path, decode, chunk_size), stats)
+    else:
+        bounds = chunk_bounds(file_path, chunk_size=chunk_size)
+        workers = min(workers or os.cpu_count() or 1, len(bounds))
+        if workers <= 1:
+            results = (fn(file_path, start, end, json_wrapper.backend())
+                       for start, end in bounds)
+            yield from _account(results, stats)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from _account(_map_ordered(pool, fn, file_path, bounds, window=2 * workers), stats)
+
+    if stats.malformed:
+        logger.warning(
+            f"Skipped {stats.malformed} invalid records in {file_path}")
+
+
+def _account(results: Iterator, stats: ReadStats) -> Iterator:
+    for decoded, malformed in results:
+        stats.records += len(decoded)
+        stats.malformed += malformed
+        yield decoded
+
+
+def read_category_batches(file_path: str, workers: int | None = None, chunk_size: int = CHUNK_SIZE,
+                          stats: ReadStats | None = None) -> Iterator[CategoryBatch]:
+    """
+    Reads category records as columnar batches in file order, chunks of about `chunk_size` bytes
+    are decoded by `workers` processes (all cores by default). Files of a single chunk are decoded in process.
+
+    Malformed lines are skipped and counted in `stats`, a single warning is logged at the end.
+    Binary category snapshots are read as one batch per block.
+    """
+    stats = stats if stats is not None else ReadStats()
+    if not file_path or not os.path.isfile(file_path):
+        return
+
+    if is_snapshot(file_path):
+        with CategorySnapshot(file_path) as snapshot:
+            for first_rank, scores, usernames in snapshot.blocks():
+                stats.records += len(scores)
+                yield CategoryBatch(ranks=list(range(first_rank, first_rank + len(scores))),
+                                    scores=scores, usernames=list(usernames))
+        return
+
+    yield from _read_chunks(file_path, _decode_category_chunk, _decode_category_lines, workers, chunk_size, stats)
+
+
+def read_category_records_bulk(file_path: str, workers: int | None = None, chunk_size: int = CHUNK_SIZE,
+                               stats: ReadStats | None = None) -> Iterator[CategoryRecord]:
+    """ Record wise version of `read_category_batches`. """
+    for batch in read_category_batches(file_path, workers=workers, chunk_size=chunk_size, stats=stats):
+        yield from batch.records()
+
+
+def read_player_records_bulk(file_path: str, workers: int | None = None, chunk_size: int = CHUNK_SIZE,
+                             stats: ReadStats | None = None) -> Iterator[PlayerRecord]:
+    """
+    Reads player records in file order, chunks of about `chunk_size` bytes are decoded by `workers`
+    processes (all cores by default). Malformed lines are skipped and counted in `stats`.
+    """
+    stats = stats if stats is not None else ReadStats()
+    if not file_path or not os.path.isfile(file_path):
+        return
+
+    for records in _read_chunks(file_path, _decode_player_chunk, _decode_player_lines, workers, chunk_size, stats):
+        yield from records
@@ -0,0 +1,250 @@
+import sqlite3
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import ContextManager, Iterable
+
+from ..log.logger import get_logger
+from ..request.dto import HSFilterEntry
+from ..request.hs_account_types import HSAccountTypes
+from ..request.hs_types import HSType
+from ..request.records import CategoryRecord
+from ..statistic.calculators import calc_skill_level
+from .player_store import _SQL_COMPARISONS, DEFAULT_MAX_AGE, username_key
+from .username_dictionary import USERNAMES_SCHEMA, load_incoming
+
+logger = get_logger(__name__)
+
+_SCHEMA = USERNAMES_SCHEMA + """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    account_type TEXT NOT NULL,
+    hs_type TEXT NOT NULL,
+    covered_ts REAL,
+    covered_rank INTEGER,
+    floor_score INTEGER,
+    UNIQUE (account_type, hs_type)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    category_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (category_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_user ON entries (user_id);
+CREATE INDEX IF NOT EXISTS entries_score ON entries (category_id, score);
+"""
+
+
+@dataclass
+class IndexEntry:
+    """ Listing of a player in a category as of `ts`. """
+    account_type: HSAccountTypes
+    hs_type: HSType
+    rank: int
+    score: int
+    ts: datetime
+
+
+@dataclass
+class _Coverage:
+    category_id: int
+    ts: float | None
+    rank: int | None
+    floor_score: int | None
+
+
+class CategoryIndex:
+    """
+    Persistent inverted index of hiscore page scrapes: username -> the categories the player is listed in,
+    with their rank and score. Usernames are interned in a dictionary, so every listing is a few integers.
+
+    A scrape starting at rank 1 covers the top of its category: a player that isn't listed in it scores at most
+    the lowest listed score, the floor. With those, filters on categories can be answered without any lookup,
+    `members` lists the players meeting them and `rejects` tells whether a candidate can't meet them.
+    Listings and coverage older than `max_age` seconds are ignored, a negative `max_age` never expires them.
+    """
+
+    def __init__(self, file_path: str, max_age: float = DEFAULT_MAX_AGE):
+        self.file_path = file_path
+        self.max_age = max_age
+        self.rejected = 0
+        self._conn = sqlite3.connect(file_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._coverage = self._load_coverage()
+
+    def add_snapshot(self, account_type: HSAccountTypes, hs_type: HSType, records: Iterable[CategoryRecord],
+                     ts: datetime) -> int:
+        """
+        Indexes the records of a category scraped at `ts`, listings older than `ts` are replaced.
+        Older listings within the scraped rank range that aren't in the scrape anymore are dropped,
+        those players moved out of the range. Returns the amount of records indexed.
+        """
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO categories (account_type, hs_type) VALUES (?, ?)", (account_type.name, hs_type.name))
+            category_id = self._conn.execute(
+                "SELECT id FROM categories WHERE account_type = ? AND hs_type = ?",
+                (account_type.name, hs_type.name)).fetchone()[0]
+
+            count = load_incoming(self._conn, records)
+            min_rank, max_rank, floor = self._conn.execute(
+                "SELECT MIN(rank), MAX(rank), MIN(score) FROM incoming").fetchone()
+
+            if count:
+                self._conn.execute("""
+                    DELETE FROM entries WHERE category_id = ? AND ts < ? AND rank BETWEEN ? AND ?""",
+                                   (category_id, ts.timestamp(), min_rank, max_rank))
+                self._conn.execute("""
+                    INSERT INTO entries (category_id, user_id, rank, score, ts)
+                    SELECT ?, u.id, i.rank, i.score, ? FROM incoming i JOIN usernames u ON u.username_key = i.username_key
+                    WHERE true
+                    ON CONFLICT (category_id, user_id) DO UPDATE SET rank = excluded.rank, score = excluded.score, ts = excluded.ts
+                    WHERE excluded.ts >= entries.ts""", (category_id, ts.timestamp()))
+
+                coverage = self._coverage.get(
+                    (account_type.name, hs_type.name))
+                if min_rank == 1 and (coverage is None or coverage.ts is None or ts.timestamp() >= coverage.ts):
+                    self._conn.execute(
+                        "UPDATE categories SET covered_ts = ?, covered_rank = ?, floor_score = ? WHERE id = ?",
+                        (ts.timestamp(), max_rank, floor, category_id))
+            self._conn.execute("DROP TABLE temp.incoming")
+
+        self._coverage = self._load_coverage()
+        logger.info(
+            f"indexed {count} {account_type.name} {hs_type.name} records")
+        return count
+
+    def lookup(self, username: str, account_type: HSAccountTypes | None = None) -> list[IndexEntry]:
+        """ Categories a player is listed in (of one account type if given), stale listings included. """
+        query = """
+            SELECT c.account_type, c.hs_type, e.rank, e.score, e.ts FROM entries e
+            JOIN usernames u ON u.id = e.user_id
+            JOIN categories c ON c.id = e.category_id
+            WHERE u.username_key = ?"""
+        params: list = [username_key(username)]
+        if account_type is not None:
+            query += " AND c.account_type = ?"
+            params.append(account_type.name)
+
+        return [IndexEntry(account_type=HSAccountTypes[account], hs_type=HSType[hs_type], rank=rank, score=score,
+                           ts=datetime.fromtimestamp(ts, tz=timezone.utc))
+                for account, hs_type, rank, score, ts in self._conn.execute(query + " ORDER BY c.hs_type", params)]
+
+    def members(self, account_type: HSAccountTypes, hs_filter: list[HSFilterEntry]) -> list[str]:
+        """
+        Usernames listed in every filtered category with a score meeting the filter, best score of the
+        first filtered category first. Players that would only meet the filter by not being listed aren't found.
+
+        Raises:
+            ValueError: If the filter is empty or a filtered stat isn't an indexed category of `account_type`.
+        """
+        if not hs_filter:
+            raise ValueError("an index query needs a filter")
+
+        joins, join_params, conditions, params = [], [], [], []
+        for i, entry in enumerate(hs_filter):
+            coverage = self._coverage.get(
+                (account_type.name, entry.hstype.name))
+            if coverage is None:
+                raise ValueError(
+                    f"{account_type.name} {entry.hstype.name} isn't indexed")
+            joins.append(
+                f"JOIN entries e{i} ON e{i}.user_id = u.id AND e{i}.category_id = ?")
+            join_params.append(coverage.category_id)
+            if self.max_age >= 0:
+                conditions.append(f"e{i}.ts >= ?")
+                params.append(time.time() - self.max_age)
+            # skill scores are experience while filters compare levels, those are only checked below
+            if not entry.hstype.is_skill() and entry.comparison in _SQL_COMPARISONS:
+                conditions.append(
+                    f"e{i}.score {_SQL_COMPARISONS[entry.comparison]} ?")
+                params.append(entry.value)
+
+        query = f"""
+            SELECT u.username, {", ".join(f"e{i}.score" for i in range(len(hs_filter)))}
+            FROM usernames u {" ".join(joins)}
+            WHERE {" AND ".join(conditions) or "true"} ORDER BY e0.score DESC, u.username_key"""
+        params = join_params + params
+
+        return [username for username, *scores in self._conn.execute(query, params)
+                if all(entry.predicate(_comparable_value(entry.hstype, score)) for entry, score in zip(hs_filter, scores))]
+
+    def rejects(self, account_type: HSAccountTypes, hs_filter: list[HSFilterEntry], username: str) -> bool:
+        """
+        Whether the index knows a player can't meet the filter, without looking them up: a listed score fails it,
+        or the player isn't listed in a covered category whose floor is below what the filter asks for.
+        """
+        covered = {entry.hstype.name: self._coverage.get(
+            (account_type.name, entry.hstype.name)) for entry in hs_filter}
+        if not any(covered.values()):
+            return False
+
+        oldest = time.time() - self.max_age if self.max_age >= 0 else float("-inf")
+        scores = {row[0]: row[1] for row in self._conn.execute("""
+            SELECT c.hs_type, e.score FROM entries e
+            JOIN usernames u ON u.id = e.user_id
+            JOIN categories c ON c.id = e.category_id
+            WHERE u.username_key = ? AND c.account_type = ? AND e.ts >= ?""",
+                                                               (username_key(username), account_type.name, oldest))}
+
+        for entry in hs_filter:
+            coverage = covered[entry.hstype.name]
+            if coverage is None:
+                continue
+            score = scores.get(entry.hstype.name)
+            if score is not None:
+                rejected = not entry.predicate(
+                    _comparable_value(entry.hstype, score))
+            else:
+                rejected = coverage.ts is not None and coverage.ts >= oldest \
+                    and _is_unreachable(entry, _comparable_value(entry.hstype, coverage.floor_score))
+            if rejected:
+                self.rejected += 1
+                return True
+        return False
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'CategoryIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def __aenter__(self) -> 'CategoryIndex':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def _load_coverage(self) -> dict[tuple[str, str], _Coverage]:
+        return {(account, hs_type): _Coverage(category_id, ts, rank, floor)
+                for category_id, account, hs_type, ts, rank, floor in self._conn.execute(
+                    "SELECT id, account_type, hs_type, covered_ts, covered_rank, floor_score FROM categories")}
+
+
+def open_category_index(file_path: str | None, max_age: float = DEFAULT_MAX_AGE) -> 'CategoryIndex | ContextManager[None]':
+    """ (Async) context manager of the index at `file_path`, yields None without a path. """
+    return CategoryIndex(file_path, max_age=max_age) if file_path else nullcontext()
+
+
+def _comparable_value(hs_type: HSType, score: int) -> int:
+    """ Page scores of skills are experience, filters compare levels (same as the filtered page range search). """
+    return calc_skill_level(score, show_virtual_lvl=False) if hs_type.is_skill() else score
+
+
+def _is_unreachable(entry: HSFilterEntry, floor: int | float) -> bool:
+    """ Whether no score of at most `floor` meets an entry, only lower bounds and equality can tell. """
+    if entry.value is None:
+        return False
+    if entry.comparison in (">=", "=="):
+        return entry.value > floor
+    if entry.comparison == ">":
+        return entry.value >= floor
+    return False
@@ -0,0 +1,156 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable
+
+try:
+    import zstandard
+except ImportError:  # optional codec
+    zstandard = None
+
+WRITE_BUFFER_SIZE = 1 << 20
+# uncompressed bytes a member should at least hold, every member restarts the compressor and adds a header
+MEMBER_SIZE = 8 << 20
+
+
+@dataclass(frozen=True)
+class Codec:
+    """ Compression format picked by file extension, `compressor` creates a streaming compressor for one member. """
+    name: str
+    extension: str
+    compressor: Callable[[], Any]
+    reader: Callable[[BinaryIO], BinaryIO]
+
+
+def _zstd_reader(raw: BinaryIO) -> BinaryIO:
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)  # type: ignore
+
+
+CODECS = [
+    Codec(name="gzip", extension=".gz",
+          compressor=lambda: zlib.compressobj(6, zlib.DEFLATED, 31),
+          reader=lambda raw: gzip.GzipFile(fileobj=raw, mode="rb")),  # type: ignore
+    Codec(name="bz2", extension=".bz2",
+          compressor=bz2.BZ2Compressor,
+          reader=lambda raw: bz2.BZ2File(raw, mode="rb")),  # type: ignore
+    Codec(name="xz", extension=".xz",
+          compressor=lambda: lzma.LZMACompressor(format=lzma.FORMAT_XZ),
+          reader=lambda raw: lzma.LZMAFile(raw, mode="rb")),  # type: ignore
+]
+if zstandard is not None:
+    CODECS.append(Codec(name="zstd", extension=".zst",
+                        compressor=lambda: zstandard.ZstdCompressor().compressobj(),  # type: ignore
+                        reader=_zstd_reader))
+
+
+def available_codecs() -> list[str]:
+    return [codec.name for codec in CODECS]
+
+
+def codec_for(file_path: str | None) -> Codec | None:
+    """ The codec matching the extension of `file_path`, None for uncompressed files. """
+    if not file_path:
+        return None
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
+    return next((codec for codec in CODECS if codec.extension == ext), None)
+
+
+class CompressedWriter:
+    """
+    Appending writer of a compressed file, every `flush` ends the current member (gzip member, xz/bz2 stream, zstd frame).
+
+    Every format reads concatenated members as one stream, so appending to a finished file is safe
+    and every flushed size is a member boundary: truncating the file to it leaves a valid file
+    and reading can start from it, which is what resuming relies on.
+    """
+
+    def __init__(self, file_path: str, codec: Codec, buffering: int = WRITE_BUFFER_SIZE):
+        self.codec = codec
+        self._raw = open(file_path, "ab", buffering=buffering)
+        self._compressor = None
+
+    def write(self, data: bytes) -> int:
+        if not data:
+            return 0
+        if self._compressor is None:
+            self._compressor = self.codec.compressor()
+        self._raw.write(self._compressor.compress(data))
+        return len(data)
+
+    def flush(self) -> None:
+        if self._compressor is not None:
+            self._raw.write(self._compressor.flush())
+            self._compressor = None
+        self._raw.flush()
+
+    def tell(self) -> int:
+        """ Size of the compressed file, only a member boundary right after `flush`. """
+        return self._raw.tell()
+
+    def fileno(self) -> int:
+        return self._raw.fileno()
+
+    @property
+    def closed(self) -> bool:
+        return self._raw.closed
+
+    def close(self) -> None:
+        if self._raw.closed:
+            return
+        self.flush()
+        self._raw.close()
+
+    def __enter__(self) -> 'CompressedWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _DecompressedReader(io.RawIOBase):
+    """ Raw stream over a decompressing reader that closes the underlying file as well. """
+
+    def __init__(self, raw: BinaryIO, stream: BinaryIO):
+        self._raw = raw
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:  # type: ignore
+        return self._stream.readinto(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+            self._raw.close()
+        super().close()
+
+
+def open_writer(file_path: str, buffering: int = WRITE_BUFFER_SIZE) -> BinaryIO:
+    """ Opens a file to append bytes to, compressed by its extension. """
+    codec = codec_for(file_path)
+    if codec is None:
+        return open(file_path, "ab", buffering=buffering)
+    # type: ignore
+    return CompressedWriter(file_path, codec, buffering=buffering)
+
+
+def open_reader(file_path: str, offset: int = 0) -> BinaryIO:
+    """
+    Opens a file for reading (decompressed) bytes by its extension, starting at byte `offset` of the file.
+    For compressed files `offset` has to be a member boundary, like the flushed offsets `CompressedWriter` produces.
+    """
+    raw = open(file_path, "rb")
+    if offset:
+        raw.seek(offset)
+    codec = codec_for(file_path)
+    if codec is None:
+        return raw
+    # type: ignore
+    return io.BufferedReader(_DecompressedReader(raw, codec.reader(raw)), buffer_size=WRITE_BUFFER_SIZE)
@@ -0,0 +1,177 @@
+import heapq
+import os
+import re
+import sys
+import tempfile
+from functools import lru_cache
+from itertools import groupby
+from typing import Any, Callable, Iterable, Iterator
+
+from ..log.logger import get_logger
+from . import json_wrapper
+from .compression import codec_for, open_reader, open_writer
+from .io import is_stdout
+
+logger = get_logger(__name__)
+DEFAULT_CHUNK_LINES = 1_000_000
+SPILL_BUFFER_SIZE = 1 << 20
+
+# a json number or string value, good enough for the flat keys written by this package
+_VALUE = rb'(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|"(?:[^"\\]|\\.)*")'
+
+
+@lru_cache(maxsize=None)
+def _key_pattern(key: str) -> re.Pattern:
+    return re.compile(rb'"' + re.escape(key.encode("utf-8")) + rb'"\s*:\s*' + _VALUE)
+
+
+def extract_value(line: bytes, key: str) -> int | float | str | None:
+    """
+    Extracts the value of the first `key` in a json line without decoding the whole line, None if it's missing.
+    Only number and string values are extracted, the first match is the top level one for the records written
+    by this package (`rank` of filtered records, `username` and `timestamp` of player records).
+    """
+    match = _key_pattern(key).search(line)
+    return _parse_value(match.group(1)) if match else None
+
+
+def _parse_value(raw: bytes) -> int | float | str:
+    if raw[0] == 34:  # '"'
+        return raw[1:-1].decode("utf-8") if b"\\" not in raw else json_wrapper.loads(raw)
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def line_key(key: str) -> Callable[[bytes], Any]:
+    """ Sort key of a line by its `key` value, None if the line doesn't have it. """
+    search = _key_pattern(key).search
+
+    def func(line: bytes) -> Any:
+        match = search(line)
+        return _parse_value(match.group(1)) if match else None
+    return func
+
+
+def _spill(lines: Iterable[bytes], temp_dir: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".spill", dir=temp_dir)
+    with os.fdopen(fd, "wb", buffering=SPILL_BUFFER_SIZE) as f:
+        f.writelines(lines)
+    return path
+
+
+def _read_spill(path: str) -> Iterator[bytes]:
+    with open(path, "rb", buffering=SPILL_BUFFER_SIZE) as f:
+        yield from f
+
+
+def external_sort(lines: Iterable[bytes], key: Callable[[bytes], Any], temp_dir: str | None = None,
+                  chunk_lines: int = DEFAULT_CHUNK_LINES) -> Iterator[bytes]:
+    """
+    Sorts newline terminated lines by `key` while holding at most `chunk_lines` lines in memory.
+    Lines `key` returns None for are yielded last in input order. The sort is stable.
+
+    Sorted runs of `chunk_lines` lines get spilled to temporary files which are k-way merged,
+    input that fits in a single run is sorted in memory.
+    Spill files are removed once the returned iterator is exhausted or closed.
+    """
+    spills: list[str] = []
+    with tempfile.TemporaryDirectory(prefix="osrs-sort-", dir=temp_dir) as spill_dir, \
+            open(os.path.join(spill_dir, "missing"), "w+b", buffering=SPILL_BUFFER_SIZE) as missing:
+        chunk: list[bytes] = []
+        keys: list[Any] = []
+
+        def sorted_chunk() -> list[bytes]:
+            # sorting plain keys instead of (key, line) tuples keeps the homogeneous compare fast path
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            return [chunk[i] for i in order]
+
+        for line in lines:
+            value = key(line)
+            if value is None:
+                missing.write(line)
+                continue
+            chunk.append(line)
+            keys.append(value)
+            if len(chunk) >= chunk_lines:
+                spills.append(_spill(sorted_chunk(), spill_dir))
+                chunk, keys = [], []
+
+        if not spills:
+            yield from sorted_chunk()
+        else:
+            spills.append(_spill(sorted_chunk(), spill_dir))
+            chunk, keys = [], []
+            logger.debug(f"merging {len(spills)} sorted runs")
+            yield from heapq.merge(*(_read_spill(path) for path in spills), key=key)
+
+        missing.seek(0)
+        yield from missing
+
+
+def dedup_usernames(lines: Iterable[bytes], temp_dir: str | None = None,
+                    chunk_lines: int = DEFAULT_CHUNK_LINES) -> Iterator[bytes]:
+    """
+    Drops lines of usernames that occur more than once, the line with the freshest `timestamp` is kept,
+    lines without a timestamp keep the last occurrence. Lines without a username are all kept.
+    Output is ordered by username.
+    """
+    username_of, timestamp_of = line_key("username"), line_key("timestamp")
+
+    for username, group in groupby(external_sort(lines, key=username_of, temp_dir=temp_dir, chunk_lines=chunk_lines),
+                                   key=username_of):
+        if username is None:
+            yield from group
+            continue
+
+        # the sort is stable, so on equal timestamps the later line in the input wins
+        freshest, freshest_ts = b"", ""
+        for line in group:
+            timestamp = timestamp_of(line)
+            timestamp = str(timestamp) if timestamp is not None else ""
+            if timestamp >= freshest_ts:
+                freshest, freshest_ts = line, timestamp
+        yield freshest
+
+
+def sort_records(in_file: str, out_file: str, key: str = "rank", dedup: bool = False,
+                 temp_dir: str | None = None, chunk_lines: int = DEFAULT_CHUNK_LINES) -> int:
+    """
+    Sorts a json lines file by `key` in bounded memory and writes it to `out_file`, which may be `in_file` itself
+    or '-' to stream the sorted lines to stdout. Both files are (de)compressed by their extension.
+    With `dedup` repeated usernames are dropped first, see `dedup_usernames`. Returns the amount of lines written.
+    """
+    def read_lines() -> Iterator[bytes]:
+        with open_reader(in_file) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                yield line if line.endswith(b"\n") else line + b"\n"
+
+    lines: Iterable[bytes] = read_lines()
+    if dedup:
+        lines = dedup_usernames(lines, temp_dir=temp_dir,
+                                chunk_lines=chunk_lines)
+
+    sorted_lines = external_sort(lines, key=line_key(
+        key), temp_dir=temp_dir, chunk_lines=chunk_lines)
+    count = 0
+    if is_stdout(out_file):
+        with open(sys.stdout.fileno(), "wb", buffering=SPILL_BUFFER_SIZE, closefd=False) as f:
+            for line in sorted_lines:
+                f.write(line)
+                count += 1
+        return count
+
+    # write next to the output and swap it in, so sorting in place never loses the input
+    codec = codec_for(out_file)
+    temp_path = f"{out_file}.partial" + (codec.extension if codec else "")
+    if os.path.isfile(temp_path):
+        os.remove(temp_path)
+    with open_writer(temp_path, buffering=SPILL_BUFFER_SIZE) as f:
+        for line in sorted_lines:
+            f.write(line)
+            count += 1
+    os.replace(temp_path, out_file)
+    return count
@@ -1,49 +1,288 @@
 import asyncio
+import io
 import os
 import sys
-from typing import Callable, Iterator
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 
 from tqdm import tqdm
 
-from ..job.records import HSLookupJob
+from ..job.checkpoint import JobJournal
+from ..job.records import HSLookupJob, SkippedJob
 from ..log.logger import get_logger
 from ..request.hs_account_types import HSAccountTypes
 from ..request.hs_types import HSType
 from ..request.records import CategoryRecord, PlayerRecord
 from . import json_wrapper
+from .compression import MEMBER_SIZE, codec_for, open_reader, open_writer
+from .offset_index import OffsetIndex, index_path
+from .snapshot import CategorySnapshot, is_snapshot
 
 logger = get_logger(__name__)
 ENCODING = "utf-8"
+WRITE_BUFFER_SIZE = 1 << 20
+DEFAULT_BATCH_SIZE = 512
+STDOUT = "-"
 
 
-async def write_records(in_queue: asyncio.Queue, out_file: str, format: Callable, total: int):
+@dataclass
+class WriterStats:
+    """ Throughput numbers published by `write_records`. """
+    written: int = 0
+    skipped: int = 0
+    queue_depth: int = 0
+    records_per_sec: float = 0.0
+
+
+def is_stdout(file_path: str | None) -> bool:
+    """ Whether the output path means streaming to stdout. """
+    return file_path == STDOUT
+
+
+def _open_output(out_file: str) -> BinaryIO:
+    """
+    Opens an output file to append to, compressed when its extension asks for it (see `compression`),
+    or a buffered binary stdout stream that leaves stdout open on close.
+    """
+    if is_stdout(out_file):
+        sys.stdout.flush()
+        return open(sys.stdout.fileno(), mode='wb', buffering=WRITE_BUFFER_SIZE, closefd=False)
+    return open_writer(out_file, buffering=WRITE_BUFFER_SIZE)
+
+
+def _open_text(file_path: str, offset: int = 0) -> io.TextIOWrapper:
+    """ Opens a (compressed) file for reading lines from byte `offset` on. """
+    # utf-8 decoding is stateless at line boundaries, so starting at a line's byte offset is fine
+    return io.TextIOWrapper(open_reader(file_path, offset=offset), encoding=ENCODING)
+
+
+def _is_skipped(record: Any) -> bool:
+    return record is None or isinstance(record, SkippedJob)
+
+
+def _write_batch(f: BinaryIO, batch: list[Any], format: Callable, offset: int) -> list[int | None]:
+    """
+    Formats and writes a batch in one chunk, runs off the event loop.
+    Returns the byte offset each record ends at, `None` for skipped records.
+    """
+    chunks, ends = [], []
+    for record in batch:
+        if _is_skipped(record):
+            ends.append(None)
+            continue
+        chunk = (format(record) + '\n').encode(ENCODING)
+        offset += len(chunk)
+        chunks.append(chunk)
+        ends.append(offset)
+
+    f.write(b"".join(chunks))
+    return ends
+
+
+def _flush(f: BinaryIO, fsync: bool):
+    f.flush()
+    if fsync:
+        os.fsync(f.fileno())
+
+
+async def _off_loop(fn: Callable, *args) -> Any:
+    """ Runs `fn` in a thread, on cancellation it's awaited first so the file isn't closed under it. """
+    task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
+
+
+async def write_records(in_queue: asyncio.Queue, out_file: str, format: Callable, total: int,
+                        checkpoint: Callable[[Any, int], None] | None = None, checkpoint_every: int = 0,
+                        journal: JobJournal | None = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                        flush_interval: float = 0.0, member_size: int = MEMBER_SIZE, fsync: bool = False,
+                        progress_interval: float = 1.0, index: OffsetIndex | None = None,
+                        index_key: Callable[[Any], int] = lambda record: record.priority) -> WriterStats:
     """
     Asynchronously writes records from a queue to a file.
 
-    This coroutine reads items from an asyncio.Queue and writes them to a specified file.
-    Each item is formatted using the provided formatting function before being written.
-    The function writes a total number of items specified by `total`. A progress bar is 
-    displayed during writing.
+    This coroutine drains items from an asyncio.Queue in batches of up to `batch_size` and writes them to a specified file.
+    Each item is formatted using the provided formatting function, formatting and writing happen in a thread
+    so the event loop keeps serving the workers. The function writes a total number of items specified by `total`.
+    A progress bar is displayed during writing, refreshed at most every `progress_interval` seconds together
+    with the records/s and queue depth, which are published in the returned `WriterStats` as well.
+
+    The file is flushed after a batch once `flush_interval` seconds passed since the last flush (every batch by default),
+    `fsync` additionally forces flushed data to disk. An `out_file` of '-' streams the records to stdout,
+    the progress bar (like logging) goes to stderr.
+
+    Outputs with a compression extension (`.gz`, `.xz`, ...) are compressed on the writer thread and every flush
+    ends a compressed member, the offsets handed to `journal` and `checkpoint` are the member boundaries then.
+    Those are flushed once a member holds `member_size` uncompressed bytes instead of by `flush_interval`,
+    commits and checkpoints wait for that boundary.
+
+    When `checkpoint` is given, `checkpoint` is called every `checkpoint_every` written items with that item and the
+    byte offset everything up to it ends at, after the file got flushed up to there.
+
+    When `journal` is given, every item's priority gets committed to it once its output is flushed,
+    `None` and `SkippedJob` items are committed without writing anything.
+
+    When `index` is given, the rank `index_key` returns for a written item is indexed with the offset its output starts at,
+    index entries are appended once the output they point into is flushed.
     """
-    exists = os.path.isfile(out_file)
-    with open(out_file, mode='w' if not exists else 'a', encoding=ENCODING) as f:
-        for _ in tqdm(range(total), smoothing=0.01, desc=f'writing to {out_file}'):
-            record = await in_queue.get()
-            if record is not None:
-                f.write(format(record) + '\n')
+    stats = WriterStats()
+    with _open_output(out_file) as f, \
+            tqdm(total=total, smoothing=0.01, mininterval=progress_interval, file=sys.stderr,
+                 desc=f'writing to {out_file if not is_stdout(out_file) else "stdout"}') as progress:
+        offset = os.fstat(f.fileno()).st_size if not is_stdout(out_file) else 0
+        compressed = codec_for(out_file) is not None
+        remaining, uncheckpointed, member_bytes = total, 0, 0
+        pending_commits: list[tuple[int, int]] = []
+        pending_checkpoints: list[tuple[Any, int]] = []
+        started = last_flush = last_progress = time.monotonic()
+
+        while remaining > 0:
+            batch = [await in_queue.get()]
+            while len(batch) < min(batch_size, remaining):
+                try:
+                    batch.append(in_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            remaining -= len(batch)
+
+            ends = await _off_loop(_write_batch, f, batch, format, offset)
+            member_bytes += max((end for end in ends if end is not None),
+                                default=offset) - offset
+
+            for record, end in zip(batch, ends):
+                if end is None:
+                    stats.skipped += 1
+                else:
+                    stats.written += 1
+                    if index is not None:
+                        index.add(index_key(record), offset)
+                    offset = end
+                    uncheckpointed += 1
+                    if checkpoint and checkpoint_every > 0 and uncheckpointed >= checkpoint_every:
+                        pending_checkpoints.append((record, offset))
+                        uncheckpointed = 0
+
+                if journal and record is not None:
+                    pending_commits.append((record.priority, offset))
+
+            now = time.monotonic()
+            if compressed:
+                flush_due = member_bytes >= member_size
+            else:
+                flush_due = bool(pending_checkpoints) or now - \
+                    last_flush >= flush_interval
+            if flush_due or remaining == 0:
+                await _off_loop(_flush, f, fsync)
+                last_flush, member_bytes = now, 0
+
+                if compressed:
+                    # record offsets inside a member can't be resumed from, everything flushed ends at the boundary
+                    offset = f.tell()
+                    pending_commits = [(priority, offset)
+                                       for priority, _ in pending_commits]
+                    pending_checkpoints = [(record, offset)
+                                           for record, _ in pending_checkpoints]
+
+                if index is not None:
+                    index.flush()
+                if journal and pending_commits:
+                    journal.commit_many(pending_commits)
+                    pending_commits = []
+                for record, record_offset in pending_checkpoints:
+                    checkpoint(record, record_offset)  # type: ignore
+                pending_checkpoints = []
+
+            progress.update(len(batch))
+            if now - last_progress >= progress_interval or remaining == 0:
+                stats.queue_depth = in_queue.qsize()
+                stats.records_per_sec = (
+                    stats.written + stats.skipped) / max(now - started, 1e-9)
+                progress.set_postfix(
+                    {"rec/s": f"{stats.records_per_sec:.0f}", "queue": stats.queue_depth}, refresh=False)
+                last_progress = now
+
+    return stats
 
 
 def write_record(out_file: str, data: str):
-    """ Writes a single string record to a file, each record is written on a new line. """
-    exists = os.path.isfile(out_file)
-    with open(out_file, mode='w' if not exists else 'a', encoding=ENCODING) as f:
-        f.write(data + '\n')
+    """ Writes a single string record to a file (stdout for '-'), each record is written on a new line. """
+    if is_stdout(out_file):
+        sys.stdout.write(data + '\n')
+        sys.stdout.flush()
+        return
+
+    with open_writer(out_file) as f:
+        f.write((data + '\n').encode(ENCODING))
+
+
+def write_lines(out_file: str, lines: Iterable[str]) -> int:
+    """ Appends lines to a file (stdout for '-') in one buffered stream, returns the amount of lines written. """
+    count = 0
+    with _open_output(out_file) as f:
+        for line in lines:
+            f.write((line + '\n').encode(ENCODING))
+            count += 1
+    return count
+
+
+def truncate_file(file_path: str, offset: int):
+    """ Truncates a file to `offset` bytes, drops output that was written after the last checkpoint. """
+    if not os.path.isfile(file_path):
+        return
+
+    with open(file_path, "r+b") as f:
+        if f.seek(0, os.SEEK_END) > offset:
+            logger.info(
+                f"Truncating {file_path} to the last committed offset {offset}")
+            f.truncate(offset)
+
+
+def file_size(file_path: str) -> int:
+    """ Returns the size of a file in bytes, 0 if it doesn't exist. """
+    return os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+
+
+def open_output_index(out_file: str, stride: int) -> OffsetIndex | None:
+    """
+    Opens the sidecar index of an output file to append to, None if `stride` disables it.
+    Entries past the end of the output are dropped, since the output may have been truncated on resume.
+    """
+    if stride <= 0 or is_stdout(out_file) or codec_for(out_file):
+        return None
+    index = OffsetIndex.open(index_path(out_file), stride=stride)
+    index.truncate(file_size(out_file))
+    return index
+
+
+def write_state(file_path: str, state: dict[str, Any]):
+    """ Atomically writes a json state file, a crash mid-write never leaves a partial state behind. """
+    temp_path = f"{file_path}.partial"
+    with open(temp_path, mode='w', encoding=ENCODING) as f:
+        f.write(json_wrapper.to_json(state, separators=(',', ':')))
+    os.replace(temp_path, file_path)
+
+
+def read_state(file_path: str) -> dict[str, Any] | None:
+    """ Reads a json state file, returns None if there is no (valid) state. """
+    if not file_path or not os.path.isfile(file_path):
+        return None
+
+    try:
+        with open(file_path, "r", encoding=ENCODING) as f:
+            return json_wrapper.from_json(f.read())
+    except Exception as e:
+        logger.warning(f"Ignoring invalid state file {file_path}: {e}")
+        return None
 
 
 def read_proxies(proxy_file: str | None) -> list[str]:
     """ Reads a list of proxies from a file,e ach line in the file is treated as a separate proxy. """
     if proxy_file and os.path.isfile(proxy_file):
-        with open(proxy_file, "r", encoding=ENCODING) as f:
+        with _open_text(proxy_file) as f:
             proxies = f.read().splitlines()
     else:
         proxies = []
@@ -51,40 +290,101 @@ def read_proxies(proxy_file: str | None) -> list[str]:
     return proxies
 
 
-def read_category_records(file_path: str) -> Iterator[CategoryRecord]:
-    """ Reads a list of category records from a file, each line in the file is treated as a separate record. """
+def seek_offset(file_path: str, rank: int | None) -> int:
+    """
+    Byte offset to start reading at for records from `rank` on, taken from the sidecar index of the file.
+    Returns 0 if there is no index or the entry doesn't point at the start of a line (stale index).
+    """
+    if rank is None or codec_for(file_path):
+        return 0
+
+    index = OffsetIndex.load(index_path(file_path))
+    if not index:
+        return 0
+
+    offset = index.lookup(rank)
+    if offset <= 0:
+        return 0
+
+    with open(file_path, "rb") as f:
+        f.seek(offset - 1)
+        if f.read(1) != b"\n":
+            logger.warning(f"Ignoring stale index of {file_path}")
+            return 0
+    return offset
+
+
+def _in_rank_range(rank: int, start_rank: int | None, end_rank: int | None) -> bool:
+    return (start_rank is None or rank >= start_rank) and (end_rank is None or rank <= end_rank)
+
+
+def read_category_records(file_path: str, offset: int = 0, start_rank: int | None = None, end_rank: int | None = None) -> Iterator[CategoryRecord]:
+    """
+    Reads a list of category records from a file, each line in the file is treated as a separate record.
+    Reading starts at byte `offset`, which has to be the start of a line (a member boundary for compressed files).
+
+    Only records between `start_rank` and `end_rank` (inclusive) are yielded when given, the file is expected
+    to be in rank order. If the file has a sidecar index, reading seeks to `start_rank` instead of scanning up to it.
+    Binary category snapshots are read as well, `offset` doesn't apply to those.
+    """
     if not file_path or not os.path.isfile(file_path):
         return iter([])
 
-    with open(file_path, "r", encoding=ENCODING) as f:
+    if is_snapshot(file_path):
+        with CategorySnapshot(file_path) as snapshot:
+            yield from snapshot.records(start_rank=start_rank, end_rank=end_rank)
+        return
+
+    offset = max(offset, seek_offset(file_path, start_rank))
+    with _open_text(file_path, offset=offset) as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
 
             try:
-                data = json_wrapper.from_json(line)
+                data = json_wrapper.loads(line)
 
-                yield CategoryRecord(**data)
+                record = CategoryRecord(**data)
             except Exception as e:
                 logger.warning(f"Skipping invalid record in {file_path}: {e}")
                 continue
 
+            if end_rank is not None and record.rank > end_rank:
+                break
+            if _in_rank_range(record.rank, start_rank, end_rank):
+                yield record
+
+
+def read_player_records(file_path: str, start_rank: int | None = None, end_rank: int | None = None) -> Iterator[PlayerRecord]:
+    """
+    Reads a list of filtered records from a file, each line in the file is treated as a separate record.
 
-def read_player_records(file_path: str) -> Iterator[PlayerRecord]:
-    """ Reads a list of filtered records from a file, each line in the file is treated as a separate record. """
+    Only records ranked between `start_rank` and `end_rank` (inclusive) are yielded when given, records
+    without a rank can't be placed and are skipped then. If the file has a sidecar index, reading seeks to `start_rank`.
+    """
     if not file_path or not os.path.isfile(file_path):
         return iter([])
 
-    with open(file_path, "r", encoding=ENCODING) as f:
+    ranged = start_rank is not None or end_rank is not None
+    with _open_text(file_path, offset=seek_offset(file_path, start_rank)) as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
 
             try:
-                parsed = json_wrapper.from_json(line)
+                parsed = json_wrapper.loads(line)
                 data = parsed.get("record", parsed)
+                rank = parsed.get("rank")
+
+                if ranged:
+                    if rank is None:
+                        continue
+                    if end_rank is not None and rank > end_rank:
+                        break
+                    if not _in_rank_range(rank, start_rank, end_rank):
+                        continue
 
                 yield PlayerRecord.from_dict(data)
             except Exception as e:
@@ -92,9 +392,12 @@ def read_player_records(file_path: str) -> Iterator[PlayerRecord]:
                 continue
 
 
-def hs_lookup_formatter(job: HSLookupJob) -> str:
-    """ Function for formatting `HSLookupJob` job result. """
-    return json_wrapper.to_json({"rank": job.priority, "record": job.result.to_dict()})
+def hs_lookup_formatter(job: HSLookupJob, fields: list[HSType] | None = None) -> str:
+    """
+    Function for formatting `HSLookupJob` job result, `fields` limits the record to those stats.
+    Keeps the spaced, ascii escaped format of older outputs so a resumed run appends alike lines.
+    """
+    return json_wrapper.dumps({"rank": job.priority, "record": job.result.to_dict(fields=fields)}, spaced=True)
 
 
 def build_temp_file(file_path: str, account_type: HSAccountTypes, hs_type: HSType) -> str:
@@ -108,5 +411,12 @@ def build_temp_file(file_path: str, account_type: HSAccountTypes, hs_type: HSTyp
     script_name = os.path.basename(sys.argv[0])
     base_script_name, _ = os.path.splitext(script_name)
 
-    base_file_path, _ = os.path.splitext(file_path)
-    return ".".join([base_file_path, str(account_type), str(hs_type), base_script_name, "temp"])
+    codec = codec_for(file_path)
+    if codec:
+        file_path = file_path[:-len(codec.extension)]
+    base_file_path, _ = os.path.splitext(
+        file_path if not is_stdout(file_path) else "stdout")
+    temp_file = ".".join([base_file_path, str(
+        account_type), str(hs_type), base_script_name, "temp"])
+    # temp files of a compressed output are compressed the same way
+    return temp_file + codec.extension if codec else temp_file
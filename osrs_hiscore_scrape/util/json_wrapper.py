@@ -2,7 +2,17 @@ import json
 from dataclasses import asdict
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # optional accelerated backend
+    orjson = None
+
 _json_lib = json
+_fast_lib = orjson
+_compact_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+_spaced_encoder = json.JSONEncoder()
+
+BACKENDS = ["json", "orjson"]
 
 
 class PlayerRecordEncoder(json.JSONEncoder):
@@ -13,6 +23,62 @@ class PlayerRecordEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+def available_backends() -> list[str]:
+    return [name for name in BACKENDS if name == "json" or orjson is not None]
+
+
+def backend() -> str:
+    """ Name of the backend used by `dumps` and `loads`. """
+    return "orjson" if _fast_lib is not None else "json"
+
+
+def use_backend(name: str):
+    """
+    Select the backend used by `dumps` and `loads`, orjson is picked by default when it's installed.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    global _fast_lib
+    if name == "json":
+        _fast_lib = None
+    elif name == "orjson" and orjson is not None:
+        _fast_lib = orjson
+    else:
+        raise ValueError(
+            f"JSON backend '{name}' is not available, choose from {available_backends()}")
+
+
+def dumps(data: Any, spaced: bool = False) -> str:
+    """
+    Compact serialization of plain data (dicts, lists, strings, numbers, bools and None), no `default()` hook is involved.
+    Every backend writes the same compact output, non-ASCII characters are written as is.
+    `spaced` writes the format of `to_json` instead, ', ' and ': ' separators and non-ASCII characters escaped.
+    """
+    if spaced:
+        return _dumps_spaced(data)
+    if _fast_lib is not None:
+        return _fast_lib.dumps(data).decode("utf-8")
+    return _compact_encoder.encode(data)
+
+
+def _dumps_spaced(data: Any) -> str:
+    if _fast_lib is not None:
+        # orjson has no separator options, its indented output already has the ': ' separators and newlines
+        # can't occur unescaped inside strings, so joining the lines back up leaves the strings intact
+        out = _fast_lib.dumps(data, option=_fast_lib.OPT_INDENT_2)
+        if out.isascii():
+            return b"".join(map(bytes.lstrip, out.replace(b",\n", b", \n").split(b"\n"))).decode("ascii")
+    return _spaced_encoder.encode(data)
+
+
+def loads(data: str | bytes) -> Any:
+    """ Deserialize a JSON-formatted string into an object using the selected backend. """
+    if _fast_lib is not None:
+        return _fast_lib.loads(data)
+    return _json_lib.loads(data)
+
+
 def to_json(data: Any, **kwargs) -> str:
     """ Serialize an object to a JSON-formatted string. """
     return _json_lib.dumps(data, **kwargs, cls=PlayerRecordEncoder)
@@ -20,4 +86,6 @@ def to_json(data: Any, **kwargs) -> str:
 
 def from_json(json_string: str, **kwargs) -> Any:
     """ Deserialize a JSON-formatted string into an object. """
+    if not kwargs:
+        return loads(json_string)
     return _json_lib.loads(json_string, **kwargs)
@@ -0,0 +1,109 @@
+import os
+import struct
+from bisect import bisect_right
+
+from ..log.logger import get_logger
+
+logger = get_logger(__name__)
+MAGIC = b"OSRSIDX\x01"
+DEFAULT_INDEX_STRIDE = 1000
+
+# stride
+_HEADER = struct.Struct("<I")
+# rank, byte offset
+_ENTRY = struct.Struct("<QQ")
+
+
+def index_path(file_path: str) -> str:
+    """ Path of the sidecar index belonging to an output file. """
+    return f"{file_path}.idx"
+
+
+class OffsetIndex:
+    """
+    Sidecar index mapping ranks (or priorities) to the byte offset of the line they start at in an output file.
+
+    An entry is kept about every `stride` ranks, readers seek to the closest entry before the rank they want
+    and scan from there. Entries are appended, so an index grows together with a file that's appended to,
+    only ranks above the last indexed rank are added since the output is written in rank order.
+    A partial trailing entry (crash mid-write) is ignored on load.
+    """
+
+    def __init__(self, file_path: str, stride: int = DEFAULT_INDEX_STRIDE):
+        self.file_path = file_path
+        self.stride = stride
+        self.ranks: list[int] = []
+        self.offsets: list[int] = []
+        self._pending: list[bytes] = []
+
+    @staticmethod
+    def load(file_path: str) -> 'OffsetIndex | None':
+        """ Loads an index, returns None if there is no (valid) index. """
+        if not file_path or not os.path.isfile(file_path):
+            return None
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + _HEADER.size:
+            logger.warning(f"Ignoring invalid index file {file_path}")
+            return None
+
+        stride, = _HEADER.unpack_from(data, len(MAGIC))
+        index = OffsetIndex(file_path, stride=stride)
+        start = len(MAGIC) + _HEADER.size
+        end = start + (len(data) - start) // _ENTRY.size * _ENTRY.size
+        for rank, offset in _ENTRY.iter_unpack(data[start:end]):
+            index.ranks.append(rank)
+            index.offsets.append(offset)
+        return index
+
+    @staticmethod
+    def open(file_path: str, stride: int = DEFAULT_INDEX_STRIDE) -> 'OffsetIndex':
+        """ Loads the index to append to, a new one is started if there is none. """
+        index = OffsetIndex.load(file_path)
+        if index is None:
+            index = OffsetIndex(file_path, stride=stride)
+            with open(file_path, "wb") as f:
+                f.write(MAGIC + _HEADER.pack(stride))
+        return index
+
+    def add(self, rank: int, offset: int) -> bool:
+        """ Indexes `rank` starting at byte `offset` if it's at least `stride` past the last entry, returns whether it was. """
+        if self.ranks and rank < self.ranks[-1] + self.stride:
+            return False
+
+        self.ranks.append(rank)
+        self.offsets.append(offset)
+        self._pending.append(_ENTRY.pack(rank, offset))
+        return True
+
+    def flush(self) -> None:
+        """ Appends the entries added since the last flush, call it after the output they point into is flushed. """
+        if not self._pending:
+            return
+        with open(self.file_path, "ab") as f:
+            f.write(b"".join(self._pending))
+        self._pending = []
+
+    def truncate(self, offset: int) -> None:
+        """ Drops the entries pointing at or past byte `offset`, used when the output file got truncated. """
+        keep = bisect_right(self.offsets, offset - 1)
+        if keep == len(self.offsets):
+            return
+
+        self.flush()
+        del self.ranks[keep:], self.offsets[keep:]
+        with open(self.file_path, "r+b") as f:
+            f.truncate(len(MAGIC) + _HEADER.size + keep * _ENTRY.size)
+
+    def lookup(self, rank: int) -> int:
+        """ Byte offset of the closest indexed line at or before `rank`, 0 if there is none. """
+        i = bisect_right(self.ranks, rank) - 1
+        return self.offsets[i] if i >= 0 else 0
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def remove(self) -> None:
+        if os.path.isfile(self.file_path):
+            os.remove(self.file_path)
@@ -0,0 +1,380 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import ContextManager, Iterator
+
+from ..log.logger import get_logger
+from ..request.dto import HSFilterEntry
+from ..request.hs_account_types import HSAccountTypes
+from ..request.hs_types import HS_TYPE_BUCKET_MAP, HSType
+from ..request.records import PlayerRecord
+from . import json_wrapper
+from .bloom_filter import BloomFilter
+
+logger = get_logger(__name__)
+DEFAULT_MAX_AGE = 24 * 60 * 60
+DEFAULT_NOT_FOUND_TTL = 7 * 24 * 60 * 60
+MIN_NOT_FOUND_CAPACITY = 100_000
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 500
+QUERY_FETCH_SIZE = 1000
+
+# every stat is kept in a column of its own as well, so filters can be answered by (indexed) column scans
+STAT_COLUMNS = [hs_type.name for hs_type in HSType]
+_STAT_BUCKETS = [(column, HS_TYPE_BUCKET_MAP[column])
+                 for column in STAT_COLUMNS]
+_SQL_COMPARISONS = {"==": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    account_type TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (account_type, username_key)
+) WITHOUT ROWID
+"""
+
+# latest category score a stored record was looked up at, what incremental refreshes diff against
+_SCORES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS category_scores (
+    account_type TEXT NOT NULL,
+    hs_type TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (account_type, hs_type, username_key)
+) WITHOUT ROWID
+"""
+
+# usernames the hiscores answered with a 404, the exact set behind the in-memory bloom filter
+_NOT_FOUND_SCHEMA = """
+CREATE TABLE IF NOT EXISTS not_found (
+    account_type TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (account_type, username_key)
+) WITHOUT ROWID
+"""
+
+# a newer record is never overwritten by an older one, e.g. when importing old output files
+_UPSERT = f"""
+INSERT INTO players (account_type, username_key, ts, record, {", ".join(f'"{c}"' for c in STAT_COLUMNS)})
+VALUES (?, ?, ?, ?, {", ".join("?" for _ in STAT_COLUMNS)})
+ON CONFLICT (account_type, username_key) DO UPDATE SET ts = excluded.ts, record = excluded.record,
+{", ".join(f'"{c}" = excluded."{c}"' for c in STAT_COLUMNS)}
+WHERE excluded.ts >= players.ts
+"""
+
+
+def username_key(username: str) -> str:
+    """ Hiscore names are case insensitive and treat spaces, underscores and hyphens alike. """
+    return username.strip().lower().replace("_", " ").replace("-", " ")
+
+
+class PlayerStore:
+    """
+    Local SQLite store of the latest `PlayerRecord` per (account type, username), so lookups done by
+    earlier runs don't have to hit the hiscores again. Records older than `max_age` seconds count as missing,
+    a negative `max_age` never expires records and 0 always refetches while still storing the results.
+
+    An in-process LRU of `cache_size` records sits in front of the database. Writes are buffered and
+    committed in a single transaction every `batch_size` records and on `flush`/`close`.
+
+    Every stat also gets a column of its own, `query` answers filters with those and creates an index
+    per filtered stat the first time it's filtered on, so repeated queries don't scan the whole store.
+
+    The category score a player was looked up at can be kept next to the record (`put_score`), so a later
+    scrape of that category only has to look up the players whose score changed since (`get_scores`).
+
+    Players the hiscores don't know (`put_not_found`) are remembered for `not_found_ttl` seconds, negative never
+    forgets them and 0 disables the negative cache. A bloom filter of them is kept in memory, so checking a name
+    only hits the database when it's likely missing, until the player is stored again.
+    """
+
+    def __init__(self, file_path: str, max_age: float = DEFAULT_MAX_AGE, cache_size: int = DEFAULT_CACHE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, not_found_ttl: float = DEFAULT_NOT_FOUND_TTL):
+        self.file_path = file_path
+        self.max_age = max_age
+        self.not_found_ttl = not_found_ttl
+        self.not_found_hits = 0
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+        self._cache: OrderedDict[tuple[str, str], PlayerRecord] = OrderedDict()
+        self._pending: dict[tuple[str, str], tuple] = {}
+        self._pending_scores: dict[tuple[str, str, str], int] = {}
+        self._pending_not_found: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(_SCORES_SCHEMA)
+            self._conn.execute(_NOT_FOUND_SCHEMA)
+            self._add_stat_columns()
+        self._not_found = self._build_not_found_filter()
+
+    def get(self, account_type: HSAccountTypes, username: str, max_age: float | None = None) -> PlayerRecord | None:
+        """ The stored record of a player, None if there is none or it's older than `max_age` (the store's by default). """
+        max_age = self.max_age if max_age is None else max_age
+        key = (account_type.name, username_key(username))
+
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+            else:
+                record = self._load(key)
+                if record is not None:
+                    self._remember(key, record)
+
+        if record is None or not _is_fresh(record, max_age):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return record
+
+    def put(self, account_type: HSAccountTypes, record: PlayerRecord) -> None:
+        """ Stores the record of a player, committed with the next batch. """
+        key = (account_type.name, username_key(record.username))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached.ts > record.ts:
+                return
+
+            self._remember(key, record)
+            self._pending_not_found.pop(key, None)
+            self._pending[key] = (record.ts.timestamp(), json_wrapper.dumps(
+                record.to_dict()), *_stat_values(record))
+            if len(self._pending) >= self.batch_size:
+                self._commit()
+
+    def put_many(self, account_type: HSAccountTypes, records: list[PlayerRecord]) -> None:
+        """ Stores records in bulk, e.g. importing an output file of `filter_category.py`. """
+        for record in records:
+            self.put(account_type, record)
+        self.flush()
+
+    def put_score(self, account_type: HSAccountTypes, hs_type: HSType, username: str, score: int) -> None:
+        """ Keeps the `hs_type` score the stored record of a player was looked up at, committed with the next batch. """
+        with self._lock:
+            self._pending_scores[(
+                account_type.name, hs_type.name, username_key(username))] = score
+
+    def put_not_found(self, account_type: HSAccountTypes, username: str) -> None:
+        """ Remembers that the hiscores don't know a player, committed with the next batch. """
+        if self.not_found_ttl == 0:
+            return
+
+        key = (account_type.name, username_key(username))
+        with self._lock:
+            self._pending_not_found[key] = time.time()
+            self._not_found.add(":".join(key))
+            if self._not_found.is_full():
+                self._commit()
+                self._not_found = self._build_not_found_filter(
+                    capacity=2 * self._not_found.capacity)
+
+    def is_not_found(self, account_type: HSAccountTypes, username: str) -> bool:
+        """ Whether the hiscores didn't know a player within the last `not_found_ttl` seconds and it wasn't stored since. """
+        if self.not_found_ttl == 0:
+            return False
+
+        key = (account_type.name, username_key(username))
+        if ":".join(key) not in self._not_found:
+            return False
+
+        with self._lock:
+            ts = self._pending_not_found.get(key)
+            if ts is None:
+                row = self._conn.execute(
+                    "SELECT ts FROM not_found WHERE account_type = ? AND username_key = ?", key).fetchone()
+                ts = row[0] if row else None
+
+        missing = ts is not None and (
+            self.not_found_ttl < 0 or time.time() - ts < self.not_found_ttl)
+        if missing:
+            self.not_found_hits += 1
+        return missing
+
+    def get_scores(self, account_type: HSAccountTypes, hs_type: HSType, usernames: list[str]) -> dict[str, int]:
+        """ The kept `hs_type` scores of the given players by `username_key`, players without one are left out. """
+        keys = list({username_key(username) for username in usernames})
+        scores: dict[str, int] = {}
+        with self._lock:
+            for i in range(0, len(keys), QUERY_FETCH_SIZE):
+                chunk = keys[i:i + QUERY_FETCH_SIZE]
+                scores.update(self._conn.execute(
+                    f"SELECT username_key, score FROM category_scores WHERE account_type = ? AND hs_type = ? "
+                    f"AND username_key IN ({', '.join('?' for _ in chunk)})",
+                    [account_type.name, hs_type.name, *chunk]))
+
+            for key in keys:
+                pending = self._pending_scores.get(
+                    (account_type.name, hs_type.name, key))
+                if pending is not None:
+                    scores[key] = pending
+        return scores
+
+    def query(self, account_type: HSAccountTypes, hs_filter: list[HSFilterEntry], order_by: HSType = HSType.overall,
+              max_age: float = -1) -> Iterator[PlayerRecord]:
+        """
+        Stored records of `account_type` matching every filter entry, best `order_by` value first.
+        Entries with a known comparison and value narrow the rows in SQL, every candidate is checked against
+        the predicates as well. `max_age` leaves out older records, negative keeps all of them.
+        """
+        self.flush()
+
+        conditions, params = ["account_type = ?"], [account_type.name]
+        for entry in hs_filter:
+            comparison = _SQL_COMPARISONS.get(entry.comparison or "")
+            if comparison is None or entry.value is None:
+                continue
+            self._ensure_index(entry.hstype.name)
+            conditions.append(f'"{entry.hstype.name}" {comparison} ?')
+            params.append(entry.value)
+
+        if max_age >= 0:
+            conditions.append("ts >= ?")
+            params.append(time.time() - max_age)
+
+        cursor = self._conn.execute(
+            f'SELECT record FROM players WHERE {" AND ".join(conditions)} ORDER BY "{order_by.name}" DESC, username_key',
+            params)
+        while rows := cursor.fetchmany(QUERY_FETCH_SIZE):
+            for row in rows:
+                record = PlayerRecord.from_dict(json_wrapper.loads(row[0]))
+                if record.meets_requirements(hs_filter):
+                    yield record
+
+    def flush(self) -> None:
+        """ Commits the buffered records. """
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._conn.close()
+        logger.debug(
+            f"player store {self.file_path}: {self.hits} hits, {self.misses} misses, {self.not_found_hits} known missing")
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def __enter__(self) -> 'PlayerStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def __aenter__(self) -> 'PlayerStore':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def _add_stat_columns(self) -> None:
+        """ Adds the columns of stats the store doesn't have yet (new stores and new hiscore types), filled from the records. """
+        existing = {row[1] for row in self._conn.execute(
+            "PRAGMA table_info(players)")}
+        missing = [column for column in STAT_COLUMNS if column not in existing]
+        if not missing:
+            return
+
+        for column in missing:
+            self._conn.execute(
+                f'ALTER TABLE players ADD COLUMN "{column}" NUMERIC')
+
+        assignments = ", ".join(f'"{column}" = ?' for column in missing)
+        rows = self._conn.execute(
+            "SELECT account_type, username_key, record FROM players").fetchall()
+        for account_type, key, data in rows:
+            stats = dict(zip(STAT_COLUMNS, _stat_values(
+                PlayerRecord.from_dict(json_wrapper.loads(data)))))
+            self._conn.execute(f"UPDATE players SET {assignments} WHERE account_type = ? AND username_key = ?",
+                               [stats[column] for column in missing] + [account_type, key])
+        if rows:
+            logger.info(
+                f"Added {len(missing)} stat columns to {len(rows)} records of {self.file_path}")
+
+    def _build_not_found_filter(self, capacity: int = MIN_NOT_FOUND_CAPACITY) -> BloomFilter:
+        """ Bloom filter of the missing players that didn't expire yet, with room for at least twice as many. """
+        conditions, params = "", []
+        if self.not_found_ttl > 0:
+            conditions, params = " WHERE ts >= ?", [
+                time.time() - self.not_found_ttl]
+
+        keys = [f"{account_type}:{key}" for account_type, key
+                in self._conn.execute(f"SELECT account_type, username_key FROM not_found{conditions}", params)]
+        bloom = BloomFilter(max(capacity, 2 * len(keys)))
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _ensure_index(self, column: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_players_{column}" ON players (account_type, "{column}")')
+
+    def _load(self, key: tuple[str, str]) -> PlayerRecord | None:
+        pending = self._pending.get(key)
+        if pending is not None:
+            return PlayerRecord.from_dict(json_wrapper.loads(pending[1]))
+
+        row = self._conn.execute(
+            "SELECT record FROM players WHERE account_type = ? AND username_key = ?", key).fetchone()
+        return PlayerRecord.from_dict(json_wrapper.loads(row[0])) if row else None
+
+    def _remember(self, key: tuple[str, str], record: PlayerRecord) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _commit(self) -> None:
+        if not self._pending and not self._pending_scores and not self._pending_not_found:
+            return
+
+        rows = [(account_type, key, *values)
+                for (account_type, key), values in self._pending.items()]
+        scores = [(*key, score) for key, score in self._pending_scores.items()]
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO category_scores VALUES (?, ?, ?, ?)", scores)
+            # a stored record means the player exists (again), e.g. after a name change got taken
+            self._conn.executemany(
+                "DELETE FROM not_found WHERE account_type = ? AND username_key = ?", self._pending)
+            self._conn.executemany("INSERT OR REPLACE INTO not_found VALUES (?, ?, ?)",
+                                   [(*key, ts) for key, ts in self._pending_not_found.items()])
+        self._pending, self._pending_scores, self._pending_not_found = {}, {}, {}
+
+
+def open_player_store(file_path: str | None, max_age: float = DEFAULT_MAX_AGE,
+                      not_found_ttl: float = DEFAULT_NOT_FOUND_TTL) -> 'PlayerStore | ContextManager[None]':
+    """ (Async) context manager of the store at `file_path`, yields None without a path. """
+    return PlayerStore(file_path, max_age=max_age, not_found_ttl=not_found_ttl) if file_path else nullcontext()
+
+
+def _stat_values(record: PlayerRecord) -> list[int | float]:
+    """ Same values as `record.get_stat(hs_type).get_value()` for every stat column, without resolving each type. """
+    values = []
+    for column, bucket in _STAT_BUCKETS:
+        if column == HSType.combat.name:
+            values.append(record.combat_lvl.get_value())
+            continue
+        stat = getattr(record, bucket).get(column)
+        values.append(stat.get_value() if stat is not None else -1)
+    return values
+
+
+def _is_fresh(record: PlayerRecord, max_age: float) -> bool:
+    return max_age < 0 or time.time() - record.ts.timestamp() < max_age
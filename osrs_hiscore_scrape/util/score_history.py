@@ -0,0 +1,193 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable
+
+from ..log.logger import get_logger
+from ..request.hs_account_types import HSAccountTypes
+from ..request.hs_types import HSType
+from ..request.records import CategoryRecord
+from .player_store import username_key
+from .username_dictionary import USERNAMES_SCHEMA, load_incoming
+
+logger = get_logger(__name__)
+
+# kinds of a delta row
+CHANGED = 0
+# first snapshot (in full) or a player that (re)entered the category, delta is the full score
+APPEARED = 1
+LEFT = 2  # a player that dropped off the category, delta is minus the last score
+
+_SCHEMA = USERNAMES_SCHEMA + """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    account_type TEXT NOT NULL,
+    hs_type TEXT NOT NULL,
+    UNIQUE (account_type, hs_type)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    series_id INTEGER NOT NULL REFERENCES series (id),
+    ts REAL NOT NULL,
+    UNIQUE (series_id, ts)
+);
+CREATE TABLE IF NOT EXISTS deltas (
+    user_id INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    PRIMARY KEY (user_id, snapshot_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deltas_snapshot ON deltas (snapshot_id);
+CREATE TABLE IF NOT EXISTS latest (
+    series_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (series_id, user_id)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class SnapshotStats:
+    """ Accounting of an added snapshot, the amount of delta rows written is `changed + appeared + left`. """
+    records: int = 0
+    changed: int = 0
+    appeared: int = 0
+    left: int = 0
+
+
+class ScoreHistory:
+    """
+    SQLite store of repeated scrapes of categories. Usernames are kept once in a dictionary and referenced by id,
+    the first snapshot of a category is kept in full and every later one only as the score deltas of the players
+    whose score changed, entered or left the category. Every snapshot is expected to cover the same rank range.
+
+    The current scores of every category are kept as well, so adding a snapshot never replays the history.
+    The history of a player reads its own deltas only, gains between two moments sum the deltas of
+    the snapshots in between.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._conn = sqlite3.connect(file_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_snapshot(self, account_type: HSAccountTypes, hs_type: HSType, records: Iterable[CategoryRecord],
+                     ts: datetime) -> SnapshotStats:
+        """
+        Adds a scrape of a category taken at `ts`, the deltas are computed against the last added snapshot.
+
+        Raises:
+            ValueError: If the category already has a snapshot at or after `ts`.
+        """
+        stats = SnapshotStats()
+        with self._conn:
+            series_id = self._series_id(account_type, hs_type, create=True)
+            last = self._conn.execute(
+                "SELECT MAX(ts) FROM snapshots WHERE series_id = ?", (series_id,)).fetchone()[0]
+            if last is not None and ts.timestamp() <= last:
+                raise ValueError(
+                    f"{account_type.name} {hs_type.name} already has a snapshot at or after {ts.isoformat()}")
+
+            self._conn.execute("DROP TABLE IF EXISTS temp.scores")
+            stats.records = load_incoming(self._conn, records)
+            self._conn.execute(
+                "CREATE TEMP TABLE scores (user_id INTEGER PRIMARY KEY, score INTEGER NOT NULL)")
+            self._conn.execute("""
+                INSERT INTO scores SELECT u.id, i.score FROM incoming i JOIN usernames u ON u.username_key = i.username_key""")
+            snapshot_id = self._conn.execute(
+                "INSERT INTO snapshots (series_id, ts) VALUES (?, ?)", (series_id, ts.timestamp())).lastrowid
+
+            stats.changed = self._conn.execute("""
+                INSERT INTO deltas (user_id, snapshot_id, delta, kind)
+                SELECT c.user_id, ?, c.score - l.score, ? FROM scores c
+                JOIN latest l ON l.series_id = ? AND l.user_id = c.user_id
+                WHERE c.score != l.score""", (snapshot_id, CHANGED, series_id)).rowcount
+            stats.appeared = self._conn.execute("""
+                INSERT INTO deltas (user_id, snapshot_id, delta, kind)
+                SELECT c.user_id, ?, c.score, ? FROM scores c
+                WHERE NOT EXISTS (SELECT 1 FROM latest l WHERE l.series_id = ? AND l.user_id = c.user_id)""",
+                                                (snapshot_id, APPEARED, series_id)).rowcount
+            stats.left = self._conn.execute("""
+                INSERT INTO deltas (user_id, snapshot_id, delta, kind)
+                SELECT l.user_id, ?, -l.score, ? FROM latest l
+                WHERE l.series_id = ? AND NOT EXISTS (SELECT 1 FROM scores c WHERE c.user_id = l.user_id)""",
+                                            (snapshot_id, LEFT, series_id)).rowcount
+
+            self._conn.execute(
+                "DELETE FROM latest WHERE series_id = ?", (series_id,))
+            self._conn.execute(
+                "INSERT INTO latest (series_id, user_id, score) SELECT ?, user_id, score FROM scores", (series_id,))
+            self._conn.execute("DROP TABLE temp.scores")
+            self._conn.execute("DROP TABLE temp.incoming")
+
+        logger.info(f"added {account_type.name} {hs_type.name} snapshot of {stats.records} records: "
+                    f"{stats.changed} changed, {stats.appeared} appeared, {stats.left} left")
+        return stats
+
+    def snapshots(self, account_type: HSAccountTypes, hs_type: HSType) -> list[datetime]:
+        """ Moments the snapshots of a category were taken at, oldest first. """
+        series_id = self._series_id(account_type, hs_type)
+        return [_to_datetime(ts) for ts, in self._conn.execute(
+            "SELECT ts FROM snapshots WHERE series_id = ? ORDER BY ts", (series_id,))]
+
+    def history(self, account_type: HSAccountTypes, hs_type: HSType, username: str) -> list[tuple[datetime, int | None]]:
+        """ Score of a player at every snapshot their score changed, None from the moment they left the category. """
+        series_id = self._series_id(account_type, hs_type)
+        rows = self._conn.execute("""
+            SELECT s.ts, d.delta, d.kind FROM deltas d
+            JOIN usernames u ON u.id = d.user_id
+            JOIN snapshots s ON s.id = d.snapshot_id
+            WHERE u.username_key = ? AND s.series_id = ? ORDER BY s.ts""", (username_key(username), series_id))
+
+        result, score = [], 0
+        for ts, delta, kind in rows:
+            score += delta
+            result.append((_to_datetime(ts), score if kind != LEFT else None))
+        return result
+
+    def top_gainers(self, account_type: HSAccountTypes, hs_type: HSType, start: datetime | None = None,
+                    end: datetime | None = None, limit: int = 10) -> list[tuple[str, int]]:
+        """
+        Players with the largest score gain from the snapshot at or before `start` to the one at or before `end`
+        (the first and last snapshot if omitted). Players that entered or left the category in between are left out.
+        """
+        series_id = self._series_id(account_type, hs_type)
+        start_ts = start.timestamp() if start is not None else float("-inf")
+        end_ts = end.timestamp() if end is not None else float("inf")
+        # gains count from the first snapshot at the earliest, which itself only holds full scores
+        first = self._conn.execute(
+            "SELECT MIN(ts) FROM snapshots WHERE series_id = ?", (series_id,)).fetchone()[0]
+        if first is not None:
+            start_ts = max(start_ts, first)
+
+        return self._conn.execute("""
+            SELECT u.username, SUM(d.delta) AS gain FROM deltas d
+            JOIN usernames u ON u.id = d.user_id
+            WHERE d.snapshot_id IN (SELECT id FROM snapshots WHERE series_id = ? AND ts > ? AND ts <= ?)
+            GROUP BY d.user_id HAVING MAX(d.kind) = ? AND SUM(d.delta) > 0
+            ORDER BY gain DESC, u.username_key LIMIT ?""", (series_id, start_ts, end_ts, CHANGED, limit)).fetchall()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'ScoreHistory':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _series_id(self, account_type: HSAccountTypes, hs_type: HSType, create: bool = False) -> int | None:
+        params = (account_type.name, hs_type.name)
+        if create:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO series (account_type, hs_type) VALUES (?, ?)", params)
+        row = self._conn.execute(
+            "SELECT id FROM series WHERE account_type = ? AND hs_type = ?", params).fetchone()
+        return row[0] if row else None
+
+
+def _to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
@@ -0,0 +1,353 @@
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from enum import Enum
+from itertools import groupby
+from typing import Iterator, Sequence
+
+from ..request.records import BaseCategoryInfo, CategoryRecord
+
+ENCODING = "utf-8"
+MAGIC = b"OSRSCAT\x02"
+END_MAGIC = b"OSRSEND\x02"
+BLOCK_SIZE = 4096
+
+# score column encodings
+SCORES_DELTA = 0
+SCORES_RUNS = 1
+
+# block_offset, first_rank, count, offsets_offset, blob_offset (relative to the block), score encoding
+_BLOCK_ENTRY = struct.Struct("<QQIIIB")
+# index_offset, total_count, block_count, end magic
+_TRAILER = struct.Struct("<QQI8s")
+
+
+class CategoryOutputFormat(Enum):
+    """ Enum of the file formats category records can be written in. """
+    jsonl = "jsonl"
+    snapshot = "snapshot"
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def from_string(s: str) -> 'CategoryOutputFormat':
+        try:
+            return CategoryOutputFormat[s.lower()]
+        except KeyError:
+            valid_values = ', '.join(CategoryOutputFormat.__members__.keys())
+            raise KeyError(f'value given: {s}, valid values [{valid_values}]')
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf: bytes | mmap.mmap, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def to_runs(scores: Sequence[int]) -> list[tuple[int, int]]:
+    """ Collapses consecutive tied scores into `(score, count)` runs. """
+    return [(score, sum(1 for _ in run)) for score, run in groupby(scores)]
+
+
+def _encode_scores(scores: Sequence[int]) -> bytes:
+    """ Varint encodes the zigzagged delta of every score to the previous one, the first delta is from 0. """
+    out = bytearray()
+    previous = 0
+    for score in scores:
+        _write_varint(out, _zigzag(score - previous))
+        previous = score
+    return bytes(out)
+
+
+def _encode_runs(runs: list[tuple[int, int]]) -> bytes:
+    """ Like `_encode_scores` but every delta is followed by the varint length of its run. """
+    out = bytearray()
+    previous = 0
+    for score, count in runs:
+        _write_varint(out, _zigzag(score - previous))
+        _write_varint(out, count)
+        previous = score
+    return bytes(out)
+
+
+def _decode_runs(buf: bytes | mmap.mmap, pos: int, count: int, encoding: int) -> list[tuple[int, int]]:
+    """ Decodes a score column of `count` records into runs, ties are merged for either encoding. """
+    runs: list[tuple[int, int]] = []
+    previous = 0
+    decoded = 0
+    while decoded < count:
+        delta, pos = _read_varint(buf, pos)
+        length = 1
+        if encoding == SCORES_RUNS:
+            length, pos = _read_varint(buf, pos)
+
+        previous += _unzigzag(delta)
+        decoded += length
+        if runs and delta == 0:
+            runs[-1] = (previous, runs[-1][1] + length)
+        else:
+            runs.append((previous, length))
+    return runs
+
+
+def _slice_runs(runs: list[tuple[int, int]], lo: int, hi: int) -> list[tuple[int, int]]:
+    """ Runs covering the records `lo` up to (exclusive) `hi`. """
+    sliced = []
+    position = 0
+    for score, count in runs:
+        start, end = max(position, lo), min(position + count, hi)
+        if start < end:
+            sliced.append((score, end - start))
+        position += count
+        if position >= hi:
+            break
+    return sliced
+
+
+def is_snapshot(file_path: str) -> bool:
+    """ Whether the file is a category snapshot. """
+    if not file_path or not os.path.isfile(file_path):
+        return False
+    with open(file_path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class SnapshotWriter:
+    """
+    Streaming writer for binary category snapshots.
+
+    Records are written in blocks of contiguous ranks, every block stores its rank origin,
+    a varint/zigzag delta encoded score column and the usernames as one utf-8 blob with an offset index.
+    Blocks with many tied scores store the score column as `(score, count)` runs instead when that's smaller.
+    The block index and trailer are written on close, only the current block is kept in memory.
+
+    Raises:
+        ValueError: When records are not added in ascending rank order.
+    """
+
+    def __init__(self, file_path: str, block_size: int = BLOCK_SIZE):
+        self.file_path = file_path
+        self.block_size = block_size
+        self.count = 0
+        self._f = open(file_path, "wb")
+        self._f.write(MAGIC)
+        self._index: list[bytes] = []
+        self._first_rank = 0
+        self._scores: list[int] = []
+        self._usernames: list[bytes] = []
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, record: CategoryRecord) -> None:
+        if self._scores:
+            expected = self._first_rank + len(self._scores)
+            if record.rank < expected:
+                raise ValueError(
+                    f"records have to be added in ascending rank order, got rank {record.rank} after {expected - 1}")
+            if record.rank != expected or len(self._scores) >= self.block_size:
+                self._flush_block()
+
+        if not self._scores:
+            self._first_rank = record.rank
+        self._scores.append(record.score)
+        self._usernames.append(record.username.encode(ENCODING))
+        self.count += 1
+
+    def _flush_block(self) -> None:
+        if not self._scores:
+            return
+
+        block_offset = self._f.tell()
+
+        # heavily tied blocks (max xp, minimum kc) are smaller as runs
+        encoding, scores = SCORES_DELTA, _encode_scores(self._scores)
+        runs = to_runs(self._scores)
+        if len(runs) < len(self._scores):
+            encoded_runs = _encode_runs(runs)
+            if len(encoded_runs) < len(scores):
+                encoding, scores = SCORES_RUNS, encoded_runs
+
+        offsets = [0]
+        for username in self._usernames:
+            offsets.append(offsets[-1] + len(username))
+
+        offsets_offset = len(scores)
+        blob_offset = offsets_offset + 4 * len(offsets)
+
+        self._f.write(scores)
+        self._f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        self._f.write(b"".join(self._usernames))
+
+        self._index.append(_BLOCK_ENTRY.pack(block_offset, self._first_rank,
+                                             len(self._scores), offsets_offset, blob_offset, encoding))
+        self._scores, self._usernames = [], []
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._flush_block()
+        index_offset = self._f.tell()
+        self._f.write(b"".join(self._index))
+        self._f.write(_TRAILER.pack(index_offset, self.count,
+                      len(self._index), END_MAGIC))
+        self._f.close()
+
+
+class UsernameColumn(Sequence[str]):
+    """ Lazily decoded usernames of a snapshot block, only requested names are decoded. """
+
+    def __init__(self, buf: mmap.mmap, offsets: tuple[int, ...], blob_start: int):
+        self._buf = buf
+        self._offsets = offsets
+        self._blob_start = blob_start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("username index out of range")
+        start = self._blob_start + self._offsets[i]
+        end = self._blob_start + self._offsets[i + 1]
+        return self._buf[start:end].decode(ENCODING)
+
+
+class CategorySnapshot:
+    """
+    Memory mapped reader for binary category snapshots.
+
+    Iterating yields `CategoryRecord` objects, `blocks` and `runs` yield the raw columns
+    so aggregations can be fed without creating an object per row.
+
+    Raises:
+        ValueError: If the file isn't a (complete) category snapshot.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._f = open(file_path, "rb")
+        try:
+            self._buf = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._f.close()
+            raise ValueError(f"{file_path} is not a category snapshot")
+
+        if len(self._buf) < len(MAGIC) + _TRAILER.size or self._buf[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{file_path} is not a category snapshot")
+
+        index_offset, self._count, block_count, end_magic = _TRAILER.unpack_from(
+            self._buf, len(self._buf) - _TRAILER.size)
+        if end_magic != END_MAGIC:
+            self.close()
+            raise ValueError(
+                f"{file_path} is an incomplete category snapshot, the writer wasn't closed")
+
+        self._blocks = [_BLOCK_ENTRY.unpack_from(self._buf, index_offset + i * _BLOCK_ENTRY.size)
+                        for i in range(block_count)]
+        self._first_ranks = [block[1] for block in self._blocks]
+
+    def __enter__(self) -> 'CategorySnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._buf.closed:
+            self._buf.close()
+        self._f.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def runs(self, start_rank: int | None = None, end_rank: int | None = None) -> Iterator[tuple[int, list[tuple[int, int]], UsernameColumn]]:
+        """
+        Yields `(first_rank, runs, usernames)` of contiguous ranks where `runs` are `(score, count)` pairs of tied scores,
+        limited to `start_rank` and `end_rank` (inclusive) when given.
+        """
+        i = max(bisect_right(self._first_ranks, start_rank) - 1, 0) \
+            if start_rank is not None else 0
+
+        for block_offset, first_rank, count, offsets_offset, blob_offset, encoding in self._blocks[i:]:
+            if end_rank is not None and first_rank > end_rank:
+                break
+
+            lo = max(start_rank - first_rank,
+                     0) if start_rank is not None else 0
+            hi = min(end_rank - first_rank + 1,
+                     count) if end_rank is not None else count
+            if lo >= hi:
+                continue
+
+            runs = _decode_runs(self._buf, block_offset, count, encoding)
+            if lo > 0 or hi < count:
+                runs = _slice_runs(runs, lo, hi)
+
+            offsets = struct.unpack_from(
+                f"<{count + 1}I", self._buf, block_offset + offsets_offset)
+            usernames = UsernameColumn(
+                self._buf, offsets[lo:hi + 1], block_offset + blob_offset)
+
+            yield (first_rank + lo, runs, usernames)
+
+    def blocks(self, start_rank: int | None = None, end_rank: int | None = None) -> Iterator[tuple[int, list[int], UsernameColumn]]:
+        """
+        Yields `(first_rank, scores, usernames)` columns of contiguous ranks,
+        limited to `start_rank` and `end_rank` (inclusive) when given.
+        """
+        for first_rank, runs, usernames in self.runs(start_rank=start_rank, end_rank=end_rank):
+            yield (first_rank, [score for score, count in runs for _ in range(count)], usernames)
+
+    def records(self, start_rank: int | None = None, end_rank: int | None = None) -> Iterator[CategoryRecord]:
+        """ Yields the records between `start_rank` and `end_rank` (inclusive) when given. """
+        for first_rank, scores, usernames in self.blocks(start_rank=start_rank, end_rank=end_rank):
+            for i, score in enumerate(scores):
+                yield CategoryRecord(rank=first_rank + i, score=score, username=usernames[i])
+
+    def __iter__(self) -> Iterator[CategoryRecord]:
+        return self.records()
+
+    def feed(self, category_info: BaseCategoryInfo, start_rank: int | None = None, end_rank: int | None = None) -> None:
+        """ Adds the records between `start_rank` and `end_rank` to an aggregation run wise. """
+        for first_rank, runs, usernames in self.runs(start_rank=start_rank, end_rank=end_rank):
+            category_info.add_runs(
+                first_rank=first_rank, runs=runs, usernames=usernames)
+
+
+def write_snapshot(file_path: str, records: Iterator[CategoryRecord], block_size: int = BLOCK_SIZE) -> int:
+    """ Writes rank ordered records to a snapshot, returns the amount of records written. """
+    with SnapshotWriter(file_path, block_size=block_size) as writer:
+        for record in records:
+            writer.add(record)
+    return writer.count
@@ -0,0 +1,47 @@
+import sqlite3
+from typing import Iterable
+
+from ..request.records import CategoryRecord
+from .player_store import username_key
+
+INSERT_BATCH_SIZE = 10_000
+
+# stores referencing players by id share this dictionary of their names
+USERNAMES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usernames (
+    id INTEGER PRIMARY KEY,
+    username_key TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL
+);
+"""
+
+
+def load_incoming(conn: sqlite3.Connection, records: Iterable[CategoryRecord]) -> int:
+    """
+    Loads category records into the temp table `incoming (username_key, username, rank, score)`, replacing an
+    earlier one, and interns their names in the `usernames` table. Join both on `username_key` for the user ids.
+    Returns the amount of records read.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.incoming")
+    conn.execute(
+        "CREATE TEMP TABLE incoming (username_key TEXT PRIMARY KEY, username TEXT NOT NULL, rank INTEGER NOT NULL, score INTEGER NOT NULL)")
+
+    count, batch = 0, []
+    for record in records:
+        batch.append((username_key(record.username),
+                     record.username, record.rank, record.score))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            count += _insert_incoming(conn, batch)
+            batch = []
+    count += _insert_incoming(conn, batch)
+
+    conn.execute(
+        "INSERT OR IGNORE INTO usernames (username_key, username) SELECT username_key, username FROM incoming")
+    return count
+
+
+def _insert_incoming(conn: sqlite3.Connection, batch: list[tuple[str, str, int, int]]) -> int:
+    # a name listed twice (e.g. renamed mid scrape) keeps its last listing
+    conn.executemany(
+        "INSERT OR REPLACE INTO incoming VALUES (?, ?, ?, ?)", batch)
+    return len(batch)
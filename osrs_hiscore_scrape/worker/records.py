@@ -3,7 +3,7 @@ from asyncio import CancelledError, Queue
 from typing import Callable
 
 from ..exception.records import NotFound, RetryFailed
-from ..job.records import IJob, JobManager, JobQueue
+from ..job.records import IJob, JobManager, JobQueue, SkippedJob
 from ..request.request import Requests
 from ..util.retry_handler import retry
 
@@ -24,6 +24,10 @@ class Worker:
     The worker continuously fetches jobs from `in_queue`, executes a request
     function on each job, waits for its turn based on the job's priority, and
     then enqueues the result using a provided enqueue function.
+
+    Jobs `skip_fn` returns True for are handled like NotFound ones without executing the request.
+    With `forward_skipped`, those jobs are put on the output queue as `SkippedJob` in their turn,
+    so the next stage (e.g. a writer) still accounts for them.
     """
 
     def __init__(
@@ -34,6 +38,8 @@ class Worker:
         job_manager: JobManager,
         request_fn: Callable,
         enqueue_fn: Callable,
+        skip_fn: Callable[[Requests, IJob], bool] | None = None,
+        forward_skipped: bool = False,
     ):
         self.req = req
         self.in_q = in_queue
@@ -41,6 +47,8 @@ class Worker:
         self.job_manager = job_manager
         self.request_fn = request_fn
         self.enqueue_fn = enqueue_fn
+        self.skip_fn = skip_fn
+        self.forward_skipped = forward_skipped
 
     async def run(self, initial_delay: float = 0, max_retries: int = 10, skip_failed: bool = False) -> None:
         """            
@@ -53,7 +61,7 @@ class Worker:
             6. Increment the `job_counter`.
 
         Exceptions Handled:
-            NotFound: Simply increments the job counter and continues.
+            NotFound: Increments the job counter (after forwarding a `SkippedJob` with `forward_skipped`) and continues.
             CancelledError, RetryFailed: Requeues the job forcibly and re-raises the exception.
         """
         while not self.job_manager.is_finished():
@@ -78,6 +86,8 @@ class Worker:
 
             try:
                 if job.result is None:
+                    if self.skip_fn is not None and self.skip_fn(self.req, job):
+                        raise NotFound("skipped without a request")
                     await retry(self.request_fn, req=self.req, job=job, max_retries=max_retries)
 
                 while self.job_manager.value < job.priority:
@@ -87,6 +97,10 @@ class Worker:
                 self.job_manager.next()
 
             except NotFound:
+                if self.forward_skipped:
+                    while self.job_manager.value < job.priority:
+                        await self.job_manager.await_next()
+                    await self.out_q.put(SkippedJob(priority=job.priority))
                 self.job_manager.next()
             except (CancelledError, RetryFailed):
                 if skip_failed:
@@ -103,7 +117,10 @@ def create_workers(
     job_manager: JobManager,
     request_fn: Callable,
     enqueue_fn: Callable,
-    num_workers: int
+    num_workers: int,
+    skip_fn: Callable[[Requests, IJob], bool] | None = None,
+    forward_skipped: bool = False
 ):
-    return [Worker(req=req, request_fn=request_fn, enqueue_fn=enqueue_fn, in_queue=in_queue, out_queue=out_queue, job_manager=job_manager)
+    return [Worker(req=req, request_fn=request_fn, enqueue_fn=enqueue_fn, in_queue=in_queue, out_queue=out_queue, job_manager=job_manager,
+                   skip_fn=skip_fn, forward_skipped=forward_skipped)
             for _ in range(num_workers)]
@@ -1,101 +1,396 @@
 import argparse
 import asyncio
 import datetime
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from functools import partial
+from typing import Any
 
 import aiohttp
 
 from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
 from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
-from osrs_hiscore_scrape.job.job_builder import get_hs_page_job
+from osrs_hiscore_scrape.job.job_builder import build_hs_page_job
 from osrs_hiscore_scrape.job.job_handlers import (
     enqueue_analyse_page_category, request_hs_page)
-from osrs_hiscore_scrape.job.records import IJob, JobManager, JobQueue
+from osrs_hiscore_scrape.job.planner import RunPlan, Stage, plan_run
+from osrs_hiscore_scrape.job.records import (HSCategoryJob, IJob, JobManager,
+                                             JobQueue)
 from osrs_hiscore_scrape.log.decorators import log_lifecycle, profile_execution
 from osrs_hiscore_scrape.log.logger import get_logger
-from osrs_hiscore_scrape.request.dto import GetMaxHighscorePageRequest
+from osrs_hiscore_scrape.request.constants import (HS_PAGE_SIZE,
+                                                   SAFE_REQUESTS_PER_SECOND)
+from osrs_hiscore_scrape.request.dto import (GetHighscorePageRequest,
+                                             GetMaxHighscorePageRequest,
+                                             GetMaxHighscorePageResult)
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
-from osrs_hiscore_scrape.request.records import CategoryInfo
+from osrs_hiscore_scrape.request.records import (BaseCategoryInfo,
+                                                 CategoryInfoMode,
+                                                 CategoryRecord,
+                                                 SampledCategoryInfo)
 from osrs_hiscore_scrape.request.request import Requests
-from osrs_hiscore_scrape.util.io import (build_temp_file,
+from osrs_hiscore_scrape.statistic.sampling import (DEFAULT_CONFIDENCE,
+                                                    DEFAULT_PRECISION,
+                                                    DEFAULT_STRATA)
+from osrs_hiscore_scrape.statistic.sketch import DEFAULT_QUANTILE_ERROR
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.io import (build_temp_file, is_stdout,
                                          read_category_records, read_proxies,
-                                         write_record, write_records)
+                                         read_state, write_record,
+                                         write_records, write_state)
+from osrs_hiscore_scrape.util.retry_handler import retry
 from osrs_hiscore_scrape.worker.records import create_workers
 
 logger = get_logger(__name__)
+CHECKPOINT_EVERY_PAGES = 500
+
+
+def create_category_info(hs_type: HSType, stats_mode: CategoryInfoMode, quantile_error: float, expected_count: int,
+                         percentiles: list[float] | None = None, histogram_bins: int = 0) -> BaseCategoryInfo:
+    """ Creates the category aggregation for the selected statistics mode. """
+    options: dict[str, Any] = {}
+    if stats_mode is CategoryInfoMode.streaming:
+        options["quantile_error"] = quantile_error
+    elif stats_mode is CategoryInfoMode.ranked:
+        options["expected_count"] = expected_count
+    elif stats_mode is CategoryInfoMode.columnar:
+        options["percentiles"] = percentiles or []
+        options["histogram_bins"] = histogram_bins
+
+    return stats_mode.create(name=hs_type.name, ts=datetime.datetime.now(datetime.timezone.utc), **options)
+
+
+@dataclass
+class AnalyseShard:
+    """ Rank range of a category that gets analysed by a single process. """
+    proxy_file: str | None
+    account_type: HSAccountTypes
+    hs_type: HSType
+    stats_mode: CategoryInfoMode
+    quantile_error: float
+    max_page_res: GetMaxHighscorePageResult
+    start_rank: int
+    end_rank: int
+    num_workers: int
+    temp_file: str
+    percentiles: list[float] | None = None
+    histogram_bins: int = 0
+
+
+def split_rank_range(start_rank: int, end_rank: int, shards: int) -> list[tuple[int, int]]:
+    """ Splits an inclusive rank range into `shards` contiguous page aligned ranges. """
+    pages = (end_rank - start_rank) // HS_PAGE_SIZE + 1
+    pages_per_shard = -(-pages // max(shards, 1))
+
+    ranges = []
+    shard_start = start_rank
+    while shard_start <= end_rank:
+        shard_end = min(end_rank, shard_start +
+                        pages_per_shard * HS_PAGE_SIZE - 1)
+        ranges.append((shard_start, shard_end))
+        shard_start = shard_end + 1
+    return ranges
+
+
+def restore_category_info(category_info: BaseCategoryInfo, temp_file: str) -> BaseCategoryInfo:
+    """
+    Restores the aggregation of a previous run. If there is a checkpoint, it gets loaded and only
+    the temp file tail written after it gets replayed, otherwise the whole temp file is replayed.
+    """
+    checkpoint = read_state(f"{temp_file}.state")
+
+    if checkpoint and checkpoint["category_info"]["mode"] != CategoryInfoMode(type(category_info)).name:
+        logger.warning(
+            f"checkpoint was made with stats mode '{checkpoint['category_info']['mode']}', replaying temp file instead")
+        checkpoint = None
+
+    if not checkpoint:
+        for record in read_category_records(temp_file):
+            category_info.add(record=record)
+        return category_info
+
+    restored = CategoryInfoMode.from_state(checkpoint["category_info"])
+
+    tail = 0
+    for record in read_category_records(temp_file, offset=checkpoint["temp_offset"]):
+        if record.rank > checkpoint["last_rank"]:
+            restored.add(record=record)
+            tail += 1
+
+    logger.info(
+        f"resuming from checkpoint at page {checkpoint['committed_page']}, replayed {tail} records from the temp file tail")
+    return restored
+
+
+def scraped_until(temp_file: str) -> int:
+    """
+    Last rank the temp file of an earlier run holds, 0 if there's none.
+    Only the part after a checkpoint is read, like when the aggregation gets restored.
+    """
+    checkpoint = read_state(f"{temp_file}.state")
+    last_rank = checkpoint["last_rank"] if checkpoint else 0
+    for record in read_category_records(temp_file, offset=checkpoint["temp_offset"] if checkpoint else 0):
+        last_rank = max(last_rank, record.rank)
+    return last_rank
+
+
+def plan_analysis(req: Requests, account_type: HSAccountTypes, hs_type: HSType, max_page_res: GetMaxHighscorePageResult, temp_file: str,
+                  num_workers: int, shards: int = 1, rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND) -> RunPlan:
+    """ Plans the page requests of the analysis, pages the temp files of an earlier run already hold aren't counted. """
+    max_page_req = GetMaxHighscorePageRequest(
+        hs_type=hs_type, account_type=account_type)
+    ranges = split_rank_range(start_rank=1, end_rank=max_page_res.rank_nr, shards=shards) if shards > 1 \
+        else [(1, max_page_res.rank_nr)]
+
+    pages = 0
+    for shard_start, shard_end in ranges:
+        shard_file = f"{temp_file}.{shard_start}-{shard_end}" if shards > 1 else temp_file
+        start = max(shard_start, scraped_until(shard_file) + 1)
+        if start > shard_end:
+            # the temp file of an earlier run already holds the whole range
+            continue
+        pages += len(build_hs_page_job(start_rank=start,
+                                       end_rank=shard_end,
+                                       max_page_res=max_page_res,
+                                       max_page_req=max_page_req))
+
+    # every shard runs its own share of the workers
+    workers = max(1, num_workers // shards) * \
+        len(ranges) if shards > 1 else num_workers
+    return plan_run(req, [Stage(name="pages", requests=pages, workers=workers)], rate_per_proxy=rate_per_proxy)
+
+
+def store_category_info(category_info: BaseCategoryInfo, temp_file: str, temp_offset: int | None = None, committed_page: int | None = None):
+    """
+    Stores a checkpoint of the aggregation together with the temp file offset it covers,
+    only done for modes with a compact state since the others would just duplicate the temp file.
+    """
+    if not category_info.compact_state or not category_info.min:
+        return
+
+    if temp_offset is None:
+        temp_offset = os.path.getsize(
+            temp_file) if os.path.isfile(temp_file) else 0
+
+    write_state(f"{temp_file}.state", {
+        "category_info": category_info.to_state(),
+        "last_rank": category_info.min.rank,
+        "committed_page": committed_page if committed_page is not None else (category_info.min.rank - 1) // HS_PAGE_SIZE + 1,
+        "temp_offset": temp_offset,
+    })
+
+
+async def scrape_category(req: Requests, hs_scrape_joblist: list[HSCategoryJob], category_info: BaseCategoryInfo, temp_file: str, num_workers: int):
+    """ Scrapes the category pages into the aggregation, scraped records are appended to the temp file. """
+    hs_scrape_job_q = JobQueue[IJob]()
+    for job in hs_scrape_joblist:
+        await hs_scrape_job_q.put(job)
+
+    temp_export_q = asyncio.Queue()
+
+    scrape_job_manager = JobManager(
+        start=hs_scrape_joblist[0].page_num, end=hs_scrape_joblist[-1].page_num)
+    hs_scrape_workers = create_workers(
+        req=req,
+        in_queue=hs_scrape_job_q,
+        out_queue=temp_export_q,
+        job_manager=scrape_job_manager,
+        request_fn=request_hs_page,
+        enqueue_fn=partial(enqueue_analyse_page_category,
+                           category_info=category_info),
+        num_workers=num_workers
+    )
+
+    T = [asyncio.create_task(
+        write_records(in_queue=temp_export_q,
+                      out_file=temp_file,
+                      total=hs_scrape_joblist[-1].page_num -
+                      scrape_job_manager.value + 1,
+                      format=lambda job: '\n'.join(
+                          str(item) for item in job.result[job.start_idx:job.end_idx]),
+                      checkpoint=lambda job, offset: store_category_info(
+                          category_info=category_info, temp_file=temp_file, temp_offset=offset, committed_page=job.page_num),
+                      checkpoint_every=CHECKPOINT_EVERY_PAGES if category_info.compact_state else 0
+                      )
+    )]
+
+    for i, w in enumerate(hs_scrape_workers):
+        T.append(asyncio.create_task(
+            w.run(initial_delay=i * 0.1)
+        ))
+
+    try:
+        await asyncio.gather(*T)
+    finally:
+        for task in T:
+            task.cancel()
+        await asyncio.gather(*T, return_exceptions=True)
+        store_category_info(category_info=category_info, temp_file=temp_file)
+
+
+async def analyse_shard(shard: AnalyseShard) -> dict[str, Any]:
+    """ Analyses the rank range of a shard and returns the partial aggregation state. """
+    category_info = restore_category_info(
+        category_info=create_category_info(hs_type=shard.hs_type, stats_mode=shard.stats_mode,
+                                           quantile_error=shard.quantile_error, expected_count=shard.max_page_res.rank_nr,
+                                           percentiles=shard.percentiles, histogram_bins=shard.histogram_bins),
+        temp_file=shard.temp_file)
+
+    start_rank = category_info.min.rank + \
+        1 if category_info.min else shard.start_rank
+    hs_scrape_joblist = build_hs_page_job(start_rank=start_rank,
+                                          end_rank=shard.end_rank,
+                                          max_page_res=shard.max_page_res,
+                                          max_page_req=GetMaxHighscorePageRequest(
+                                              hs_type=shard.hs_type, account_type=shard.account_type)
+                                          )
+
+    if hs_scrape_joblist:
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
+            req = Requests(session=session,
+                           proxy_list=read_proxies(shard.proxy_file))
+            await scrape_category(req=req, hs_scrape_joblist=hs_scrape_joblist, category_info=category_info,
+                                  temp_file=shard.temp_file, num_workers=shard.num_workers)
+
+    return category_info.to_state()
+
+
+async def fetch_pages(req: Requests, account_type: HSAccountTypes, hs_type: HSType, pages: list[int],
+                      num_workers: int) -> list[tuple[int, list[CategoryRecord]]]:
+    """ Fetches hiscore pages with at most `num_workers` requests in flight, in page order. """
+    semaphore = asyncio.Semaphore(num_workers)
+
+    async def fetch(page_num: int) -> tuple[int, list[CategoryRecord]]:
+        async with semaphore:
+            return page_num, await retry(req.get_hs_page, page_req=GetHighscorePageRequest(
+                page_num=page_num, hs_type=hs_type, account_type=account_type))
+
+    return await asyncio.gather(*(fetch(page_num) for page_num in pages))
+
+
+async def sample_category(req: Requests, category_info: SampledCategoryInfo, account_type: HSAccountTypes, hs_type: HSType,
+                          num_workers: int, precision: float) -> None:
+    """
+    Fetches the pages the exact statistics need, then grows the random sample in rounds until the mean is known
+    within `precision` (relative) or every page was fetched. Every round draws the pages the spread seen so far
+    asks for, at most doubling the sample so an early underestimated spread can't overshoot much.
+    """
+    sample = category_info.sample
+    fetched: dict[int, list[CategoryRecord]] = {}
+    pages = sorted(set(category_info.required_pages())
+                   | set(sample.next_pages(0)))
+
+    while pages:
+        for page_num, records in await fetch_pages(req, account_type, hs_type, [p for p in pages if p not in fetched], num_workers):
+            fetched[page_num] = records
+        for page_num in pages:
+            category_info.add_page(page_num, fetched[page_num])
+
+        if sample.is_complete() or sample.relative_error() <= precision:
+            break
+        needed = sample.pages_needed(precision) - sample.pages()
+        pages = sample.next_pages(
+            max(num_workers, min(needed, sample.pages())))
+        logger.info(f"sampled {sample.pages()}/{sample.page_count} pages, mean within ±{sample.relative_error():.2%}, "
+                    f"drawing {len(pages)} more")
+
+    logger.info(f"fetched {len(fetched)}/{sample.page_count} pages, mean within ±{sample.relative_error():.2%} "
+                f"at {sample.confidence:.0%} confidence")
+
+
+def run_shard(shard: AnalyseShard) -> dict[str, Any]:
+    """ Process entry point of a shard. """
+    return asyncio.run(analyse_shard(shard))
 
 
 @log_lifecycle
 @profile_execution
-async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTypes, hs_type: HSType, num_workers: int):
-    category_info = CategoryInfo(
-        name=hs_type.name, ts=datetime.datetime.now(datetime.timezone.utc))
+async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTypes, hs_type: HSType, num_workers: int,
+               stats_mode: CategoryInfoMode = CategoryInfoMode.exact, quantile_error: float = DEFAULT_QUANTILE_ERROR, shards: int = 1,
+               sample: bool = False, precision: float = DEFAULT_PRECISION, confidence: float = DEFAULT_CONFIDENCE,
+               strata: int = DEFAULT_STRATA, plan: bool = False, rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND,
+               percentiles: list[float] | None = None, histogram_bins: int = 0):
+    if (percentiles or histogram_bins) and (stats_mode is not CategoryInfoMode.columnar or sample):
+        raise ValueError(
+            "percentiles and histograms need the columnar stats mode")
+    if sample and shards > 1:
+        raise ValueError(
+            "a sampled analysis fetches few pages and can't be sharded")
+    if sample and plan:
+        raise ValueError(
+            "a sampled analysis decides how many pages it needs while sampling, it can't be planned")
 
     temp_file = build_temp_file(out_file, account_type, hs_type)
 
-    for record in read_category_records(temp_file):
-        category_info.add(record=record)
-
-    start_rank = category_info.min.rank + 1 if category_info.min else 1
-
     async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
         req = Requests(session=session, proxy_list=read_proxies(proxy_file))
 
-        hs_scrape_joblist = await get_hs_page_job(req=req,
-                                                  start_rank=start_rank,
-                                                  end_rank=-1,
-                                                  max_page_req=GetMaxHighscorePageRequest(
-                                                      hs_type=hs_type, account_type=account_type)
-                                                  )
+        max_page_req = GetMaxHighscorePageRequest(
+            hs_type=hs_type, account_type=account_type)
+        max_page_res = await req.get_max_page(max_page_req=max_page_req)
+
+        if plan:
+            run_plan = plan_analysis(req=req, account_type=account_type, hs_type=hs_type, max_page_res=max_page_res,
+                                     temp_file=temp_file, num_workers=num_workers, shards=shards, rate_per_proxy=rate_per_proxy)
+            print(json_wrapper.dumps(run_plan.to_dict()))
+            return
+
+        if sample:
+            # a sample is cheap to take again, so it's neither checkpointed nor written to the temp file
+            category_info = SampledCategoryInfo(name=hs_type.name, ts=datetime.datetime.now(datetime.timezone.utc),
+                                                expected_count=max_page_res.rank_nr, strata=strata, confidence=confidence)
+            await sample_category(req=req, category_info=category_info, account_type=account_type, hs_type=hs_type,
+                                  num_workers=num_workers, precision=precision)
+            write_record(out_file=out_file, data=str(category_info))
+            return
+
+        if shards > 1:
+            analyse_shards = [
+                AnalyseShard(proxy_file=proxy_file, account_type=account_type, hs_type=hs_type, stats_mode=stats_mode,
+                             quantile_error=quantile_error, max_page_res=max_page_res, start_rank=shard_start,
+                             end_rank=shard_end, num_workers=max(
+                                 1, num_workers // shards),
+                             temp_file=f"{temp_file}.{shard_start}-{shard_end}", percentiles=percentiles,
+                             histogram_bins=histogram_bins)
+                for shard_start, shard_end in split_rank_range(start_rank=1, end_rank=max_page_res.rank_nr, shards=shards)
+            ]
 
-        hs_scrape_job_q = JobQueue[IJob]()
-        for job in hs_scrape_joblist:
-            await hs_scrape_job_q.put(job)
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=len(analyse_shards)) as pool:
+                states = await asyncio.gather(*(loop.run_in_executor(pool, run_shard, shard) for shard in analyse_shards))
 
-        if not hs_scrape_job_q:
+            category_info = CategoryInfoMode.from_state(states[0])
+            for state in states[1:]:
+                category_info.merge(CategoryInfoMode.from_state(state))
+
+            write_record(out_file=out_file, data=str(category_info))
+            return
+
+        category_info = restore_category_info(
+            category_info=create_category_info(hs_type=hs_type, stats_mode=stats_mode,
+                                               quantile_error=quantile_error, expected_count=max_page_res.rank_nr,
+                                               percentiles=percentiles, histogram_bins=histogram_bins),
+            temp_file=temp_file)
+
+        start_rank = category_info.min.rank + 1 if category_info.min else 1
+
+        hs_scrape_joblist = build_hs_page_job(start_rank=start_rank,
+                                              end_rank=-1,
+                                              max_page_res=max_page_res,
+                                              max_page_req=max_page_req
+                                              )
+
+        if not hs_scrape_joblist:
             logger.info("bypass scraping, temp file contains all the data")
             write_record(out_file=out_file, data=f'{category_info}')
             return
 
-        temp_export_q = asyncio.Queue()
-
-        scrape_job_manager = JobManager(
-            start=hs_scrape_joblist[0].page_num, end=hs_scrape_joblist[-1].page_num)
-        hs_scrape_workers = create_workers(
-            req=req,
-            in_queue=hs_scrape_job_q,
-            out_queue=temp_export_q,
-            job_manager=scrape_job_manager,
-            request_fn=request_hs_page,
-            enqueue_fn=partial(enqueue_analyse_page_category,
-                               category_info=category_info),
-            num_workers=num_workers
-        )
-
-        T = [asyncio.create_task(
-            write_records(in_queue=temp_export_q,
-                          out_file=temp_file,
-                          total=hs_scrape_joblist[-1].page_num -
-                          scrape_job_manager.value + 1,
-                          format=lambda job: '\n'.join(
-                              str(item) for item in job.result[job.start_idx:job.end_idx])
-                          )
-        )]
-
-        for i, w in enumerate(hs_scrape_workers):
-            T.append(asyncio.create_task(
-                w.run(initial_delay=i * 0.1)
-            ))
-
-        try:
-            await asyncio.gather(*T)
-            write_record(out_file=out_file, data=str(category_info))
-        finally:
-            for task in T:
-                task.cancel()
-            await asyncio.gather(*T, return_exceptions=True)
+        await scrape_category(req=req, hs_scrape_joblist=hs_scrape_joblist, category_info=category_info,
+                              temp_file=temp_file, num_workers=num_workers)
+        write_record(out_file=out_file, data=str(category_info))
 
 
 if __name__ == '__main__':
@@ -106,14 +401,22 @@ if __name__ == '__main__':
         .proxy_file() \
         .account_type(required=True, default=None) \
         .hs_type(required=True, default=None) \
-        .num_workers()
+        .num_workers() \
+        .category_info_mode() \
+        .shards() \
+        .sampling() \
+        .plan() \
+        .headless()
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(
+        headless=args.headless or is_stdout(args.output_file))
 
     try:
         asyncio.run(main(args.output_file, args.proxy_file,
-                    args.account_type, args.hs_type, args.num_workers))
+                    args.account_type, args.hs_type, args.num_workers, args.stats_mode, args.quantile_error, args.shards,
+                    args.sample, args.precision, args.confidence, args.strata, args.plan, args.rate_per_proxy,
+                    args.percentiles, args.histogram_bins))
     except Exception as e:
         logger.error(str(e))
         sys.exit(2)
@@ -107,9 +107,10 @@ if __name__ == '__main__':
     parser = OSRSArgumentParser(
         formatter_class=argparse.RawTextHelpFormatter)
 
-    parser.proxy_file(required=True)
+    parser.proxy_file(required=True) \
+        .headless()
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(headless=args.headless)
 
     asyncio.run(main(args.proxy_file))
@@ -45,10 +45,11 @@ if __name__ == '__main__':
         formatter_class=argparse.RawTextHelpFormatter)
 
     parser.account_type(required=True, default=None) \
-        .hs_type(required=True, default=None)
+        .hs_type(required=True, default=None) \
+        .headless()
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(headless=args.headless)
 
     try:
         asyncio.run(main(args.account_type, args.hs_type))
@@ -1,39 +1,145 @@
 import argparse
 import asyncio
+import os
 import sys
 
 import aiohttp
 
 from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
 from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
-from osrs_hiscore_scrape.job.job_builder import get_hs_page_job
+from osrs_hiscore_scrape.job.checkpoint import JobJournal
+from osrs_hiscore_scrape.job.job_builder import build_hs_page_job
 from osrs_hiscore_scrape.job.job_handlers import (enqueue_hs_page,
                                                   request_hs_page)
-from osrs_hiscore_scrape.job.records import IJob, JobManager, JobQueue
+from osrs_hiscore_scrape.job.planner import RunPlan, Stage, plan_run
+from osrs_hiscore_scrape.job.records import (HSCategoryJob, IJob, JobManager,
+                                             JobQueue)
 from osrs_hiscore_scrape.log.decorators import log_lifecycle, profile_execution
 from osrs_hiscore_scrape.log.logger import get_logger
-from osrs_hiscore_scrape.request.dto import GetMaxHighscorePageRequest
+from osrs_hiscore_scrape.request.constants import SAFE_REQUESTS_PER_SECOND
+from osrs_hiscore_scrape.request.dto import (GetMaxHighscorePageRequest,
+                                             GetMaxHighscorePageResult)
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
 from osrs_hiscore_scrape.request.request import Requests
-from osrs_hiscore_scrape.util.io import read_proxies, write_records
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.io import (file_size, is_stdout,
+                                         open_output_index,
+                                         read_category_records, read_proxies,
+                                         truncate_file, write_records)
+from osrs_hiscore_scrape.util.offset_index import OffsetIndex, index_path
+from osrs_hiscore_scrape.util.snapshot import (CategoryOutputFormat,
+                                               write_snapshot)
 from osrs_hiscore_scrape.worker.records import create_workers
 
 logger = get_logger(__name__)
 
 
+async def prepare_scrape_jobs(req: Requests, journal: JobJournal, out_file: str, account_type: HSAccountTypes, hs_type: HSType, start_rank: int, end_rank: int) -> list[HSCategoryJob]:
+    """
+    Builds the page jobs, resuming from the journal of an interrupted run if there is one.
+    On resume the max page isn't requested again and pages that were already written are left out.
+    """
+    params = journal_params(account_type, hs_type, start_rank, end_rank)
+    max_page_req = GetMaxHighscorePageRequest(
+        hs_type=hs_type, account_type=account_type)
+
+    plan = journal.load(params)
+    if plan is not None:
+        truncate_file(out_file, journal.offset)
+        logger.info(
+            f"resuming from {journal.file_path}, {len(journal.committed)} pages already written")
+    else:
+        res = await req.get_max_page(max_page_req=max_page_req)
+        plan = {"page_nr": res.page_nr, "rank_nr": res.rank_nr}
+        journal.start(params, plan, offset=file_size(out_file))
+
+    joblist = build_hs_page_job(start_rank=start_rank,
+                                end_rank=end_rank,
+                                max_page_res=GetMaxHighscorePageResult(
+                                    page_nr=plan["page_nr"], rank_nr=plan["rank_nr"]),
+                                max_page_req=max_page_req)
+    return [job for job in joblist if job.priority not in journal.committed]
+
+
+def journal_params(account_type: HSAccountTypes, hs_type: HSType, start_rank: int, end_rank: int) -> dict[str, object]:
+    """ Parameters a journal has to be started with to be resumed by this run. """
+    return {"account_type": str(account_type), "hs_type": str(hs_type),
+            "start_rank": start_rank, "end_rank": end_rank}
+
+
+async def plan_scrape(req: Requests, journal: JobJournal, account_type: HSAccountTypes, hs_type: HSType, start_rank: int, end_rank: int,
+                      num_workers: int, rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND) -> RunPlan:
+    """
+    Plans the run without scraping any page. The max page comes from the journal of an interrupted run if there is one
+    (without touching it), otherwise it's discovered. Pages that were already written aren't counted.
+    """
+    max_page_req = GetMaxHighscorePageRequest(
+        hs_type=hs_type, account_type=account_type)
+
+    plan = journal.peek(journal_params(
+        account_type, hs_type, start_rank, end_rank))
+    if plan is None:
+        res = await req.get_max_page(max_page_req=max_page_req)
+        plan = {"page_nr": res.page_nr, "rank_nr": res.rank_nr}
+
+    joblist = build_hs_page_job(start_rank=start_rank,
+                                end_rank=end_rank,
+                                max_page_res=GetMaxHighscorePageResult(
+                                    page_nr=plan["page_nr"], rank_nr=plan["rank_nr"]),
+                                max_page_req=max_page_req)
+    pages = sum(job.priority not in journal.committed for job in joblist)
+    return plan_run(req, [Stage(name="pages", requests=pages, workers=num_workers)], rate_per_proxy=rate_per_proxy)
+
+
+def finish_output(write_file: str, out_file: str, output_format: CategoryOutputFormat):
+    """ Converts the completed json lines output into the requested output format. """
+    if output_format is CategoryOutputFormat.snapshot and os.path.isfile(write_file):
+        count = write_snapshot(out_file, read_category_records(write_file))
+        os.remove(write_file)
+        # snapshots are rank addressable on their own
+        OffsetIndex(index_path(write_file)).remove()
+        logger.info(f"wrote {count} records to snapshot {out_file}")
+
+
 @log_lifecycle
 @profile_execution
-async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTypes, hs_type: HSType, start_rank: int, end_rank: int, num_workers: int):
+async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTypes, hs_type: HSType, start_rank: int, end_rank: int, num_workers: int, flush_interval: float = 0.0, fsync: bool = False,
+               output_format: CategoryOutputFormat = CategoryOutputFormat.jsonl, index_stride: int = 0,
+               plan: bool = False, rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND):
+    if is_stdout(out_file) and output_format is not CategoryOutputFormat.jsonl:
+        raise ValueError(f"{output_format} output can't be streamed to stdout")
+
+    # snapshots can't be appended to, so pages are journaled as json lines and converted once complete
+    write_file = out_file if output_format is CategoryOutputFormat.jsonl else f"{out_file}.partial"
+
     async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
         req = Requests(session=session, proxy_list=read_proxies(proxy_file))
+        # a stream can't be resumed, so there's nothing to journal
+        journal = JobJournal(f"{write_file}.journal" if not is_stdout(
+            write_file) else None, fsync=fsync)
+
+        if plan:
+            run_plan = await plan_scrape(req=req, journal=journal, account_type=account_type, hs_type=hs_type,
+                                         start_rank=start_rank, end_rank=end_rank, num_workers=num_workers,
+                                         rate_per_proxy=rate_per_proxy)
+            print(json_wrapper.dumps(run_plan.to_dict()))
+            return
+
+        hs_scrape_joblist = await prepare_scrape_jobs(req=req,
+                                                      journal=journal,
+                                                      out_file=write_file,
+                                                      account_type=account_type,
+                                                      hs_type=hs_type,
+                                                      start_rank=start_rank,
+                                                      end_rank=end_rank)
+        if not hs_scrape_joblist:
+            finish_output(write_file, out_file, output_format)
+            journal.remove()
+            return
+
+        index = open_output_index(write_file, index_stride)
 
-        hs_scrape_joblist = await get_hs_page_job(req=req,
-                                                  start_rank=start_rank,
-                                                  end_rank=end_rank,
-                                                  max_page_req=GetMaxHighscorePageRequest(
-                                                      hs_type=hs_type, account_type=account_type)
-                                                  )
         hs_scrape_job_q = JobQueue[IJob]()
         for job in hs_scrape_joblist:
             await hs_scrape_job_q.put(job)
@@ -41,7 +147,7 @@ async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTyp
         export_q = asyncio.Queue()
 
         scrape_job_manager = JobManager(
-            start=hs_scrape_joblist[0].page_num, end=hs_scrape_joblist[-1].page_num)
+            start=hs_scrape_joblist[0].page_num, end=hs_scrape_joblist[-1].page_num, skip=journal.committed)
         hs_scrape_workers = create_workers(
             req=req,
             in_queue=hs_scrape_job_q,
@@ -54,21 +160,28 @@ async def main(out_file: str, proxy_file: str | None, account_type: HSAccountTyp
 
         T: list[asyncio.Task[None]] = [asyncio.create_task(
             write_records(in_queue=export_q,
-                          out_file=out_file,
-                          total=hs_scrape_joblist[-1].page_num -
-                          hs_scrape_joblist[0].page_num + 1,
+                          out_file=write_file,
+                          total=len(hs_scrape_joblist),
                           format=lambda job: '\n'.join(
-                              str(item) for item in job.result[job.start_idx:job.end_idx])
+                              str(item) for item in job.result[job.start_idx:job.end_idx]),
+                          journal=journal,
+                          flush_interval=flush_interval,
+                          fsync=fsync,
+                          index=index,
+                          index_key=lambda job: job.start_rank
                           )
         )]
         for i, w in enumerate(hs_scrape_workers):
             T.append(asyncio.create_task(w.run(initial_delay=i * 0.1)))
         try:
             await asyncio.gather(*T)
+            finish_output(write_file, out_file, output_format)
+            journal.remove()
         finally:
             for task in T:
                 task.cancel()
             await asyncio.gather(*T, return_exceptions=True)
+            journal.close()
 
 
 if __name__ == '__main__':
@@ -80,14 +193,21 @@ if __name__ == '__main__':
         .account_type() \
         .hs_type() \
         .rank_range() \
-        .num_workers()
+        .num_workers() \
+        .output_format() \
+        .index_stride() \
+        .write_policy() \
+        .plan() \
+        .headless()
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(
+        headless=args.headless or is_stdout(args.output_file))
 
     try:
         asyncio.run(main(args.output_file, args.proxy_file,
-                         args.account_type, args.hs_type, args.start_rank, args.end_rank, args.num_workers))
+                         args.account_type, args.hs_type, args.start_rank, args.end_rank, args.num_workers, args.flush_interval, args.fsync, args.output_format, args.index_stride,
+                         args.plan, args.rate_per_proxy))
     except Exception as e:
         logger.error(str(e))
         sys.exit(2)
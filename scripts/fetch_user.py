@@ -15,6 +15,9 @@ from osrs_hiscore_scrape.request.hs_types import HSType
 from osrs_hiscore_scrape.request.records import PlayerRecord
 from osrs_hiscore_scrape.request.request import Requests
 from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.player_store import (DEFAULT_MAX_AGE,
+                                                   DEFAULT_NOT_FOUND_TTL,
+                                                   open_player_store)
 from osrs_hiscore_scrape.util.retry_handler import retry
 
 logger = get_logger(__name__)
@@ -34,9 +37,11 @@ def format_section(section):
 
 @log_lifecycle
 @profile_execution
-async def main(username: str, lookup_account_type: HSAccountTypes, hs_type: HSType | None):
-    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
-        req = Requests(session=session)
+async def main(username: str, lookup_account_type: HSAccountTypes, hs_type: HSType | None, store_file: str | None = None, max_age: float = DEFAULT_MAX_AGE,
+               not_found_ttl: float = DEFAULT_NOT_FOUND_TTL):
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session, \
+            open_player_store(store_file, max_age=max_age, not_found_ttl=not_found_ttl) as store:
+        req = Requests(session=session, store=store)
         main_game_lookup = lookup_account_type not in (
             HSAccountTypes.dmm, HSAccountTypes.leagues, HSAccountTypes.tournament, HSAccountTypes.fsw)
 
@@ -195,13 +200,16 @@ if __name__ == '__main__':
 
     parser.username(required=True) \
         .account_type() \
-        .hs_type(default=None)
+        .hs_type(default=None) \
+        .player_store() \
+        .headless()
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(headless=args.headless)
 
     try:
-        asyncio.run(main(args.username, args.account_type, args.hs_type))
+        asyncio.run(main(args.username, args.account_type, args.hs_type,
+                    args.store_file, args.max_age, args.not_found_ttl))
     except NotFound:
         sys.exit(0)
     except Exception as e:
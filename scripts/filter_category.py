@@ -1,35 +1,63 @@
 import argparse
 import asyncio
+import random
 import sys
+import time
+from datetime import timedelta
 from functools import partial
+from typing import Any, Callable
 
 import aiohttp
 
 from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
 from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
-from osrs_hiscore_scrape.job.job_builder import (get_hs_filtered_job,
+from osrs_hiscore_scrape.exception.records import NotFound
+from osrs_hiscore_scrape.job.checkpoint import IntervalSet, JobJournal
+from osrs_hiscore_scrape.job.job_builder import (build_hs_page_job,
+                                                 get_hs_filtered_job,
                                                  get_hs_page_job)
-from osrs_hiscore_scrape.job.job_handlers import (enqueue_page_usernames,
+from osrs_hiscore_scrape.job.job_handlers import (carry_forward_unchanged,
+                                                  enqueue_page_usernames,
                                                   enqueue_user_stats_filter,
+                                                  is_skippable,
+                                                  request_changed_user_stats,
                                                   request_hs_page,
                                                   request_user_stats)
 from osrs_hiscore_scrape.job.mappers import (
     map_category_records_to_lookup_jobs, map_player_records_to_lookup_jobs)
-from osrs_hiscore_scrape.job.records import (HSCategoryJob, IJob, JobManager,
-                                             JobQueue)
+from osrs_hiscore_scrape.job.planner import RunPlan, Stage, plan_run
+from osrs_hiscore_scrape.job.records import (HSCategoryJob, HSLookupJob, IJob,
+                                             JobManager, JobQueue)
 from osrs_hiscore_scrape.log.decorators import log_lifecycle, profile_execution
 from osrs_hiscore_scrape.log.logger import get_logger
-from osrs_hiscore_scrape.request.constants import MAX_CATEGORY_SIZE
+from osrs_hiscore_scrape.request.constants import (HS_PAGE_SIZE,
+                                                   MAX_CATEGORY_SIZE,
+                                                   SAFE_REQUESTS_PER_SECOND)
 from osrs_hiscore_scrape.request.dto import (GetFilteredPageRangeRequest,
+                                             GetHighscorePageRequest,
                                              GetMaxHighscorePageRequest,
-                                             HSFilterEntry)
+                                             GetMaxHighscorePageResult,
+                                             GetPlayerRequest, HSFilterEntry)
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
 from osrs_hiscore_scrape.request.request import Requests
-from osrs_hiscore_scrape.util.io import (hs_lookup_formatter,
-                                         read_category_records,
-                                         read_player_records, read_proxies,
+from osrs_hiscore_scrape.statistic.sampling import (DEFAULT_CONFIDENCE,
+                                                    StratifiedProportion,
+                                                    draw_stratified,
+                                                    split_strata)
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.bulk_reader import (read_category_records_bulk,
+                                                  read_player_records_bulk)
+from osrs_hiscore_scrape.util.category_index import open_category_index
+from osrs_hiscore_scrape.util.io import (file_size, hs_lookup_formatter,
+                                         is_stdout, open_output_index,
+                                         read_proxies, truncate_file,
                                          write_records)
+from osrs_hiscore_scrape.util.player_store import (DEFAULT_MAX_AGE,
+                                                   DEFAULT_NOT_FOUND_TTL,
+                                                   PlayerStore,
+                                                   open_player_store)
+from osrs_hiscore_scrape.util.retry_handler import retry
 from osrs_hiscore_scrape.worker.records import create_workers
 
 logger = get_logger(__name__)
@@ -37,21 +65,8 @@ N_SCRAPE_WORKERS = 2
 N_SCRAPE_SIZE = 100
 
 
-async def prepare_scrape_jobs(req: Requests, in_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry]) -> tuple[list[HSCategoryJob], int, JobQueue[IJob]]:
-    """ Prepares the scraping job list and export queue based if theres an in-file or not. """
-    potential_records = map_category_records_to_lookup_jobs(
-        account_type=account_type, input=list(read_category_records(in_file)))
-
-    if not potential_records:
-        potential_records = map_player_records_to_lookup_jobs(
-            account_type=account_type, input=list(read_player_records(in_file)))
-
-    if potential_records:
-        hs_scrape_export_q = JobQueue[IJob]()
-        for record in potential_records:
-            await hs_scrape_export_q.put(record)
-        return [], len(potential_records), hs_scrape_export_q
-
+async def discover_scrape_jobs(req: Requests, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry]) -> list[HSCategoryJob]:
+    """ Discovers the pages that have to be scraped, narrowed down by the filter if possible. """
     filtered_entries = [
         entry for entry in hs_filter if entry.hstype == hs_type]
 
@@ -79,47 +94,332 @@ async def prepare_scrape_jobs(req: Requests, in_file: str, start_rank: int, end_
 
         logger.debug(
             f"assumption made based on filter, range {start_job_prio}-{end_job_prio}")
-    else:
-        hs_scrape_joblist = await get_hs_page_job(req=req,
-                                                  start_rank=start_rank,
-                                                  end_rank=-1,
-                                                  max_page_req=GetMaxHighscorePageRequest(
-                                                      hs_type=hs_type, account_type=account_type)
-                                                  )
+        return hs_scrape_joblist
+
+    return await get_hs_page_job(req=req,
+                                 start_rank=start_rank,
+                                 end_rank=-1,
+                                 max_page_req=GetMaxHighscorePageRequest(
+                                     hs_type=hs_type, account_type=account_type)
+                                 )
+
+
+async def estimate_filter(req: Requests, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry],
+                          sample_size: int, num_workers: int, skip_fn: Callable[[Requests, HSLookupJob], bool] | None = None,
+                          confidence: float = DEFAULT_CONFIDENCE, seed: int | None = None) -> dict[str, Any]:
+    """
+    Estimates how many candidates of the discovered rank range match the filter and how long a full run takes,
+    from lookups of about `sample_size` candidates drawn at random across the range (stratified on rank).
+    Selectivity is estimated for the whole filter and every entry on its own, the duration from the measured
+    latency of the sampled page and lookup requests at the worker counts of a full run.
+    Candidates `skip_fn` returns True for count as not matching and don't need a lookup, like in a full run.
+    """
+    hs_scrape_joblist = await discover_scrape_jobs(req=req, start_rank=start_rank, end_rank=end_rank,
+                                                   account_type=account_type, hs_type=hs_type, hs_filter=hs_filter)
+    if not hs_scrape_joblist:
+        return {"candidates": 0, "pages": 0}
+
+    first_rank, last_rank = hs_scrape_joblist[0].start_rank, hs_scrape_joblist[-1].end_rank
+    strata = split_strata(first_rank, last_rank)
+    sizes = [last - first + 1 for first, last in strata]
+    draws = draw_stratified(strata, sample_size, random.Random(seed))
+    matches, lookups = StratifiedProportion(
+        sizes, confidence), StratifiedProportion(sizes, confidence)
+    entries = [StratifiedProportion(sizes, confidence) for _ in hs_filter]
+
+    semaphore = asyncio.Semaphore(num_workers)
+    page_latencies: list[float] = []
+    lookup_latencies: list[float] = []
+
+    async def timed(latencies: list[float], callback: Callable, **kwargs) -> Any:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await retry(callback, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    pages = sorted({(rank - 1) // HS_PAGE_SIZE + 1 for _, rank in draws})
+    page_records = await asyncio.gather(*(
+        timed(page_latencies, req.get_hs_page, page_req=GetHighscorePageRequest(
+            page_num=page_num, hs_type=hs_type, account_type=account_type))
+        for page_num in pages))
+    usernames = {
+        record.rank: record.username for records in page_records for record in records}
+
+    def reject(stratum: int):
+        # entry shares cover every candidate like the whole filter, skipped and missing players meet none
+        matches.add(stratum, False)
+        for share in entries:
+            share.add(stratum, False)
+
+    async def evaluate(stratum: int, job: HSLookupJob):
+        if skip_fn is not None and skip_fn(req, job):
+            lookups.add(stratum, False)
+            reject(stratum)
+            return
+
+        lookups.add(stratum, True)
+        try:
+            record = await timed(lookup_latencies, req.get_user_stats,
+                                 player_req=GetPlayerRequest(username=job.username, account_type=account_type))
+        except NotFound:
+            reject(stratum)
+            return
+
+        matches.add(stratum, record.meets_requirements(hs_filter))
+        for entry, share in zip(hs_filter, entries):
+            share.add(stratum, entry.predicate(
+                record.get_stat(entry.hstype).get_value()))
+
+    # ranks can shift between discovery and the page requests, those draws are left out
+    await asyncio.gather(*(evaluate(stratum, HSLookupJob(priority=rank, username=usernames[rank], account_type=account_type))
+                           for stratum, rank in draws if rank in usernames))
+
+    def bounds(share: StratifiedProportion, scale: int = 1) -> dict[str, float]:
+        low, high = share.interval()
+        return {"estimate": share.proportion() * scale, "low": low * scale, "high": high * scale}
+
+    candidates = last_rank - first_rank + 1
+    lookups_needed = candidates * lookups.proportion()
+    # a full run scrapes pages and looks up players concurrently, the slower of both sets the pace
+    page_rate = N_SCRAPE_WORKERS * \
+        len(page_latencies) / sum(page_latencies) if sum(page_latencies) else None
+    lookup_rate = num_workers * \
+        len(lookup_latencies) / \
+        sum(lookup_latencies) if sum(lookup_latencies) else None
+    eta = max(len(hs_scrape_joblist) / page_rate if page_rate else 0.0,
+              lookups_needed / lookup_rate if lookup_rate else 0.0)
+
+    logger.info(
+        f"estimated from {matches.samples()} candidates with {len(page_latencies) + len(lookup_latencies)} requests")
+    return {
+        "candidates": candidates,
+        "first_rank": first_rank,
+        "last_rank": last_rank,
+        "pages": len(hs_scrape_joblist),
+        "sampled": matches.samples(),
+        "confidence": confidence,
+        "matches": bounds(matches, candidates),
+        "selectivity": bounds(matches),
+        "entries": [{"hs_type": entry.hstype.name, "comparison": entry.comparison, "value": entry.value,
+                     "selectivity": bounds(share) if share.samples() else None}
+                    for entry, share in zip(hs_filter, entries)],
+        "lookups": round(lookups_needed),
+        "throughput": {"pages_per_second": page_rate, "lookups_per_second": lookup_rate},
+        "eta_seconds": eta,
+        "eta": str(timedelta(seconds=round(eta))),
+    }
+
+
+async def prepare_scrape_jobs(req: Requests, journal: JobJournal, out_file: str, in_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry],
+                              fields: list[HSType] | None = None, delta_store: PlayerStore | None = None) -> tuple[list[HSCategoryJob], int, JobQueue[IJob]]:
+    """
+    Prepares the scraping job list and export queue based if theres an in-file or not.
+    With a `delta_store`, players of a category in-file whose score didn't change since they were stored are carried forward.
+
+    Resumes from the journal of an interrupted run if there is one, the discovered rank range
+    is taken from the journal and ranks that were already handled are left out.
+    """
+    params = journal_params(in_file, start_rank, end_rank,
+                            account_type, hs_type, hs_filter, fields)
+
+    plan = journal.load(params)
+    if plan is not None:
+        truncate_file(out_file, journal.offset)
+        logger.info(
+            f"resuming from {journal.file_path}, {len(journal.committed)} ranks already handled")
+
+    potential_records = map_category_records_to_lookup_jobs(
+        account_type=account_type, input=list(read_category_records_bulk(in_file)))
+
+    if potential_records and delta_store is not None:
+        carried = carry_forward_unchanged(
+            delta_store, hs_type, potential_records)
+        logger.info(
+            f"{carried}/{len(potential_records)} players unchanged since the last refresh")
+
+    if not potential_records:
+        potential_records = map_player_records_to_lookup_jobs(
+            account_type=account_type, input=list(read_player_records_bulk(in_file)))
+
+    if potential_records:
+        if plan is None:
+            journal.start(params, {}, offset=file_size(out_file))
+
+        hs_scrape_export_q = JobQueue[IJob]()
+        for record in potential_records:
+            if record.priority not in journal.committed:
+                await hs_scrape_export_q.put(record)
+        return [], len(hs_scrape_export_q), hs_scrape_export_q
+
+    if plan is None:
+        hs_scrape_joblist = await discover_scrape_jobs(req=req,
+                                                       start_rank=start_rank,
+                                                       end_rank=end_rank,
+                                                       account_type=account_type,
+                                                       hs_type=hs_type,
+                                                       hs_filter=hs_filter)
+        if not hs_scrape_joblist:
+            return [], 0, JobQueue(maxsize=N_SCRAPE_SIZE)
+
+        plan = {"start_rank": hs_scrape_joblist[0].start_rank,
+                "end_rank": hs_scrape_joblist[-1].end_rank,
+                "end_page": hs_scrape_joblist[-1].page_num}
+        journal.start(params, plan, offset=file_size(out_file))
+
+    if not plan:
+        return [], 0, JobQueue(maxsize=N_SCRAPE_SIZE)
+
+    hs_scrape_joblist, record_count = remaining_scrape_jobs(
+        plan, journal.committed, account_type, hs_type)
+    return hs_scrape_joblist, record_count, JobQueue(maxsize=N_SCRAPE_SIZE)
+
 
-    return hs_scrape_joblist, hs_scrape_joblist[-1].end_rank - hs_scrape_joblist[0].start_rank + 1, JobQueue(maxsize=N_SCRAPE_SIZE)
+def journal_params(in_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType,
+                   hs_filter: list[HSFilterEntry], fields: list[HSType] | None = None) -> dict[str, Any]:
+    """ Parameters a journal has to be started with to be resumed by this run. """
+    return {"in_file": in_file, "account_type": str(account_type), "hs_type": str(hs_type),
+            "start_rank": start_rank, "end_rank": end_rank,
+            # the (hstype, comparison, value) of every entry, as lists since the journal header is json
+            "filter": sorted(([str(entry.hstype), entry.comparison, entry.value] for entry in hs_filter), key=str),
+            "fields": [str(field) for field in fields] if fields is not None else None}
+
+
+def remaining_scrape_jobs(plan: dict[str, Any], committed: IntervalSet, account_type: HSAccountTypes,
+                          hs_type: HSType) -> tuple[list[HSCategoryJob], int]:
+    """ Page jobs of a discovered rank range that still hold unhandled ranks, and the amount of those ranks. """
+    hs_scrape_joblist = build_hs_page_job(start_rank=plan["start_rank"],
+                                          end_rank=plan["end_rank"],
+                                          max_page_res=GetMaxHighscorePageResult(
+                                              page_nr=plan["end_page"], rank_nr=plan["end_rank"]),
+                                          max_page_req=GetMaxHighscorePageRequest(
+                                              hs_type=hs_type, account_type=account_type)
+                                          )
+
+    # pages without any unhandled rank don't have to be scraped again
+    hs_scrape_joblist = [job for job in hs_scrape_joblist
+                         if committed.missing(job.start_rank, job.end_rank)]
+    record_count = sum(end - start + 1 for start, end
+                       in committed.missing(plan["start_rank"], plan["end_rank"]))
+    return hs_scrape_joblist, record_count
+
+
+async def plan_filter(req: Requests, journal: JobJournal, in_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes,
+                      hs_type: HSType, hs_filter: list[HSFilterEntry], num_workers: int, fields: list[HSType] | None = None,
+                      rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND) -> RunPlan:
+    """
+    Plans the run without scraping any page or looking anyone up. The rank range comes from the journal of an
+    interrupted run if there is one (without touching it), otherwise it's discovered, ranks that were already
+    handled aren't counted. Every candidate counts as a lookup, players a store or index skips make it an upper bound.
+    Pages are scraped while the candidates of earlier pages get looked up, so both stages run concurrently.
+    """
+    plan = journal.peek(journal_params(in_file, start_rank,
+                        end_rank, account_type, hs_type, hs_filter, fields))
+
+    candidates = map_category_records_to_lookup_jobs(
+        account_type=account_type, input=list(read_category_records_bulk(in_file))) \
+        or map_player_records_to_lookup_jobs(account_type=account_type, input=list(read_player_records_bulk(in_file)))
+    if candidates:
+        lookups = sum(
+            job.priority not in journal.committed for job in candidates)
+        return plan_run(req, [Stage(name="lookups", requests=lookups, workers=num_workers)], rate_per_proxy=rate_per_proxy)
+
+    if plan is None:
+        hs_scrape_joblist = await discover_scrape_jobs(req=req, start_rank=start_rank, end_rank=end_rank,
+                                                       account_type=account_type, hs_type=hs_type, hs_filter=hs_filter)
+        plan = {"start_rank": hs_scrape_joblist[0].start_rank,
+                "end_rank": hs_scrape_joblist[-1].end_rank,
+                "end_page": hs_scrape_joblist[-1].page_num} if hs_scrape_joblist else {}
+
+    hs_scrape_joblist, record_count = remaining_scrape_jobs(
+        plan, journal.committed, account_type, hs_type) if plan else ([], 0)
+    return plan_run(req, [Stage(name="pages", requests=len(hs_scrape_joblist), workers=N_SCRAPE_WORKERS),
+                          Stage(name="lookups", requests=record_count, workers=num_workers)],
+                    rate_per_proxy=rate_per_proxy, concurrent=True)
 
 
 @log_lifecycle
 @profile_execution
-async def main(out_file: str, in_file: str, proxy_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry], num_workers: int):
-    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
-        req = Requests(session=session, proxy_list=read_proxies(proxy_file))
+async def main(out_file: str, in_file: str, proxy_file: str, start_rank: int, end_rank: int, account_type: HSAccountTypes, hs_type: HSType, hs_filter: list[HSFilterEntry], num_workers: int, flush_interval: float = 0.0, fsync: bool = False,
+               fields: list[HSType] | None = None, index_stride: int = 0, store_file: str | None = None, max_age: float = DEFAULT_MAX_AGE,
+               delta: bool = False, not_found_ttl: float = DEFAULT_NOT_FOUND_TTL, category_index_file: str | None = None,
+               index_max_age: float = DEFAULT_MAX_AGE, estimate: int = 0, confidence: float = DEFAULT_CONFIDENCE,
+               plan: bool = False, rate_per_proxy: float = SAFE_REQUESTS_PER_SECOND):
+    if delta and not store_file:
+        raise ValueError(
+            "an incremental refresh needs a player store (--store)")
+    if estimate and in_file:
+        raise ValueError(
+            "an estimate samples the hiscore pages, it can't be combined with an input file")
+    if estimate and plan:
+        raise ValueError(
+            "--estimate and --plan are separate dry runs, pick one")
+
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session, \
+            open_player_store(store_file, max_age=max_age, not_found_ttl=not_found_ttl) as store, \
+            open_category_index(category_index_file, max_age=index_max_age) as category_index:
+        req = Requests(session=session, proxy_list=read_proxies(
+            proxy_file), store=store)
+        skip_fn = partial(is_skippable, index=category_index,
+                          hs_filter=hs_filter)
+
+        if estimate > 0:
+            print(json_wrapper.dumps(await estimate_filter(req=req, start_rank=start_rank, end_rank=end_rank, account_type=account_type,
+                                                           hs_type=hs_type, hs_filter=hs_filter, sample_size=estimate,
+                                                           num_workers=num_workers, skip_fn=skip_fn, confidence=confidence)))
+            return
+
+        # a stream can't be resumed, so there's nothing to journal
+        journal = JobJournal(f"{out_file}.journal" if not is_stdout(
+            out_file) else None, fsync=fsync)
+
+        if plan:
+            run_plan = await plan_filter(req=req, journal=journal, in_file=in_file, start_rank=start_rank, end_rank=end_rank,
+                                         account_type=account_type, hs_type=hs_type, hs_filter=hs_filter,
+                                         num_workers=num_workers, fields=fields, rate_per_proxy=rate_per_proxy)
+            print(json_wrapper.dumps(run_plan.to_dict()))
+            return
 
         hs_scrape_joblist, record_count, hs_scrape_export_q = await prepare_scrape_jobs(
             req=req,
+            journal=journal,
+            out_file=out_file,
             in_file=in_file,
             start_rank=start_rank,
             end_rank=end_rank,
             account_type=account_type,
             hs_type=hs_type,
-            hs_filter=hs_filter
+            hs_filter=hs_filter,
+            fields=fields,
+            delta_store=store if delta else None
         )
+        if not record_count:
+            journal.remove()
+            return
+
+        index = open_output_index(out_file, index_stride)
 
         if hs_scrape_joblist:
             hs_scrape_job_q = JobQueue[IJob]()
             for job in hs_scrape_joblist:
                 await hs_scrape_job_q.put(job)
 
+            scraped_pages = {job.page_num for job in hs_scrape_joblist}
             scrape_job_manager = JobManager(
-                start=hs_scrape_joblist[0].page_num, end=hs_scrape_joblist[-1].page_num)
+                start=hs_scrape_joblist[0].page_num,
+                end=hs_scrape_joblist[-1].page_num,
+                skip=IntervalSet([(page, page) for page in range(hs_scrape_joblist[0].page_num, hs_scrape_joblist[-1].page_num + 1)
+                                  if page not in scraped_pages]))
             hs_scrape_workers = create_workers(
                 req=req,
                 in_queue=hs_scrape_job_q,
                 out_queue=hs_scrape_export_q,
                 job_manager=scrape_job_manager,
                 request_fn=request_hs_page,
-                enqueue_fn=enqueue_page_usernames,
+                enqueue_fn=partial(enqueue_page_usernames,
+                                   committed=journal.committed,
+                                   store=store if delta else None),
                 num_workers=N_SCRAPE_WORKERS
             )
 
@@ -131,22 +431,30 @@ async def main(out_file: str, in_file: str, proxy_file: str, start_rank: int, en
             filter_end = hs_scrape_export_q.last().priority
 
         filter_q = asyncio.Queue()
-        filter_job_manager = JobManager(start=filter_start, end=filter_end)
+        filter_job_manager = JobManager(
+            start=filter_start, end=filter_end, skip=journal.committed)
         filter_workers = create_workers(
             req=req,
             in_queue=hs_scrape_export_q,
             out_queue=filter_q,
             job_manager=filter_job_manager,
-            request_fn=request_user_stats,
+            request_fn=partial(request_changed_user_stats,
+                               hs_type=hs_type) if delta else request_user_stats,
             enqueue_fn=partial(enqueue_user_stats_filter, hs_filter=hs_filter),
-            num_workers=num_workers
+            num_workers=num_workers,
+            skip_fn=skip_fn,
+            forward_skipped=True
         )
 
         T: list[asyncio.Task[None]] = [asyncio.create_task(
             write_records(in_queue=filter_q,
                           out_file=out_file,
                           total=record_count,
-                          format=hs_lookup_formatter
+                          format=partial(hs_lookup_formatter, fields=fields),
+                          journal=journal,
+                          flush_interval=flush_interval,
+                          fsync=fsync,
+                          index=index
                           )
         )]
         for w in hs_scrape_workers:
@@ -159,10 +467,15 @@ async def main(out_file: str, in_file: str, proxy_file: str, start_rank: int, en
             ))
         try:
             await asyncio.gather(*T)
+            journal.remove()
+            if category_index is not None:
+                logger.info(
+                    f"{category_index.rejected} players skipped by the category index")
         finally:
             for task in T:
                 task.cancel()
             await asyncio.gather(*T, return_exceptions=True)
+            journal.close()
 
 if __name__ == '__main__':
     parser = OSRSArgumentParser(
@@ -175,14 +488,46 @@ if __name__ == '__main__':
         .account_type() \
         .hs_type(required=True, default=None) \
         .filter(required=True) \
-        .num_workers()
+        .fields() \
+        .num_workers() \
+        .player_store() \
+        .category_index() \
+        .index_stride() \
+        .write_policy() \
+        .plan() \
+        .headless()
+
+    parser.add_argument(
+        "--delta",
+        dest="delta",
+        action="store_true",
+        help="Incremental refresh, only players whose --hs-type score changed since they were stored are looked up again"
+    )
+
+    parser.add_argument(
+        "--estimate",
+        dest="estimate",
+        default=0,
+        type=int,
+        help="Only estimate the match count and duration of the run from N sampled lookups, printed as json"
+    )
+    parser.add_argument(
+        "--confidence",
+        dest="confidence",
+        default=DEFAULT_CONFIDENCE,
+        type=float,
+        help="Confidence level of the --estimate bounds"
+    )
 
-    script_running_in_cmd_guard()
     args = parser.parse_args()
+    script_running_in_cmd_guard(
+        headless=args.headless or is_stdout(args.output_file))
 
     try:
         asyncio.run(main(args.output_file, args.input_file, args.proxy_file, args.start_rank, args.end_rank,
-                    args.account_type, args.hs_type, args.filter, args.num_workers))
+                    args.account_type, args.hs_type, args.filter, args.num_workers, args.flush_interval, args.fsync, args.fields, args.index_stride,
+                    args.store_file, args.max_age, args.delta, args.not_found_ttl, args.category_index_file, args.index_max_age,
+                    args.estimate, args.confidence, args.plan, args.rate_per_proxy))
     except Exception as e:
         logger.error(str(e))
         sys.exit(2)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
+from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
+from osrs_hiscore_scrape.log.decorators import log_lifecycle
+from osrs_hiscore_scrape.log.logger import get_logger
+from osrs_hiscore_scrape.request.dto import HSFilterEntry
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.bulk_reader import read_category_records_bulk
+from osrs_hiscore_scrape.util.category_index import CategoryIndex
+from osrs_hiscore_scrape.util.player_store import DEFAULT_MAX_AGE
+
+logger = get_logger(__name__)
+
+
+def _parse_timestamp(arg: str) -> datetime:
+    ts = datetime.fromisoformat(arg)
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+@log_lifecycle
+def main(index_file: str, account_type: HSAccountTypes, hs_type: HSType, in_file: str | None = None,
+         timestamp: datetime | None = None, username: str | None = None, hs_filter: list[HSFilterEntry] | None = None,
+         max_age: float = DEFAULT_MAX_AGE):
+    with CategoryIndex(index_file, max_age=max_age) as index:
+        if in_file:
+            # a scrape is as old as its file unless told otherwise
+            ts = timestamp or datetime.fromtimestamp(
+                os.path.getmtime(in_file), tz=timezone.utc)
+            index.add_snapshot(account_type, hs_type,
+                               read_category_records_bulk(in_file), ts)
+
+        if username:
+            for entry in index.lookup(username, account_type):
+                print(json_wrapper.dumps({"hs_type": entry.hs_type.name, "rank": entry.rank,
+                                          "score": entry.score, "timestamp": entry.ts.isoformat()}))
+
+        if hs_filter:
+            for name in index.members(account_type, hs_filter):
+                print(json_wrapper.dumps({"username": name}))
+
+
+if __name__ == '__main__':
+    parser = OSRSArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.input_file() \
+        .username() \
+        .account_type() \
+        .hs_type() \
+        .filter() \
+        .category_index(required=True) \
+        .headless()
+
+    parser.add_argument(
+        "--timestamp",
+        dest="timestamp",
+        type=_parse_timestamp,
+        help="ISO moment the --in-file was scraped at, the file's modification time if omitted"
+    )
+
+    args = parser.parse_args()
+    script_running_in_cmd_guard(headless=args.headless)
+
+    try:
+        main(args.category_index_file, args.account_type, args.hs_type, args.input_file, args.timestamp,
+             args.username, args.filter, args.index_max_age)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(2)
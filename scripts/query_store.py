@@ -0,0 +1,63 @@
+import argparse
+import sys
+from functools import partial
+
+from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
+from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
+from osrs_hiscore_scrape.job.records import HSLookupJob
+from osrs_hiscore_scrape.log.decorators import log_lifecycle
+from osrs_hiscore_scrape.log.logger import get_logger
+from osrs_hiscore_scrape.request.dto import HSFilterEntry
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.util.bulk_reader import read_player_records_bulk
+from osrs_hiscore_scrape.util.io import (STDOUT, hs_lookup_formatter,
+                                         is_stdout, write_lines)
+from osrs_hiscore_scrape.util.player_store import PlayerStore
+
+logger = get_logger(__name__)
+
+
+@log_lifecycle
+def main(store_file: str, out_file: str, in_file: str | None, account_type: HSAccountTypes, hs_type: HSType,
+         hs_filter: list[HSFilterEntry], fields: list[HSType] | None = None, max_age: float = -1) -> int:
+    with PlayerStore(store_file) as store:
+        if in_file:
+            store.put_many(account_type, list(
+                read_player_records_bulk(in_file)))
+            logger.info(f"imported {in_file} into {store_file}")
+
+        # same lines as filter_category.py, ranked by the order of the query
+        format = partial(hs_lookup_formatter, fields=fields)
+        lines = (format(HSLookupJob(priority=rank, username=record.username, account_type=account_type, result=record))
+                 for rank, record in enumerate(store.query(account_type, hs_filter, order_by=hs_type, max_age=max_age), start=1))
+        count = write_lines(out_file, lines)
+
+    logger.info(f"{count} stored players matched the filter")
+    return count
+
+
+if __name__ == '__main__':
+    parser = OSRSArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.player_store(required=True, default_max_age=-1) \
+        .output_file() \
+        .input_file() \
+        .account_type() \
+        .hs_type() \
+        .filter(required=True) \
+        .fields() \
+        .headless()
+
+    args = parser.parse_args()
+    out_file = args.output_file or STDOUT
+    script_running_in_cmd_guard(
+        headless=args.headless or is_stdout(out_file))
+
+    try:
+        main(args.store_file, out_file, args.input_file, args.account_type, args.hs_type,
+             args.filter, args.fields, args.max_age)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(2)
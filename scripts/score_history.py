@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
+from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
+from osrs_hiscore_scrape.log.decorators import log_lifecycle
+from osrs_hiscore_scrape.log.logger import get_logger
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.bulk_reader import read_category_records_bulk
+from osrs_hiscore_scrape.util.score_history import ScoreHistory
+
+logger = get_logger(__name__)
+
+
+def _parse_timestamp(arg: str) -> datetime:
+    ts = datetime.fromisoformat(arg)
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+@log_lifecycle
+def main(history_file: str, account_type: HSAccountTypes, hs_type: HSType, in_file: str | None = None,
+         timestamp: datetime | None = None, username: str | None = None, gainers: int = 0,
+         since: datetime | None = None, until: datetime | None = None):
+    with ScoreHistory(history_file) as history:
+        if in_file:
+            # a scrape is as old as its file unless told otherwise
+            ts = timestamp or datetime.fromtimestamp(
+                os.path.getmtime(in_file), tz=timezone.utc)
+            history.add_snapshot(account_type, hs_type,
+                                 read_category_records_bulk(in_file), ts)
+
+        if username:
+            for ts, score in history.history(account_type, hs_type, username):
+                print(json_wrapper.dumps(
+                    {"timestamp": ts.isoformat(), "score": score}))
+
+        if gainers > 0:
+            for name, gain in history.top_gainers(account_type, hs_type, start=since, end=until, limit=gainers):
+                print(json_wrapper.dumps({"username": name, "gain": gain}))
+
+
+if __name__ == '__main__':
+    parser = OSRSArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.input_file() \
+        .username() \
+        .account_type() \
+        .hs_type() \
+        .headless()
+
+    parser.add_argument(
+        "--history",
+        dest="history_file",
+        required=True,
+        help="Path to the score history (SQLite)"
+    )
+    parser.add_argument(
+        "--timestamp",
+        dest="timestamp",
+        type=_parse_timestamp,
+        help="ISO moment the --in-file was scraped at, the file's modification time if omitted"
+    )
+    parser.add_argument(
+        "--gainers",
+        dest="gainers",
+        default=0,
+        type=int,
+        help="Print the N players with the largest gain between --since and --until"
+    )
+    parser.add_argument(
+        "--since",
+        dest="since",
+        type=_parse_timestamp,
+        help="ISO moment gains are counted from, the first snapshot if omitted"
+    )
+    parser.add_argument(
+        "--until",
+        dest="until",
+        type=_parse_timestamp,
+        help="ISO moment gains are counted to, the last snapshot if omitted"
+    )
+
+    args = parser.parse_args()
+    script_running_in_cmd_guard(headless=args.headless)
+
+    try:
+        main(args.history_file, args.account_type, args.hs_type, args.input_file, args.timestamp,
+             args.username, args.gainers, args.since, args.until)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(2)
@@ -0,0 +1,64 @@
+import argparse
+import sys
+
+from osrs_hiscore_scrape.cli.helpers import script_running_in_cmd_guard
+from osrs_hiscore_scrape.cli.presets import OSRSArgumentParser
+from osrs_hiscore_scrape.log.decorators import log_lifecycle
+from osrs_hiscore_scrape.log.logger import get_logger
+from osrs_hiscore_scrape.util.external_sort import (DEFAULT_CHUNK_LINES,
+                                                    sort_records)
+from osrs_hiscore_scrape.util.io import is_stdout
+
+logger = get_logger(__name__)
+
+
+@log_lifecycle
+def main(in_file: str, out_file: str | None, key: str, dedup: bool, chunk_lines: int, temp_dir: str | None):
+    count = sort_records(in_file=in_file, out_file=out_file or in_file, key=key,
+                         dedup=dedup, temp_dir=temp_dir, chunk_lines=chunk_lines)
+    logger.info(f"wrote {count} sorted records to {out_file or in_file}")
+
+
+if __name__ == '__main__':
+    parser = OSRSArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.input_file(required=True) \
+        .output_file() \
+        .headless()
+
+    parser.add_argument(
+        "--key",
+        dest="key",
+        default="rank",
+        help="Record key to sort by, e.g. 'rank', 'score' or 'username'"
+    )
+    parser.add_argument(
+        "--dedup",
+        dest="dedup",
+        action="store_true",
+        help="Drop repeated usernames, the record with the freshest timestamp (or the last one) is kept"
+    )
+    parser.add_argument(
+        "--chunk-lines",
+        dest="chunk_lines",
+        default=DEFAULT_CHUNK_LINES,
+        type=int,
+        help="Lines sorted in memory before spilling a sorted run to disk"
+    )
+    parser.add_argument(
+        "--temp-dir",
+        dest="temp_dir",
+        help="Directory for the spill files, the system temp directory if omitted"
+    )
+
+    args = parser.parse_args()
+    script_running_in_cmd_guard(
+        headless=args.headless or is_stdout(args.output_file))
+
+    try:
+        main(args.input_file, args.output_file, args.key,
+             args.dedup, args.chunk_lines, args.temp_dir)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(2)
@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.job.checkpoint import IntervalSet, JobJournal
+
+
+def test_intervalset_merges_adjacent_and_overlapping():
+    s = IntervalSet()
+    for n in [1, 2, 3, 7, 5, 6, 10]:
+        s.add(n)
+    s.add_range(11, 12)
+
+    assert list(s) == [(1, 3), (5, 7), (10, 12)]
+    assert len(s) == 9
+
+    s.add(4)
+    assert list(s) == [(1, 7), (10, 12)]
+
+    s.add_range(0, 20)
+    assert list(s) == [(0, 20)]
+
+
+@pytest.mark.parametrize(
+    "n, contained, next_missing",
+    [
+        (0, False, 0),
+        (1, True, 4),
+        (3, True, 4),
+        (4, False, 4),
+        (6, True, 9),
+        (9, False, 9),
+    ]
+)
+def test_intervalset_contains_and_next_missing(n: int, contained: bool, next_missing: int):
+    s = IntervalSet([(1, 3), (5, 8)])
+
+    assert (n in s) is contained
+    assert s.next_missing(n) == next_missing
+
+
+def test_intervalset_missing():
+    s = IntervalSet([(3, 5), (8, 8)])
+
+    assert s.missing(1, 10) == [(1, 2), (6, 7), (9, 10)]
+    assert s.missing(3, 5) == []
+    assert s.missing(4, 8) == [(6, 7)]
+    assert IntervalSet().missing(1, 3) == [(1, 3)]
+
+
+def test_journal_resume():
+    params = {"start_rank": 1}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.journal")
+
+        journal = JobJournal(file_path)
+        assert journal.load(params) is None
+        journal.start(params, {"page_nr": 10}, offset=5)
+        journal.commit(1, 10)
+        journal.commit(3, 20)
+        journal.close()
+
+        # simulate a crash mid-write
+        with open(file_path, "a") as f:
+            f.write("4 3")
+
+        journal = JobJournal(file_path)
+        assert journal.load(params) == {"page_nr": 10}
+        assert list(journal.committed) == [(1, 1), (3, 3)]
+        assert journal.offset == 20
+
+        journal.commit(2, 25)
+        journal.close()
+
+        journal = JobJournal(file_path)
+        journal.load(params)
+        assert list(journal.committed) == [(1, 3)]
+        assert journal.offset == 25
+
+        journal.remove()
+        assert not os.path.isfile(file_path)
+
+
+def test_journal_peek_leaves_the_journal_untouched():
+    params = {"start_rank": 1}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.journal")
+
+        journal = JobJournal(file_path)
+        journal.start(params, {"page_nr": 10}, offset=5)
+        journal.commit(1, 10)
+        journal.close()
+        with open(file_path, "a") as f:
+            f.write("4 3")
+        size = os.path.getsize(file_path)
+
+        journal = JobJournal(file_path)
+        assert journal.peek(params) == {"page_nr": 10}
+        assert list(journal.committed) == [(1, 1)]
+        assert os.path.getsize(file_path) == size
+        assert JobJournal(file_path).peek({"start_rank": 2}) is None
+
+
+def test_journal_ignores_different_run():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.journal")
+
+        journal = JobJournal(file_path)
+        journal.start({"start_rank": 1}, {}, offset=0)
+        journal.commit(1, 10)
+        journal.close()
+
+        journal = JobJournal(file_path)
+        assert journal.load({"start_rank": 2}) is None
+        assert not journal.committed
+
+
+def test_journal_without_file():
+    journal = JobJournal(None)
+    assert journal.load({}) is None
+
+    journal.start({}, {"page_nr": 1}, offset=0)
+    journal.commit_many([(1, 10), (2, 20)])
+    assert list(journal.committed) == [(1, 2)]
+    assert journal.offset == 20
+
+    journal.remove()
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from osrs_hiscore_scrape.job.job_builder import (_extract_page_nr_from_rank,
+                                                 build_hs_page_job,
                                                  get_hs_filtered_job,
                                                  get_hs_page_job)
 from osrs_hiscore_scrape.request.dto import (GetFilteredPageRangeResult,
@@ -335,3 +336,26 @@ def test_extract_page_nr_invalid_cases():
 
     with pytest.raises(ValueError, match="Start rank is greater than end rank"):
         _extract_page_nr_from_rank(10, 5)
+
+
+def test_build_hs_page_job_from_known_max_page():
+    max_page_req = MagicMock()
+    max_page_req.account_type = HSAccountTypes.main
+    res = GetMaxHighscorePageResult(page_nr=3, rank_nr=60)
+
+    result = build_hs_page_job(
+        start_rank=30, end_rank=-1, max_page_res=res, max_page_req=max_page_req)
+
+    assert [job.page_num for job in result] == [2, 3]
+    assert result[0].start_rank == 30
+    assert result[0].start_idx == 4
+    assert result[-1].end_rank == 60
+    assert result[-1].end_idx == 10
+
+
+def test_build_hs_page_job_start_after_max_rank():
+    max_page_req = MagicMock()
+    res = GetMaxHighscorePageResult(page_nr=2, rank_nr=50)
+
+    assert build_hs_page_job(start_rank=51, end_rank=-1,
+                             max_page_res=res, max_page_req=max_page_req) == []
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from osrs_hiscore_scrape.cli.presets import _parse_key_value_pairs
+from osrs_hiscore_scrape.job.job_handlers import (carry_forward_unchanged,
+                                                  enqueue_page_usernames,
+                                                  is_skippable,
+                                                  request_changed_user_stats)
+from osrs_hiscore_scrape.job.records import (HSCategoryJob, HSLookupJob,
+                                             JobQueue)
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryRecord, PlayerRecord
+from osrs_hiscore_scrape.util.category_index import CategoryIndex
+from osrs_hiscore_scrape.util.player_store import PlayerStore
+
+
+def _stored(store: PlayerStore, username: str, score: int) -> PlayerRecord:
+    record = PlayerRecord(username, [], datetime(
+        2023, 1, 1, tzinfo=timezone.utc))
+    store.put(HSAccountTypes.main, record)
+    store.put_score(HSAccountTypes.main, HSType.zulrah, username, score)
+    return record
+
+
+def _lookup(priority: int, username: str, score: int | None) -> HSLookupJob:
+    return HSLookupJob(priority=priority, username=username, account_type=HSAccountTypes.main, score=score)
+
+
+def test_carry_forward_unchanged(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        _stored(store, "same", 100)
+        _stored(store, "moved", 100)
+        # a score without a record can't be carried forward
+        store.put_score(HSAccountTypes.main, HSType.zulrah, "lost", 100)
+
+        jobs = [_lookup(1, "same", 100), _lookup(2, "moved", 101), _lookup(3, "new", 100),
+                _lookup(4, "lost", 100), _lookup(5, "Same", None)]
+
+        assert carry_forward_unchanged(store, HSType.zulrah, jobs) == 1
+        assert jobs[0].result is not None and jobs[0].result.username == "same"
+        assert all(job.result is None for job in jobs[1:])
+
+
+@pytest.mark.asyncio
+async def test_enqueue_page_usernames_with_store(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        _stored(store, "a", 10)
+
+        page = HSCategoryJob(priority=1, page_num=1, start_rank=1, end_rank=2, hs_type=HSType.zulrah,
+                             account_type=HSAccountTypes.main, start_idx=0, end_idx=2,
+                             result=[CategoryRecord(rank=1, score=10, username="a"),
+                                     CategoryRecord(rank=2, score=5, username="b")])
+        queue = JobQueue()
+        await enqueue_page_usernames(queue, page, store=store)
+
+        first, second = await queue.get(), await queue.get()
+        assert (first.username, first.score,
+                first.result is not None) == ("a", 10, True)
+        assert (second.username, second.score, second.result) == ("b", 5, None)
+
+
+@pytest.mark.asyncio
+async def test_request_changed_user_stats_keeps_score(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        record = PlayerRecord("a", [], datetime.now(timezone.utc))
+        req = MagicMock()
+        req.store = store
+        req.get_user_stats = AsyncMock(return_value=record)
+
+        job = _lookup(1, "a", 42)
+        await request_changed_user_stats(req, job, hs_type=HSType.zulrah)
+
+        assert job.result is record
+        assert req.get_user_stats.await_args.kwargs["max_age"] == 0
+        assert store.get_scores(HSAccountTypes.main,
+                                HSType.zulrah, ["a"]) == {"a": 42}
+
+
+def test_is_skippable(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store, CategoryIndex(str(tmp_path / "index.db")) as index:
+        store.put_not_found(HSAccountTypes.main, "gone")
+        index.add_snapshot(HSAccountTypes.main, HSType.zulrah,
+                           [CategoryRecord(rank=1, score=900, username="a"), CategoryRecord(
+                               rank=2, score=100, username="b")],
+                           datetime.now(timezone.utc))
+        req = MagicMock()
+        req.store = store
+        hs_filter = _parse_key_value_pairs("zulrah>=500")
+
+        assert is_skippable(req, _lookup(1, "gone", None))
+        assert not is_skippable(req, _lookup(2, "b", None))
+        assert is_skippable(req, _lookup(2, "b", None),
+                            index=index, hs_filter=hs_filter)
+        assert not is_skippable(req, _lookup(
+            1, "a", None), index=index, hs_filter=hs_filter)
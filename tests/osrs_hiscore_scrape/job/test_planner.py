@@ -0,0 +1,54 @@
+import pytest
+
+from osrs_hiscore_scrape.job.planner import DEFAULT_LATENCY, Stage, plan_run
+from osrs_hiscore_scrape.request.request import RequestStats
+
+
+class FakeRequests:
+    def __init__(self, proxies: int = 0, requests: int = 0, seconds: float = 0.0):
+        self.proxy_list = [f"proxy{i}" for i in range(proxies)]
+        self.stats = RequestStats(requests=requests, seconds=seconds)
+
+
+def test_plan_run_is_bound_by_the_pool():
+    # 2 proxies at 2/s keep up 4 requests/s, 10 workers at 0.5s latency could do 20/s
+    plan = plan_run(FakeRequests(proxies=2, requests=4, seconds=2.0), [Stage(name="pages", requests=400, workers=10)],  # type: ignore
+                    rate_per_proxy=2.0)
+
+    stage = plan.stages[0]
+    assert plan.latency == 0.5 and plan.latency_measured
+    assert stage.requests_per_second == 4.0
+    assert stage.seconds == plan.seconds == 100.0
+    assert stage.recommended_workers == 2
+
+
+def test_plan_run_is_bound_by_the_workers():
+    plan = plan_run(FakeRequests(proxies=10, requests=1, seconds=1.0), [Stage(name="pages", requests=40, workers=2)],  # type: ignore
+                    rate_per_proxy=2.0)
+
+    assert plan.stages[0].requests_per_second == 2.0
+    assert plan.seconds == 20.0
+    assert plan.stages[0].recommended_workers == 20
+
+
+def test_plan_run_concurrent_stages_share_the_pool():
+    stages = [Stage(name="pages", requests=100, workers=2),
+              Stage(name="lookups", requests=300, workers=100)]
+    plan = plan_run(FakeRequests(), stages, rate_per_proxy=4.0,
+                    concurrent=True)  # type: ignore
+
+    # without proxies there's a single ip, without timed requests the latency is assumed
+    assert plan.proxies == 1 and not plan.latency_measured and plan.latency == DEFAULT_LATENCY
+    pages, lookups = plan.stages
+    assert (pages.requests_per_second,
+            lookups.requests_per_second) == (1.0, 3.0)
+    assert plan.seconds == pytest.approx(100.0)
+
+    sequential = plan_run(FakeRequests(), stages,
+                          rate_per_proxy=4.0)  # type: ignore
+    assert sequential.seconds == pytest.approx(100 / 2 + 300 / 4)
+
+    report = plan.to_dict()
+    assert report["requests"] == 400 and report["eta"] == "0:01:40"
+    assert [stage["name"]
+            for stage in report["stages"]] == ["pages", "lookups"]
@@ -3,6 +3,7 @@ from dataclasses import fields
 
 import pytest
 
+from osrs_hiscore_scrape.job.checkpoint import IntervalSet
 from osrs_hiscore_scrape.job.records import (HSCategoryJob, HSLookupJob,
                                              JobManager, JobQueue)
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
@@ -200,3 +201,21 @@ async def test_jobqueue_maxsize_blocks_until_get():
     await asyncio.wait_for(task, timeout=1)
 
     assert len(q) == 1
+
+
+def test_jobmanager_skips_committed_priorities():
+    jm = JobManager(start=1, end=10, skip=IntervalSet([(1, 2), (4, 6)]))
+    assert jm.value == 3
+
+    jm.next()
+    assert jm.value == 7
+
+    jm.set(5)
+    assert jm.value == 7
+
+
+def test_jobmanager_skip_until_end_finishes():
+    jm = JobManager(start=1, end=3, skip=IntervalSet([(2, 3)]))
+
+    jm.next()
+    assert jm.is_finished() is True
@@ -2,7 +2,14 @@ from datetime import datetime
 
 import pytest
 
-from osrs_hiscore_scrape.request.records import CategoryInfo, CategoryRecord
+from osrs_hiscore_scrape.request.records import (CategoryInfo,
+                                                 CategoryInfoMode,
+                                                 CategoryRecord,
+                                                 ColumnarCategoryInfo,
+                                                 RankedCategoryInfo,
+                                                 SampledCategoryInfo,
+                                                 StreamingCategoryInfo)
+from osrs_hiscore_scrape.util import json_wrapper
 
 
 def test_initialization(sample_ts: datetime):
@@ -111,3 +118,354 @@ def test_str_returns_json(sample_ts: datetime, sample_category_records: list[Cat
     assert s.startswith("{")
     assert '"name":"category"' in s
     assert '"count":5' in s
+
+
+def test_streaming_matches_exact(sample_ts: datetime, sample_category_records: list[CategoryRecord]):
+    exact = CategoryInfo("category", sample_ts)
+    streaming = StreamingCategoryInfo("category", sample_ts)
+
+    for rec in sample_category_records:
+        exact.add(rec)
+        streaming.add(rec)
+
+    exact_dct, streaming_dct = exact.to_dict(), streaming.to_dict()
+
+    for key in ("count", "total_score", "max", "min"):
+        assert streaming_dct[key] == exact_dct[key]
+    assert streaming_dct["mean"] == pytest.approx(exact_dct["mean"])
+    for section in ("population", "sample", "quartiles"):
+        for key, value in exact_dct[section].items():
+            assert streaming_dct[section][key] == pytest.approx(value)
+
+
+def test_streaming_does_not_keep_records(sample_ts: datetime):
+    streaming = StreamingCategoryInfo("category", sample_ts)
+
+    for rank in range(1, 10_001):
+        streaming.add(CategoryRecord(
+            rank=rank, score=20_000 - rank, username=f"test{rank}"))
+
+    dct = streaming.to_dict()
+
+    assert not hasattr(streaming, "_records")
+    assert dct["count"] == 10_000
+    assert dct["quartiles"]["q2"] == pytest.approx(15_000, rel=0.01)
+    assert dct["max"]["rank"] == 1
+    assert dct["min"]["rank"] == 10_000
+
+
+def test_streaming_empty(sample_ts: datetime):
+    dct = StreamingCategoryInfo("category", sample_ts).to_dict()
+
+    assert dct["count"] == 0
+    assert dct["mean"] is None
+    assert dct["median"] is None
+    assert dct["quartiles"]["q1"] is None
+    assert dct["population"]["variance"] is None
+
+
+@pytest.mark.parametrize("mode, cls", [
+    ("exact", CategoryInfo),
+    ("STREAMING", StreamingCategoryInfo),
+])
+def test_category_info_mode_create(sample_ts: datetime, mode: str, cls: type):
+    category_info = CategoryInfoMode.from_string(mode).create(
+        name="category", ts=sample_ts)
+
+    assert isinstance(category_info, cls)
+
+
+def test_category_info_mode_invalid():
+    with pytest.raises(KeyError):
+        CategoryInfoMode.from_string("invalid")
+
+
+@pytest.mark.parametrize("count", [2, 5, 6, 101])
+def test_ranked_matches_exact(sample_ts: datetime, count: int):
+    records = [CategoryRecord(rank=rank, score=(count - rank) ** 2, username=f"test{rank}")
+               for rank in range(1, count + 1)]
+
+    exact = CategoryInfo("category", sample_ts)
+    ranked = RankedCategoryInfo("category", sample_ts, expected_count=count)
+
+    for rec in records:
+        exact.add(rec)
+        ranked.add(rec)
+
+    exact_dct, ranked_dct = exact.to_dict(), ranked.to_dict()
+
+    assert ranked_dct["median"] == exact_dct["median"]
+    assert ranked_dct["quartiles"] == exact_dct["quartiles"]
+    for section in ("population", "sample"):
+        for key, value in exact_dct[section].items():
+            assert ranked_dct[section][key] == pytest.approx(value)
+
+
+def test_ranked_keeps_only_needed_scores(sample_ts: datetime):
+    ranked = RankedCategoryInfo("category", sample_ts, expected_count=10_000)
+
+    for rank in range(1, 10_001):
+        ranked.add(CategoryRecord(rank=rank, score=20_000 -
+                   rank, username=f"test{rank}"))
+
+    assert len(ranked._scores) <= 8
+    assert ranked.to_dict()["quartiles"]["q2"] == pytest.approx(15_000 - 0.5)
+
+
+def test_ranked_count_mismatch(sample_ts: datetime, sample_category_records: list[CategoryRecord]):
+    ranked = RankedCategoryInfo("category", sample_ts, expected_count=10)
+
+    for rec in sample_category_records:
+        ranked.add(rec)
+
+    dct = ranked.to_dict()
+
+    assert dct["count"] == 5
+    assert dct["median"] is None
+    assert dct["quartiles"]["q1"] is None
+    assert dct["population"]["variance"] is not None
+
+
+def test_ranked_empty(sample_ts: datetime):
+    dct = RankedCategoryInfo("category", sample_ts, expected_count=0).to_dict()
+
+    assert dct["count"] == 0
+    assert dct["median"] is None
+    assert dct["quartiles"]["q1"] is None
+
+
+@pytest.mark.parametrize("count", [2, 5, 6, 101, 5_000])
+def test_columnar_matches_exact(sample_ts: datetime, count: int):
+    pytest.importorskip("numpy")
+
+    records = [CategoryRecord(rank=rank, score=(count - rank) ** 2, username=f"test{rank}")
+               for rank in range(1, count + 1)]
+
+    exact = CategoryInfo("category", sample_ts)
+    columnar = ColumnarCategoryInfo("category", sample_ts, capacity=4)
+
+    for rec in records:
+        exact.add(rec)
+        columnar.add(rec)
+
+    exact_dct, columnar_dct = exact.to_dict(), columnar.to_dict()
+
+    for key in ("count", "total_score", "median", "max", "min"):
+        assert columnar_dct[key] == exact_dct[key]
+    for section in ("population", "sample", "quartiles"):
+        for key, value in exact_dct[section].items():
+            assert columnar_dct[section][key] == pytest.approx(value)
+
+
+def test_columnar_percentile_and_histogram(sample_ts: datetime, sample_category_records: list[CategoryRecord]):
+    pytest.importorskip("numpy")
+
+    columnar = ColumnarCategoryInfo("category", sample_ts)
+    for rec in sample_category_records:
+        columnar.add(rec)
+
+    counts, edges = columnar.histogram(bins=[0, 100, 500])
+
+    assert columnar.percentile(0) == 10
+    assert columnar.percentile(100) == 400
+    assert counts == [1, 4]
+    assert edges == [0, 100, 500]
+    assert columnar.ranks.tolist() == [1, 2, 3, 4, 5]
+
+
+def test_columnar_add_many_matches_add(sample_ts: datetime):
+    pytest.importorskip("numpy")
+
+    records = [CategoryRecord(rank=rank, score=10_000 - rank,
+                              username=f"test{rank}") for rank in range(1, 101)]
+    single = ColumnarCategoryInfo("category", sample_ts, capacity=4)
+    bulk = ColumnarCategoryInfo("category", sample_ts, capacity=4)
+
+    for rec in records:
+        single.add(rec)
+    # pages may arrive out of order
+    for first in (50, 0, 25, 75):
+        bulk.add_many(records[first:first + 25])
+    bulk.add_many([])
+
+    assert bulk.to_dict() == single.to_dict()
+
+
+def test_columnar_percentiles_and_histogram_in_summary(sample_ts: datetime, sample_category_records: list[CategoryRecord]):
+    pytest.importorskip("numpy")
+
+    columnar = ColumnarCategoryInfo("category", sample_ts, percentiles=[
+                                    0, 99.5, 100], histogram_bins=2)
+    columnar.add_many(sample_category_records)
+
+    dct = columnar.to_dict()
+    assert list(dct["percentiles"]) == ["0", "99.5", "100"]
+    assert dct["percentiles"]["0"] == 10 and dct["percentiles"]["100"] == 400
+    assert sum(dct["histogram"]["counts"]) == 5 and len(
+        dct["histogram"]["edges"]) == 3
+
+    # the options survive a shard's partial state
+    restored = CategoryInfoMode.from_state(columnar.to_state())
+    assert restored.to_dict()["percentiles"] == dct["percentiles"]
+    assert "histogram" not in ColumnarCategoryInfo(
+        "category", sample_ts).to_dict()
+
+
+def test_columnar_empty(sample_ts: datetime):
+    pytest.importorskip("numpy")
+
+    columnar = ColumnarCategoryInfo("category", sample_ts)
+    dct = columnar.to_dict()
+
+    assert dct["count"] == 0
+    assert dct["median"] is None
+    assert columnar.percentile(50) is None
+    assert columnar.histogram() == ([], [])
+
+
+def test_columnar_without_numpy(sample_ts: datetime, monkeypatch):
+    monkeypatch.setattr("osrs_hiscore_scrape.request.records.np", None)
+
+    with pytest.raises(ImportError, match="numpy"):
+        ColumnarCategoryInfo("category", sample_ts)
+
+
+def _create(mode: CategoryInfoMode, ts: datetime, count: int):
+    if mode is CategoryInfoMode.columnar:
+        pytest.importorskip("numpy")
+    options = {"expected_count": count} if mode is CategoryInfoMode.ranked else {}
+    return mode.create(name="category", ts=ts, **options)
+
+
+@pytest.mark.parametrize("mode", list(CategoryInfoMode))
+def test_merge_shards_matches_single(sample_ts: datetime, mode: CategoryInfoMode):
+    count = 301
+    records = [CategoryRecord(rank=rank, score=(count - rank) * 3, username=f"test{rank}")
+               for rank in range(1, count + 1)]
+
+    single = _create(mode, sample_ts, count)
+    shards = [_create(mode, sample_ts, count) for _ in range(3)]
+    for idx, rec in enumerate(records):
+        single.add(rec)
+        shards[idx * 3 // count].add(rec)
+
+    merged = shards[2]
+    merged.merge(shards[1])
+    merged.merge(shards[0])
+
+    single_dct, merged_dct = single.to_dict(), merged.to_dict()
+    # merged sketches compact, so streaming quartiles are only within the rank error
+    quartile_rel = 0.05 if mode is CategoryInfoMode.streaming else 1e-6
+
+    for key in ("count", "total_score", "max", "min"):
+        assert merged_dct[key] == single_dct[key]
+    for section in ("population", "sample"):
+        for key, value in single_dct[section].items():
+            assert merged_dct[section][key] == pytest.approx(value)
+    for key, value in single_dct["quartiles"].items():
+        assert merged_dct["quartiles"][key] == pytest.approx(
+            value, rel=quartile_rel)
+
+
+@pytest.mark.parametrize("mode", list(CategoryInfoMode))
+def test_add_runs_matches_add(sample_ts: datetime, mode: CategoryInfoMode):
+    runs = [(200_000_000, 40), (150_000_000, 1), (90_000, 3), (13, 56)]
+    count = sum(c for _, c in runs)
+    scores = [score for score, c in runs for _ in range(c)]
+    usernames = [f"test{rank}" for rank in range(1, count + 1)]
+
+    added = _create(mode, sample_ts, count)
+    for i, score in enumerate(scores):
+        added.add(CategoryRecord(
+            rank=i + 1, score=score, username=usernames[i]))
+
+    # split over two calls so a run crosses the boundary
+    by_runs = _create(mode, sample_ts, count)
+    by_runs.add_runs(
+        first_rank=1, runs=runs[:1] + [(150_000_000, 1), (90_000, 1)], usernames=usernames[:42])
+    by_runs.add_runs(first_rank=43, runs=[
+                     (90_000, 2), (13, 56)], usernames=usernames[42:])
+
+    added_dct, runs_dct = added.to_dict(), by_runs.to_dict()
+    for key in ("count", "total_score", "max", "min", "quartiles"):
+        assert runs_dct[key] == added_dct[key]
+    for section in ("population", "sample"):
+        for key, value in added_dct[section].items():
+            assert runs_dct[section][key] == pytest.approx(value)
+
+
+@pytest.mark.parametrize("mode", list(CategoryInfoMode))
+def test_state_round_trip(sample_ts: datetime, sample_category_records: list[CategoryRecord], mode: CategoryInfoMode):
+    category_info = _create(mode, sample_ts, len(sample_category_records))
+    for rec in sample_category_records:
+        category_info.add(rec)
+
+    state = json_wrapper.from_json(
+        json_wrapper.to_json(category_info.to_state()))
+    restored = CategoryInfoMode.from_state(state)
+
+    assert type(restored) is type(category_info)
+    assert restored.to_dict() == category_info.to_dict()
+
+
+def test_merge_different_modes(sample_ts: datetime):
+    with pytest.raises(TypeError):
+        CategoryInfo("category", sample_ts).merge(
+            StreamingCategoryInfo("category", sample_ts))
+
+
+def test_merge_ranked_different_count(sample_ts: datetime):
+    with pytest.raises(ValueError):
+        RankedCategoryInfo("category", sample_ts, expected_count=5).merge(
+            RankedCategoryInfo("category", sample_ts, expected_count=6))
+
+
+def test_sampled_exact_quartiles_from_required_pages(sample_ts: datetime):
+    count = 10_000
+    records = [CategoryRecord(rank=rank, score=(
+        count - rank) ** 2, username=f"test{rank}") for rank in range(1, count + 1)]
+    exact = CategoryInfo("category", sample_ts)
+    for rec in records:
+        exact.add(rec)
+
+    sampled = SampledCategoryInfo(
+        "category", sample_ts, expected_count=count, seed=1)
+    pages = sampled.required_pages()
+    assert pages[0] == 1 and pages[-1] == 400 and len(pages) <= 8
+    drawn = sampled.sample.next_pages(0)
+    for page_num in sorted(set(pages) | set(drawn)):
+        sampled.add_page(page_num, records[(page_num - 1) * 25:page_num * 25])
+
+    sampled_dct, exact_dct = sampled.to_dict(), exact.to_dict()
+    assert sampled_dct["count"] == count
+    assert sampled_dct["median"] == exact_dct["median"]
+    assert sampled_dct["quartiles"] == exact_dct["quartiles"]
+    assert sampled_dct["max"] == exact_dct["max"] and sampled_dct["min"] == exact_dct["min"]
+    # only drawn pages count for the estimates
+    assert sampled_dct["estimate"]["pages"] == len(drawn)
+
+
+def test_sampled_full_sample_matches_exact(sample_ts: datetime):
+    count = 1_000
+    records = [CategoryRecord(rank=rank, score=count - rank,
+                              username=f"test{rank}") for rank in range(1, count + 1)]
+    exact = CategoryInfo("category", sample_ts)
+    for rec in records:
+        exact.add(rec)
+
+    sampled = SampledCategoryInfo("category", sample_ts, expected_count=count)
+    for page_num in sampled.sample.next_pages(sampled.sample.page_count):
+        sampled.add_page(page_num, records[(page_num - 1) * 25:page_num * 25])
+
+    sampled_dct, exact_dct = sampled.to_dict(), exact.to_dict()
+    assert sampled_dct["mean"] == pytest.approx(exact_dct["mean"])
+    assert sampled_dct["estimate"]["mean"] == pytest.approx(
+        [exact_dct["mean"]] * 2)
+    for key, value in exact_dct["population"].items():
+        assert sampled_dct["population"][key] == pytest.approx(value)
+
+
+def test_sampled_cannot_merge(sample_ts: datetime):
+    with pytest.raises(ValueError):
+        SampledCategoryInfo("category", sample_ts, expected_count=10).merge(
+            SampledCategoryInfo("category", sample_ts, expected_count=10))
@@ -328,6 +328,30 @@ def test_to_and_from_dict(sample_player_record: PlayerRecord):
     assert restored.misc == sample_player_record.misc
 
 
+def test_to_dict_projection(sample_player_record: PlayerRecord):
+    fields = [HSType.overall, HSType.zulrah, HSType.combat]
+    d = sample_player_record.to_dict(fields=fields)
+
+    assert set(d) == {"username", "timestamp",
+                      "combat_lvl", "skills", "bosses"}
+    assert list(d["skills"]) == ["overall"]
+    assert list(d["bosses"]) == ["zulrah"]
+
+    restored = PlayerRecord.from_dict(d)
+    for hs_type in fields:
+        assert restored.get_stat(
+            hs_type) == sample_player_record.get_stat(hs_type)
+    assert restored.get_stat(HSType.attack).get_value() == -1
+    assert restored.to_dict(fields=fields) == d
+
+
+def test_to_dict_projection_without_stats(sample_player_record: PlayerRecord):
+    d = sample_player_record.to_dict(fields=[])
+
+    assert set(d) == {"username", "timestamp"}
+    assert PlayerRecord.from_dict(d).username == sample_player_record.username
+
+
 def test_str_returns_json(sample_player_record: PlayerRecord):
     s = str(sample_player_record)
     assert s.startswith("{")
@@ -9,11 +9,12 @@ from osrs_hiscore_scrape.exception.records import (IsRateLimited, NotFound,
                                                    ParsingFailed,
                                                    RequestFailed, ServerBusy)
 from osrs_hiscore_scrape.request import request
-from osrs_hiscore_scrape.request.dto import HSFilterEntry
+from osrs_hiscore_scrape.request.dto import GetPlayerRequest, HSFilterEntry
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
 from osrs_hiscore_scrape.request.records import CategoryRecord, PlayerRecord
 from osrs_hiscore_scrape.request.request import Requests
+from osrs_hiscore_scrape.util.player_store import PlayerStore
 
 TEST_URL = "http://test"
 TEST_USER_AGENT = "test-agent"
@@ -55,6 +56,7 @@ async def test_https_request_success(sample_fake_client_session):
 
     assert result == "ok"
     mock_resp.text.assert_awaited_once()
+    assert req.stats.requests == 1 and req.stats.latency() is not None
 
 
 @pytest.mark.asyncio
@@ -71,6 +73,7 @@ async def test_https_request_rate_limited(sample_fake_client_session):
         mock_ua.return_value.random = TEST_USER_AGENT
         with pytest.raises(IsRateLimited):
             await req.https_request(TEST_URL, params={})
+    assert req.stats.rate_limited == req.stats.requests == 1
 
 
 @pytest.mark.asyncio
@@ -717,3 +720,40 @@ def test__extract_record_scores_misc(monkeypatch, sample_category_records: list[
 
     assert res == [record.score for record in sample_category_records]
     assert called == {}
+
+
+@pytest.mark.asyncio
+async def test_get_user_stats_uses_store(sample_fake_client_session, sample_csv: str, tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        req = Requests(sample_fake_client_session, store=store)
+        player_req = GetPlayerRequest(
+            username="test", account_type=HSAccountTypes.main)
+
+        with patch.object(req, "https_request", new=AsyncMock(return_value=sample_csv)) as mock_https:
+            first = await req.get_user_stats(player_req)
+            second = await req.get_user_stats(player_req)
+
+        mock_https.assert_awaited_once()
+        assert first == second
+        assert store.get(HSAccountTypes.main, "test") is not None
+
+        store.max_age = 0
+        with patch.object(req, "https_request", new=AsyncMock(return_value=sample_csv)) as mock_https:
+            await req.get_user_stats(player_req)
+        mock_https.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_user_stats_caches_not_found(sample_fake_client_session, tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        req = Requests(sample_fake_client_session, store=store)
+        player_req = GetPlayerRequest(
+            username="gone", account_type=HSAccountTypes.main)
+
+        with patch.object(req, "https_request", new=AsyncMock(side_effect=NotFound("Not found"))) as mock_https:
+            with pytest.raises(NotFound):
+                await req.get_user_stats(player_req)
+            with pytest.raises(NotFound, match="cached"):
+                await req.get_user_stats(player_req)
+
+        mock_https.assert_awaited_once()
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from osrs_hiscore_scrape.statistic.moments import RunningMoments
+
+
+def _two_pass_sums(values: list[int]) -> tuple[float, float, float]:
+    mean = sum(values) / len(values)
+    return (
+        sum((x - mean) ** 2 for x in values),
+        sum((x - mean) ** 3 for x in values),
+        sum((x - mean) ** 4 for x in values),
+    )
+
+
+def test_empty():
+    moments = RunningMoments()
+
+    assert moments.n == 0
+    assert moments.mean == 0
+    assert moments.sums() == (0, 0, 0)
+
+
+def test_single_value():
+    moments = RunningMoments()
+    moments.add(5)
+
+    assert moments.n == 1
+    assert moments.mean == 5
+    assert moments.sums() == (0, 0, 0)
+
+
+@pytest.mark.parametrize("values", [
+    [400, 300, 200, 100, 10],
+    [1, 1, 1, 1],
+    [random.Random(1).randint(0, 200_000_000) for _ in range(1_000)],
+])
+def test_matches_two_pass(values: list[int]):
+    moments = RunningMoments()
+    for x in values:
+        moments.add(x)
+
+    assert moments.n == len(values)
+    assert moments.mean == pytest.approx(sum(values) / len(values))
+    for running, exact in zip(moments.sums(), _two_pass_sums(values)):
+        assert running == pytest.approx(exact, rel=1e-9, abs=1e-6)
+
+
+def test_merge_matches_single_pass():
+    rng = random.Random(7)
+    values = [rng.randint(0, 10_000) for _ in range(1_000)]
+
+    single = RunningMoments()
+    for x in values:
+        single.add(x)
+
+    parts = [RunningMoments() for _ in range(3)]
+    for idx, x in enumerate(values):
+        parts[idx % 3].add(x)
+
+    left = RunningMoments()
+    left.merge(parts[0])
+    left.merge(parts[1])
+    left.merge(parts[2])
+
+    right = RunningMoments()
+    parts[1].merge(parts[2])
+    right.merge(parts[0])
+    right.merge(parts[1])
+
+    for merged in (left, right):
+        assert merged.n == single.n
+        assert merged.mean == pytest.approx(single.mean)
+        for merged_sum, single_sum in zip(merged.sums(), single.sums()):
+            assert merged_sum == pytest.approx(single_sum, rel=1e-9)
+
+
+def test_merge_empty():
+    moments = RunningMoments()
+    moments.add(3)
+    moments.merge(RunningMoments())
+
+    assert moments.n == 1
+    assert moments.mean == 3
+
+
+def test_dict_round_trip():
+    moments = RunningMoments()
+    for x in (1, 5, 9):
+        moments.add(x)
+
+    restored = RunningMoments.from_dict(moments.to_dict())
+
+    assert restored.n == moments.n
+    assert restored.mean == moments.mean
+    assert restored.sums() == moments.sums()
+
+
+def test_add_run_matches_repeated_adds():
+    runs = [(200_000_000, 1_000), (13_034_431, 1), (50, 2_500), (7, 3)]
+    repeated, weighted = RunningMoments(), RunningMoments()
+
+    for x, count in runs:
+        for _ in range(count):
+            repeated.add(x)
+        weighted.add(x, count)
+
+    assert weighted.n == repeated.n
+    assert weighted.mean == pytest.approx(repeated.mean)
+    for weighted_sum, repeated_sum in zip(weighted.sums(), repeated.sums()):
+        assert weighted_sum == pytest.approx(repeated_sum, rel=1e-9)
@@ -0,0 +1,137 @@
+import math
+import random
+
+import pytest
+
+from osrs_hiscore_scrape.statistic.sampling import (MIN_STRATUM_PAGES,
+                                                    StratifiedPageSample,
+                                                    StratifiedProportion,
+                                                    draw_stratified,
+                                                    split_strata)
+
+PAGE_SIZE = 25
+
+
+def _scores(count: int) -> list[int]:
+    # sorted from large to small like a hiscore category, with a long tail at the top
+    return [10_000_000 // rank for rank in range(1, count + 1)]
+
+
+def _page(scores: list[int], page_num: int) -> list[int]:
+    return scores[(page_num - 1) * PAGE_SIZE:page_num * PAGE_SIZE]
+
+
+def test_strata_cover_every_page_once():
+    sample = StratifiedPageSample(
+        record_count=2_000_000, page_size=PAGE_SIZE, strata=10)
+
+    assert sample.page_count == 80_000
+    assert sample.strata[0][0] == 1 and sample.strata[-1][1] == 80_000
+    assert all(previous[1] + 1 == current[0] for previous,
+               current in zip(sample.strata, sample.strata[1:]))
+    # the top strata are the smallest
+    sizes = [last - first + 1 for first, last in sample.strata]
+    assert sizes == sorted(sizes)
+
+
+def test_variance_is_unknown_until_every_stratum_is_filled():
+    scores = _scores(10_000)
+    sample = StratifiedPageSample(record_count=len(
+        scores), page_size=PAGE_SIZE, strata=4, seed=1)
+
+    assert math.isinf(sample.total_variance())
+    drawn = sample.next_pages(0)
+    assert len(drawn) == len(set(drawn))
+    assert all(sample.is_drawn(page_num) for page_num in drawn)
+    for page_num in drawn:
+        sample.add_page(page_num, _page(scores, page_num))
+
+    assert sample.pages() == len(drawn) <= 4 * MIN_STRATUM_PAGES
+    assert math.isfinite(sample.total_variance())
+
+
+def test_complete_sample_is_exact():
+    scores = _scores(1_010)
+    sample = StratifiedPageSample(record_count=len(
+        scores), page_size=PAGE_SIZE, strata=3, seed=1)
+
+    drawn = sample.next_pages(sample.page_count)
+    assert sorted(drawn) == list(range(1, sample.page_count + 1))
+    assert sample.next_pages(10) == []
+    for page_num in drawn:
+        sample.add_page(page_num, _page(scores, page_num))
+
+    assert sample.is_complete()
+    assert sample.total() == pytest.approx(sum(scores))
+    assert sample.total_variance() == 0
+    assert sample.relative_error() == 0
+
+
+def test_estimate_converges_within_interval():
+    scores = _scores(250_000)
+    sample = StratifiedPageSample(record_count=len(
+        scores), page_size=PAGE_SIZE, strata=10, seed=7)
+
+    drawn = sample.next_pages(0)
+    while True:
+        for page_num in drawn:
+            sample.add_page(page_num, _page(scores, page_num))
+        if sample.relative_error() <= 0.01:
+            break
+        drawn = sample.next_pages(
+            max(10, sample.pages_needed(0.01) - sample.pages()))
+
+    low, high = sample.mean_interval()
+    assert low <= sum(scores) / len(scores) <= high
+    assert sample.pages() < sample.page_count / 5
+
+
+def test_invalid_confidence():
+    with pytest.raises(ValueError):
+        StratifiedPageSample(
+            record_count=100, page_size=PAGE_SIZE, confidence=1)
+
+
+@pytest.mark.parametrize(
+    "first, last, strata, expected",
+    [
+        (1, 10, 2, [(1, 5), (6, 10)]),
+        (5, 7, 5, [(5, 5), (6, 6), (7, 7)]),
+        (1, 10, 3, [(1, 3), (4, 6), (7, 10)]),
+    ]
+)
+def test_split_strata(first: int, last: int, strata: int, expected: list[tuple[int, int]]):
+    assert split_strata(first, last, strata) == expected
+
+
+def test_draw_stratified_is_proportional():
+    strata = [(1, 100), (101, 1_000)]
+    drawn = draw_stratified(strata, 50, random.Random(1))
+
+    assert [value for _, value in drawn] == sorted(
+        {value for _, value in drawn})
+    assert sum(1 for h, _ in drawn if h == 0) == 5
+    assert sum(1 for h, _ in drawn if h == 1) == 45
+    assert all(strata[h][0] <= value <= strata[h][1] for h, value in drawn)
+
+
+def test_stratified_proportion():
+    share = StratifiedProportion([1_000, 9_000])
+    for i in range(10):
+        share.add(0, i < 5)
+    for i in range(10):
+        share.add(1, i < 1)
+
+    assert share.samples() == 20
+    assert share.proportion() == pytest.approx(0.1 * 0.5 + 0.9 * 0.1)
+    low, high = share.interval()
+    assert 0 <= low < share.proportion() < high <= 1
+
+
+def test_stratified_proportion_without_hits_is_uncertain():
+    share = StratifiedProportion([1_000])
+    for _ in range(20):
+        share.add(0, False)
+
+    assert share.proportion() == 0
+    assert share.interval()[1] > 0
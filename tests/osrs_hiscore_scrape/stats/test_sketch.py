@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from osrs_hiscore_scrape.statistic.sketch import KLLSketch, k_for_error
+
+
+def _exact_quantile(values: list[int], q: float) -> float:
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    return values[f] + (values[c] - values[f]) * (k - f)
+
+
+def test_k_for_error():
+    assert k_for_error(0.0133) == pytest.approx(200, abs=2)
+    assert k_for_error(0.001) > k_for_error(0.01)
+
+
+@pytest.mark.parametrize("error", [0, 1, -0.5, 2])
+def test_k_for_error_invalid(error: float):
+    with pytest.raises(ValueError):
+        k_for_error(error)
+
+
+def test_invalid_k():
+    with pytest.raises(ValueError):
+        KLLSketch(k=1)
+
+
+def test_empty_quantile():
+    assert KLLSketch().quantile(0.5) is None
+
+
+@pytest.mark.parametrize("q", [0, 0.25, 0.5, 0.75, 1])
+def test_small_input_is_exact(q: float):
+    values = [400, 300, 200, 100, 10]
+    sketch = KLLSketch(k=200)
+    for x in values:
+        sketch.update(x)
+
+    assert sketch.quantile(q) == pytest.approx(_exact_quantile(values, q))
+
+
+@pytest.mark.parametrize("q", [0.25, 0.5, 0.75])
+def test_large_input_within_rank_error(q: float):
+    error = 0.01
+    rng = random.Random(42)
+    values = [rng.randint(0, 1_000_000) for _ in range(100_000)]
+
+    sketch = KLLSketch.from_error(error, seed=42)
+    for x in values:
+        sketch.update(x)
+
+    ordered = sorted(values)
+    estimate = sketch.quantile(q)
+    rank = sum(1 for x in ordered if x <= estimate) / len(ordered)
+
+    assert sketch.n == len(values)
+    assert abs(rank - q) <= error
+    assert sum(len(c) for c in sketch._compactors) < 3 * sketch.k + 64
+
+
+def test_merge_within_rank_error():
+    error = 0.01
+    rng = random.Random(3)
+    values = [rng.randint(0, 1_000_000) for _ in range(60_000)]
+
+    sketches = [KLLSketch.from_error(error, seed=idx) for idx in range(3)]
+    for idx, x in enumerate(values):
+        sketches[idx % 3].update(x)
+
+    merged = sketches[0]
+    merged.merge(sketches[1])
+    merged.merge(sketches[2])
+
+    ordered = sorted(values)
+    for q in (0.25, 0.5, 0.75):
+        estimate = merged.quantile(q)
+        rank = sum(1 for x in ordered if x <= estimate) / len(ordered)
+        assert abs(rank - q) <= error
+
+    assert merged.n == len(values)
+
+
+def test_dict_round_trip():
+    sketch = KLLSketch(k=16, seed=1)
+    for x in range(1_000):
+        sketch.update(x)
+
+    restored = KLLSketch.from_dict(sketch.to_dict())
+
+    assert restored.n == sketch.n
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+    restored.update(5)
+    assert restored.n == sketch.n + 1
+
+
+@pytest.mark.parametrize("q", [0, 0.3, 0.5, 0.9, 1])
+def test_weighted_update_small_input_is_exact(q: float):
+    runs = [(5, 3), (9, 1), (20, 6)]
+    values = [x for x, count in runs for _ in range(count)]
+
+    sketch = KLLSketch(k=200)
+    for x, count in runs:
+        sketch.update(x, count)
+
+    assert sketch.n == len(values)
+    assert sketch.quantile(q) == pytest.approx(_exact_quantile(values, q))
+
+
+@pytest.mark.parametrize("q", [0.25, 0.5, 0.75])
+def test_weighted_update_within_rank_error(q: float):
+    error = 0.01
+    rng = random.Random(7)
+    runs = [(rng.randint(0, 1_000_000), rng.choice([1, 1, 2, 50, 3_000]))
+            for _ in range(5_000)]
+    values = sorted(x for x, count in runs for _ in range(count))
+
+    sketch = KLLSketch.from_error(error, seed=7)
+    for x, count in runs:
+        sketch.update(x, count)
+
+    estimate = sketch.quantile(q)
+    low = sum(1 for x in values if x < estimate) / len(values)
+    high = sum(1 for x in values if x <= estimate) / len(values)
+
+    assert sketch.n == len(values)
+    assert low - error <= q <= high + error
@@ -0,0 +1,36 @@
+from osrs_hiscore_scrape.util.bloom_filter import BloomFilter
+
+
+def test_added_keys_are_contained():
+    bloom = BloomFilter(capacity=1000)
+    keys = [f"main:player {i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+    assert not bloom.is_full()
+
+
+def test_error_rate_is_roughly_kept():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"added {i}")
+
+    false_positives = sum(f"other {i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_sizing():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    # about 9.6 bits and 7 hashes per key for a 1% error rate
+    assert 9000 < bloom.size < 10_000
+    assert bloom.hashes == 7
+    assert len(bloom._bits) == (bloom.size + 7) // 8
+
+
+def test_is_full():
+    bloom = BloomFilter(capacity=2)
+    for key in ("a", "b", "c"):
+        bloom.add(key)
+    assert bloom.is_full()
@@ -0,0 +1,136 @@
+import datetime
+import os
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.job.records import HSLookupJob
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.records import CategoryRecord, PlayerRecord
+from osrs_hiscore_scrape.util.bulk_reader import (ReadStats, chunk_bounds,
+                                                  read_category_batches,
+                                                  read_category_records_bulk,
+                                                  read_player_records_bulk)
+from osrs_hiscore_scrape.util.compression import open_writer
+from osrs_hiscore_scrape.util.io import ENCODING, hs_lookup_formatter
+from osrs_hiscore_scrape.util.snapshot import write_snapshot
+
+
+def _category_records(count: int) -> list[CategoryRecord]:
+    return [CategoryRecord(rank=rank, score=10_000 - rank, username=f"test{rank}") for rank in range(1, count + 1)]
+
+
+def _write_lines(file_path: str, lines: list[str]):
+    with open(file_path, "wb") as f:
+        f.write("".join(f"{line}\n" for line in lines).encode(ENCODING))
+
+
+def test_chunk_bounds_end_at_line_boundaries():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        _write_lines(file_path, [str(record)
+                     for record in _category_records(100)])
+
+        bounds = chunk_bounds(file_path, chunk_size=300)
+        assert len(bounds) > 1
+        assert bounds[0][0] == 0
+        assert bounds[-1][1] == os.path.getsize(file_path)
+
+        with open(file_path, "rb") as f:
+            content = f.read()
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            assert end == start
+            assert content[end - 1:end] == b"\n"
+
+
+def test_chunk_bounds_empty_file():
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        assert chunk_bounds(file.name) == []
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_read_category_records_bulk_in_file_order(workers: int):
+    records = _category_records(500)
+    lines = [str(record) for record in records]
+    lines.insert(10, "false data")
+    lines.insert(300, '{"rank": 1}')
+    lines.insert(400, "")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        _write_lines(file_path, lines)
+
+        stats = ReadStats()
+        assert list(read_category_records_bulk(
+            file_path, workers=workers, chunk_size=1_000, stats=stats)) == records
+        assert stats == ReadStats(records=500, malformed=2)
+
+
+def test_read_category_batches_columns():
+    records = _category_records(50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        _write_lines(file_path, [str(record) for record in records])
+
+        batches = list(read_category_batches(
+            file_path, workers=1, chunk_size=500))
+        assert len(batches) > 1
+        assert [rank for batch in batches for rank in batch.ranks] == [
+            r.rank for r in records]
+        assert [score for batch in batches for score in batch.scores] == [
+            r.score for r in records]
+        assert [name for batch in batches for name in batch.usernames] == [
+            r.username for r in records]
+
+
+def test_read_category_records_bulk_compressed():
+    records = _category_records(300)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt.gz")
+        with open_writer(file_path) as f:
+            f.write(
+                "".join(f"{record}\n" for record in records).encode(ENCODING))
+            f.write(b"false data\n")
+
+        stats = ReadStats()
+        assert list(read_category_records_bulk(
+            file_path, workers=4, chunk_size=1_000, stats=stats)) == records
+        assert stats == ReadStats(records=300, malformed=1)
+
+
+def test_read_category_batches_snapshot():
+    records = _category_records(50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.bin")
+        write_snapshot(file_path, iter(records), block_size=16)
+
+        stats = ReadStats()
+        assert list(read_category_records_bulk(
+            file_path, stats=stats)) == records
+        assert stats.records == 50
+
+
+def test_read_bulk_no_file():
+    assert list(read_category_records_bulk(None)) == []  # type: ignore
+    assert list(read_player_records_bulk("false_file")) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_player_records_bulk(workers: int):
+    records = [PlayerRecord(username=f"test{i}", csv=["-1,-1,-1"],
+                            ts=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)) for i in range(40)]
+    lines = [hs_lookup_formatter(HSLookupJob(priority=i, username=record.username,
+                                             account_type=HSAccountTypes.main, result=record)) for i, record in enumerate(records)]
+    lines.insert(5, "false data")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "players.txt")
+        _write_lines(file_path, lines)
+
+        stats = ReadStats()
+        assert list(read_player_records_bulk(
+            file_path, workers=workers, chunk_size=2_000, stats=stats)) == records
+        assert stats == ReadStats(records=40, malformed=1)
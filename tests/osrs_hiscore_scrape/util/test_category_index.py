@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from osrs_hiscore_scrape.cli.presets import _parse_key_value_pairs
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryRecord
+from osrs_hiscore_scrape.util.category_index import CategoryIndex
+
+NOW = datetime.now(timezone.utc)
+
+
+def _scrape(scores: dict[str, int], first_rank: int = 1) -> list[CategoryRecord]:
+    ordered = sorted(scores.items(), key=lambda item: -item[1])
+    return [CategoryRecord(rank=rank, score=score, username=name) for rank, (name, score) in enumerate(ordered, start=first_rank)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with CategoryIndex(str(tmp_path / "index.db")) as index:
+        index.add_snapshot(HSAccountTypes.main, HSType.zulrah,
+                           _scrape({"a": 900, "b": 500, "c": 300}), NOW)
+        index.add_snapshot(HSAccountTypes.main, HSType.vorkath,
+                           _scrape({"b": 800, "c": 400, "d": 100}), NOW)
+        index.add_snapshot(HSAccountTypes.im, HSType.zulrah,
+                           _scrape({"a": 50}), NOW)
+        yield index
+
+
+def test_usernames_are_interned(index):
+    assert index._conn.execute(
+        "SELECT COUNT(*) FROM usernames").fetchone() == (4,)
+    assert index._conn.execute(
+        "SELECT COUNT(*) FROM entries").fetchone() == (7,)
+
+
+def test_lookup(index):
+    entries = index.lookup("B")
+    assert [(e.hs_type, e.rank, e.score) for e in entries] == [
+        (HSType.vorkath, 1, 800), (HSType.zulrah, 2, 500)]
+    assert [e.account_type for e in index.lookup("a", HSAccountTypes.im)] == [
+        HSAccountTypes.im]
+    assert index.lookup("nobody") == []
+
+
+def test_members(index):
+    assert index.members(HSAccountTypes.main, _parse_key_value_pairs(
+        "zulrah>=300,vorkath>200")) == ["b", "c"]
+    assert index.members(HSAccountTypes.main,
+                         _parse_key_value_pairs("vorkath<500")) == ["c", "d"]
+    assert index.members(
+        HSAccountTypes.im, _parse_key_value_pairs("zulrah>10")) == ["a"]
+
+    with pytest.raises(ValueError):
+        index.members(HSAccountTypes.main,
+                      _parse_key_value_pairs("zulrah>1,cerberus>1"))
+
+
+def test_rejects_listed_scores(index):
+    hs_filter = _parse_key_value_pairs("zulrah>=400")
+    assert not index.rejects(HSAccountTypes.main, hs_filter, "a")
+    assert index.rejects(HSAccountTypes.main, hs_filter, "c")
+    # categories that aren't indexed can't reject anyone
+    assert not index.rejects(
+        HSAccountTypes.main, _parse_key_value_pairs("cerberus>=400"), "c")
+    assert index.rejected == 1
+
+
+def test_rejects_unlisted_players_below_the_floor(index):
+    # the zulrah scrape covers the top down to 300, "d" isn't listed so scores at most 300
+    assert index.rejects(HSAccountTypes.main,
+                         _parse_key_value_pairs("zulrah>=301"), "d")
+    assert not index.rejects(
+        HSAccountTypes.main, _parse_key_value_pairs("zulrah>=300"), "d")
+    assert not index.rejects(
+        HSAccountTypes.main, _parse_key_value_pairs("zulrah<10"), "d")
+
+
+def test_scrapes_not_from_the_top_have_no_floor(tmp_path):
+    with CategoryIndex(str(tmp_path / "index.db")) as index:
+        index.add_snapshot(HSAccountTypes.main, HSType.zulrah,
+                           _scrape({"a": 900}, first_rank=50), NOW)
+        assert not index.rejects(
+            HSAccountTypes.main, _parse_key_value_pairs("zulrah>=1000"), "d")
+        assert index.rejects(HSAccountTypes.main,
+                             _parse_key_value_pairs("zulrah>=1000"), "a")
+
+
+def test_newer_scrape_replaces_listings_in_its_range(index):
+    index.add_snapshot(HSAccountTypes.main, HSType.zulrah, _scrape(
+        {"a": 950, "c": 600}), NOW + timedelta(hours=1))
+
+    # "b" was in the rescraped range but isn't listed anymore
+    assert [e.hs_type for e in index.lookup("b", HSAccountTypes.main)] == [
+        HSType.vorkath]
+    assert [e.score for e in index.lookup(
+        "c", HSAccountTypes.main) if e.hs_type == HSType.zulrah] == [600]
+    assert index.rejects(HSAccountTypes.main,
+                         _parse_key_value_pairs("zulrah>=601"), "b")
+
+    # an older scrape doesn't overwrite newer listings
+    index.add_snapshot(HSAccountTypes.main, HSType.zulrah, _scrape(
+        {"c": 1}, first_rank=2), NOW - timedelta(days=1))
+    assert [e.score for e in index.lookup(
+        "c", HSAccountTypes.main) if e.hs_type == HSType.zulrah] == [600]
+
+
+def test_stale_listings_are_ignored(tmp_path):
+    with CategoryIndex(str(tmp_path / "index.db"), max_age=60) as index:
+        index.add_snapshot(HSAccountTypes.main, HSType.zulrah,
+                           _scrape({"a": 900}), NOW - timedelta(hours=1))
+        assert not index.rejects(
+            HSAccountTypes.main, _parse_key_value_pairs("zulrah>=1000"), "a")
+        assert not index.rejects(
+            HSAccountTypes.main, _parse_key_value_pairs("zulrah>=1000"), "b")
+        assert index.members(HSAccountTypes.main,
+                             _parse_key_value_pairs("zulrah>1")) == []
+
+
+def test_skill_scores_compare_as_levels(tmp_path):
+    with CategoryIndex(str(tmp_path / "index.db")) as index:
+        index.add_snapshot(HSAccountTypes.main, HSType.attack,
+                           _scrape({"a": 13_034_431, "b": 1_000}), NOW)
+        assert index.members(HSAccountTypes.main,
+                             _parse_key_value_pairs("attack>=99")) == ["a"]
+        assert index.rejects(HSAccountTypes.main,
+                             _parse_key_value_pairs("attack>50"), "b")
@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.util.compression import (CODECS, CompressedWriter,
+                                                  available_codecs, codec_for,
+                                                  open_reader, open_writer)
+
+EXTENSIONS = [codec.extension for codec in CODECS]
+
+
+@pytest.mark.parametrize("file_path, expected", [
+    ("out.jsonl.gz", "gzip"),
+    ("out.jsonl.XZ", "xz"),
+    ("out.bz2", "bz2"),
+    ("out.jsonl", None),
+    ("out", None),
+    (None, None),
+])
+def test_codec_for(file_path, expected):
+    codec = codec_for(file_path)
+    assert (codec.name if codec else None) == expected
+
+
+def test_available_codecs():
+    assert {"gzip", "bz2", "xz"} <= set(available_codecs())
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_round_trip_and_append(extension: str):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, f"out.jsonl{extension}")
+        with open_writer(file_path) as f:
+            assert isinstance(f, CompressedWriter)
+            f.write(b"a\nb\n")
+        with open_writer(file_path) as f:
+            f.write(b"c\n")
+
+        with open(file_path, "rb") as f:
+            assert f.read() != b"a\nb\nc\n"
+        with open_reader(file_path) as f:
+            assert list(f) == [b"a\n", b"b\n", b"c\n"]
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_flush_ends_a_member(extension: str):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, f"out.jsonl{extension}")
+        with open_writer(file_path) as f:
+            f.write(b"a\n")
+            f.flush()
+            boundary = f.tell()
+            f.write(b"b\n")
+            f.flush()
+            f.write(b"c\n")
+
+        with open_reader(file_path, offset=boundary) as f:
+            assert list(f) == [b"b\n", b"c\n"]
+
+        # dropping everything after a boundary leaves a valid file
+        with open(file_path, "r+b") as f:
+            f.truncate(boundary)
+        with open_reader(file_path) as f:
+            assert list(f) == [b"a\n"]
+
+
+def test_uncompressed_passthrough():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.jsonl")
+        with open_writer(file_path) as f:
+            f.write(b"a\nb\n")
+
+        with open(file_path, "rb") as f:
+            assert f.read() == b"a\nb\n"
+        with open_reader(file_path, offset=2) as f:
+            assert list(f) == [b"b\n"]
@@ -0,0 +1,127 @@
+import os
+import random
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.request.records import CategoryRecord
+from osrs_hiscore_scrape.util.compression import open_reader, open_writer
+from osrs_hiscore_scrape.util.external_sort import (dedup_usernames,
+                                                    external_sort,
+                                                    extract_value, line_key,
+                                                    sort_records)
+from osrs_hiscore_scrape.util.io import ENCODING, read_category_records
+
+
+def _line(record: CategoryRecord) -> bytes:
+    return f"{record}\n".encode(ENCODING)
+
+
+@pytest.mark.parametrize("line, key, expected", [
+    (b'{"rank":5,"score":10,"username":"test"}', "rank", 5),
+    (b'{"rank": -5, "score": 1.5}', "score", 1.5),
+    (b'{"rank":5,"username":"test"}', "username", "test"),
+    (b'{"username":"a \\"b\\" \\u00e9"}', "username", 'a "b" é'),
+    (b'{"rank":5,"record":{"username":"test","skills":{"attack":{"rank":1}}}}', "rank", 5),
+    (b'{"rank":5}', "score", None),
+    (b'false data', "rank", None),
+])
+def test_extract_value(line: bytes, key: str, expected):
+    assert extract_value(line, key) == expected
+
+
+@pytest.mark.parametrize("chunk_lines", [1, 1_000])
+def test_external_sort_missing_keys_last(chunk_lines: int):
+    lines = [b'false data\n', b'{"rank":2}\n',
+             b'{"score":1}\n', b'{"rank":1}\n']
+    assert list(external_sort(lines, key=line_key("rank"), chunk_lines=chunk_lines)) == [
+        b'{"rank":1}\n', b'{"rank":2}\n', b'false data\n', b'{"score":1}\n']
+
+
+@pytest.mark.parametrize("chunk_lines", [1, 7, 1_000])
+def test_external_sort(chunk_lines: int):
+    records = [CategoryRecord(rank=rank, score=rank %
+                              13, username=f"test{rank}") for rank in range(1, 201)]
+    shuffled = records[:]
+    random.Random(1).shuffle(shuffled)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result = list(external_sort((_line(r) for r in shuffled), key=line_key("rank"),
+                                    temp_dir=temp_dir, chunk_lines=chunk_lines))
+        assert result == [_line(r) for r in records]
+        assert os.listdir(temp_dir) == []
+
+
+def test_external_sort_is_stable():
+    lines = [f'{{"score":{i % 3},"username":"test{i}"}}\n'.encode()
+             for i in range(30)]
+    result = list(external_sort(lines, key=line_key("score"), chunk_lines=4))
+    assert result == sorted(lines, key=line_key("score"))  # type: ignore
+
+
+def test_dedup_usernames_keeps_freshest():
+    lines = [
+        b'{"rank":1,"record":{"username":"a","timestamp":"2025-01-02T00:00:00+00:00"}}\n',
+        b'{"rank":2,"record":{"username":"b","timestamp":"2025-01-01T00:00:00+00:00"}}\n',
+        b'{"rank":3,"record":{"username":"a","timestamp":"2025-01-01T00:00:00+00:00"}}\n',
+        b'{"rank":4,"record":{"username":"b","timestamp":"2025-01-03T00:00:00+00:00"}}\n',
+        b'false data\n',
+    ]
+    assert sorted(dedup_usernames(lines, chunk_lines=2)
+                  ) == sorted([lines[0], lines[3], lines[4]])
+
+
+def test_dedup_usernames_without_timestamp_keeps_last():
+    lines = [b'{"rank":1,"score":5,"username":"a"}\n', b'{"rank":2,"score":4,"username":"b"}\n',
+             b'{"rank":3,"score":3,"username":"a"}\n']
+    assert sorted(dedup_usernames(lines, chunk_lines=1)) == [
+        lines[1], lines[2]]
+
+
+def test_sort_records_in_place_with_dedup():
+    records = [CategoryRecord(rank=rank, score=100 - rank,
+                              username=f"test{rank % 40}") for rank in range(1, 61)]
+    shuffled = records[:]
+    random.Random(2).shuffle(shuffled)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        with open(file_path, "wb") as f:
+            f.write(b"".join(_line(r) for r in shuffled))
+            f.write(b"\n")
+
+        count = sort_records(file_path, file_path, key="rank",
+                             dedup=True, temp_dir=temp_dir, chunk_lines=8)
+
+        # duplicates keep their last occurrence in the shuffled file
+        last = {r.username: r for r in shuffled}
+        expected = sorted(last.values(), key=lambda r: r.rank)
+        assert count == len(expected) == 40
+        assert list(read_category_records(file_path)) == expected
+        assert sorted(os.listdir(temp_dir)) == ["records.txt"]
+
+
+def test_sort_records_stdout(capfd):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        with open(file_path, "wb") as f:
+            f.write(b'{"rank":2}\n{"rank":1}\n')
+
+        assert sort_records(file_path, "-") == 2
+        assert capfd.readouterr().out == '{"rank":1}\n{"rank":2}\n'
+        with open(file_path, "rb") as f:
+            assert f.read() == b'{"rank":2}\n{"rank":1}\n'
+
+
+def test_sort_records_compressed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        in_file = os.path.join(temp_dir, "records.txt.gz")
+        out_file = os.path.join(temp_dir, "sorted.txt.xz")
+        with open_writer(in_file) as f:
+            f.write(b'{"rank":2}\n{"rank":1}\n')
+
+        assert sort_records(in_file, out_file) == 2
+        with open_reader(out_file) as f:
+            assert f.read() == b'{"rank":1}\n{"rank":2}\n'
+        assert sorted(os.listdir(temp_dir)) == [
+            "records.txt.gz", "sorted.txt.xz"]
@@ -1,20 +1,29 @@
 import asyncio
 import datetime
+import gzip
+import lzma
+import os
 import sys
 import tempfile
 
 import pytest
 
-from osrs_hiscore_scrape.job.records import HSLookupJob
+from osrs_hiscore_scrape.job.checkpoint import JobJournal
+from osrs_hiscore_scrape.job.records import HSLookupJob, SkippedJob
 from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.request.hs_types import HSType
 from osrs_hiscore_scrape.request.records import CategoryRecord, PlayerRecord
 from osrs_hiscore_scrape.util import json_wrapper
-from osrs_hiscore_scrape.util.io import (ENCODING, build_temp_file,
-                                         hs_lookup_formatter,
+from osrs_hiscore_scrape.util.compression import open_reader
+from osrs_hiscore_scrape.util.io import (ENCODING, STDOUT, build_temp_file,
+                                         file_size, hs_lookup_formatter,
+                                         open_output_index,
                                          read_category_records,
                                          read_player_records, read_proxies,
-                                         write_record, write_records)
+                                         read_state, seek_offset,
+                                         truncate_file, write_record,
+                                         write_records, write_state)
+from osrs_hiscore_scrape.util.offset_index import OffsetIndex, index_path
 
 
 @pytest.fixture(autouse=True)
@@ -76,6 +85,351 @@ async def test_write_records_multiple_writes():
                     encoding=ENCODING).strip() == line
 
 
+@pytest.mark.asyncio
+async def test_write_records_checkpoint():
+    data = ["data1", None, "data2", "data3"]
+    checkpoints = []
+
+    fake_q = asyncio.Queue()
+    for rec in data:
+        await fake_q.put(rec)
+
+    with tempfile.NamedTemporaryFile(delete=False) as out_file:
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file.name,
+            format=lambda res: res,
+            total=fake_q.qsize(),
+            checkpoint=lambda rec, offset: checkpoints.append((rec, offset)),
+            checkpoint_every=2
+        )
+
+    assert checkpoints == [("data2", len("data1\ndata2\n"))]
+
+
+@pytest.mark.asyncio
+async def test_write_records_journal():
+    data = [SkippedJob(priority=1), HSLookupJob(priority=2, username="a", account_type=HSAccountTypes.main),
+            SkippedJob(priority=3), HSLookupJob(priority=4, username="bb", account_type=HSAccountTypes.main)]
+
+    fake_q = asyncio.Queue()
+    for rec in data:
+        await fake_q.put(rec)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        journal = JobJournal(f"{out_file}.journal")
+        journal.start({}, {}, offset=0)
+
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda job: job.username,
+            total=fake_q.qsize(),
+            journal=journal
+        )
+        journal.close()
+
+        assert list(journal.committed) == [(1, 4)]
+        assert journal.offset == len("a\nbb\n")
+
+        reloaded = JobJournal(f"{out_file}.journal")
+        reloaded.load({})
+        assert [(1, 4)] == list(reloaded.committed)
+        reloaded.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [1, 2, 512])
+async def test_write_records_batches(batch_size: int):
+    data = ["data1", None, "data2", SkippedJob(priority=4), "data3"]
+
+    fake_q = asyncio.Queue()
+    for rec in data:
+        await fake_q.put(rec)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        stats = await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda res: res,
+            total=fake_q.qsize(),
+            batch_size=batch_size,
+            flush_interval=60,
+            fsync=True
+        )
+
+        with open(out_file, "r", encoding=ENCODING) as f:
+            assert f.read() == "data1\ndata2\ndata3\n"
+
+    assert stats.written == 3
+    assert stats.skipped == 2
+    assert stats.queue_depth == 0
+    assert stats.records_per_sec > 0
+
+
+@pytest.mark.asyncio
+async def test_write_records_waits_for_late_records():
+    fake_q = asyncio.Queue()
+
+    async def produce():
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            await fake_q.put(f"data{i}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        producer = asyncio.create_task(produce())
+        stats = await write_records(in_queue=fake_q, out_file=out_file, format=lambda res: res, total=3)
+        await producer
+
+        with open(out_file, "r", encoding=ENCODING) as f:
+            assert f.read() == "data0\ndata1\ndata2\n"
+    assert stats.written == 3
+
+
+@pytest.mark.asyncio
+async def test_write_records_index():
+    data = [CategoryRecord(rank=rank, score=100 - rank,
+                           username=f"test{rank}") for rank in range(1, 51)]
+
+    fake_q = asyncio.Queue()
+    for rec in data:
+        await fake_q.put(rec)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        index = open_output_index(out_file, stride=10)
+        assert index is not None
+
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=str,
+            total=fake_q.qsize(),
+            index=index,
+            index_key=lambda record: record.rank,
+            batch_size=7
+        )
+
+        loaded = OffsetIndex.load(index_path(out_file))
+        assert loaded is not None
+        assert loaded.ranks == [1, 11, 21, 31, 41]
+
+        with open(out_file, "rb") as f:
+            content = f.read()
+        for rank, offset in zip(loaded.ranks, loaded.offsets):
+            assert content[offset:].startswith(
+                str(data[rank - 1]).encode(ENCODING))
+
+        assert list(read_category_records(
+            out_file, start_rank=25, end_rank=32)) == data[24:32]
+        assert list(read_category_records(
+            out_file, start_rank=48)) == data[47:]
+        assert list(read_category_records(out_file, end_rank=3)) == data[:3]
+
+
+def test_open_output_index_drops_truncated_entries():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        with open(out_file, "wb") as f:
+            f.write(b"x" * 25)
+        index = OffsetIndex.open(index_path(out_file), stride=1)
+        for rank in range(1, 4):
+            index.add(rank, rank * 10)
+        index.flush()
+
+        assert open_output_index(out_file, stride=0) is None
+        reopened = open_output_index(out_file, stride=1)
+        assert reopened is not None
+        assert reopened.ranks == [1, 2]
+
+
+def test_read_category_records_ignores_stale_index():
+    data = [CategoryRecord(
+        rank=rank, score=1, username=f"test{rank}") for rank in range(1, 4)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        with open(out_file, "wb") as f:
+            f.write("".join(f"{record}\n" for record in data).encode(ENCODING))
+        index = OffsetIndex.open(index_path(out_file), stride=1)
+        index.add(2, 5)
+        index.flush()
+
+        assert seek_offset(out_file, 2) == 0
+        assert list(read_category_records(out_file, start_rank=2)) == data[1:]
+
+
+@pytest.mark.asyncio
+async def test_write_records_stdout(capfd):
+    data = ["data1", None, "data2"]
+
+    fake_q = asyncio.Queue()
+    for rec in data:
+        await fake_q.put(rec)
+
+    stats = await write_records(
+        in_queue=fake_q,
+        out_file=STDOUT,
+        format=lambda x: x,
+        total=fake_q.qsize()
+    )
+
+    out, err = capfd.readouterr()
+    assert out == "data1\ndata2\n"
+    assert "writing to stdout" in err
+    assert stats.written == 2
+    assert not os.path.exists(STDOUT)
+
+
+def test_write_record_stdout(capsys):
+    write_record(out_file=STDOUT, data="data1")
+    assert capsys.readouterr().out == "data1\n"
+    assert not os.path.exists(STDOUT)
+
+
+def test_open_output_index_stdout():
+    assert open_output_index(STDOUT, stride=10) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("extension", [".gz", ".xz"])
+async def test_write_records_compressed_resume(extension: str):
+    data = [HSLookupJob(
+        priority=i, username=f"test{i}", account_type=HSAccountTypes.main) for i in range(1, 21)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, f"out.txt{extension}")
+        journal = JobJournal(f"{out_file}.journal")
+        journal.start({}, {}, offset=0)
+
+        fake_q = asyncio.Queue()
+        for rec in data[:12]:
+            await fake_q.put(rec)
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda job: job.username,
+            total=fake_q.qsize(),
+            journal=journal,
+            batch_size=5
+        )
+        journal.close()
+        assert journal.offset == file_size(out_file)
+
+        # a crash left an unfinished member behind the last commit
+        with open(out_file, "ab") as f:
+            f.write(b"\x00garbage")
+        truncate_file(out_file, journal.offset)
+
+        fake_q = asyncio.Queue()
+        for rec in data[12:]:
+            await fake_q.put(rec)
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda job: job.username,
+            total=fake_q.qsize()
+        )
+
+        with open(out_file, "rb") as f:
+            assert b"test1\n" not in f.read()
+        assert list(read_proxies(out_file)) == [job.username for job in data]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("extension", [".gz", ".xz"])
+async def test_write_records_compressed_batches_share_a_member(extension: str):
+    data = [HSLookupJob(
+        priority=i, username=f"test{i}", account_type=HSAccountTypes.main) for i in range(1, 2001)]
+    expected = "".join(f"{job.username}\n" for job in data).encode()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, f"out.txt{extension}")
+        journal = JobJournal(f"{out_file}.journal")
+        journal.start({}, {}, offset=0)
+
+        fake_q = asyncio.Queue()
+        for rec in data:
+            await fake_q.put(rec)
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda job: job.username,
+            total=fake_q.qsize(),
+            journal=journal,
+            batch_size=1
+        )
+        journal.close()
+
+        # single record batches compress like the whole output in one member
+        whole = gzip.compress(
+            expected) if extension == ".gz" else lzma.compress(expected)
+        assert file_size(out_file) <= len(whole) * 1.05
+        assert journal.offset == file_size(out_file)
+        assert list(read_proxies(out_file)) == [job.username for job in data]
+
+
+@pytest.mark.asyncio
+async def test_write_records_compressed_member_size():
+    data = [HSLookupJob(
+        priority=i, username=f"test{i}", account_type=HSAccountTypes.main) for i in range(1, 201)]
+    offsets = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt.gz")
+
+        fake_q = asyncio.Queue()
+        for rec in data:
+            await fake_q.put(rec)
+        await write_records(
+            in_queue=fake_q,
+            out_file=out_file,
+            format=lambda job: job.username,
+            total=fake_q.qsize(),
+            checkpoint=lambda job, offset: offsets.append(offset),
+            checkpoint_every=1,
+            batch_size=10,
+            member_size=256
+        )
+
+        # checkpoints wait for the member boundaries, every one of them can be read from
+        boundaries = sorted(set(offsets))
+        assert 1 < len(boundaries) < len(data) // 10
+        assert boundaries[-1] == file_size(out_file)
+        for offset in boundaries[:-1]:
+            with open_reader(out_file, offset=offset) as f:
+                assert f.readline().startswith(b"test")
+
+
+def test_write_record_and_read_compressed():
+    data = CategoryRecord(rank=1, score=5, username="test")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt.gz")
+        write_record(out_file=out_file, data=str(data))
+        write_record(out_file=out_file, data=str(data))
+
+        assert list(read_category_records(out_file)) == [data, data]
+        assert open_output_index(out_file, stride=10) is None
+
+
+def test_truncate_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.txt")
+        write_record(file_path, "line1")
+        with open(file_path, "a") as f:
+            f.write("partial li")
+
+        truncate_file(file_path, len("line1\n"))
+
+        with open(file_path, "r") as f:
+            assert f.read() == "line1\n"
+        assert file_size(file_path) == len("line1\n")
+
+
 def test_write_record():
     data = "data"
 
@@ -147,6 +501,21 @@ def test_read_category_records():
         assert next(category_records) == data
 
 
+def test_read_category_records_from_offset():
+    first = CategoryRecord(rank=1, score=10, username="test1")
+    second = CategoryRecord(rank=2, score=5, username="test2")
+
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        file.write(f"{first}\n".encode(encoding=ENCODING))
+        offset = file.tell()
+        file.write(f"{second}\n".encode(encoding=ENCODING))
+        file.flush()
+
+        category_records = list(read_category_records(
+            file_path=file.name, offset=offset))
+        assert category_records == [second]
+
+
 def test_read_category_records_with_false_data():
     data = CategoryRecord(rank=-1, score=-1, username="test")
 
@@ -198,6 +567,27 @@ def test_read_player_records():
         assert next(player_records) == record
 
 
+def test_read_player_records_rank_range():
+    records = [PlayerRecord(username=f"test{rank}", csv=["-1,-1,-1"],
+                            ts=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)) for rank in range(1, 6)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        index = OffsetIndex.open(index_path(out_file), stride=2)
+        with open(out_file, "wb") as f:
+            for rank, record in enumerate(records, start=1):
+                index.add(rank, f.tell())
+                job = HSLookupJob(priority=rank, username=record.username,
+                                  account_type=HSAccountTypes.main, result=record)
+                f.write(f"{hs_lookup_formatter(job)}\n".encode(ENCODING))
+        index.flush()
+
+        assert seek_offset(out_file, 4) > 0
+        assert list(read_player_records(out_file, start_rank=4)) == records[3:]
+        assert list(read_player_records(
+            out_file, start_rank=2, end_rank=3)) == records[1:3]
+
+
 def test_read_player_records_with_false_data():
     record = PlayerRecord(username="test", csv=[
                           "-1,-1,-1"], ts=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc))
@@ -248,6 +638,40 @@ def test_hs_lookup_formatter():
         {"rank": job.priority, "record": job.result.to_dict()})
 
 
+@pytest.mark.parametrize("backend", json_wrapper.available_backends())
+def test_hs_lookup_formatter_line_is_unchanged(backend: str, sample_player_record_csv_list):
+    record = PlayerRecord(username="test user", csv=sample_player_record_csv_list,
+                          ts=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc))
+    job = HSLookupJob(priority=7, username=record.username,
+                      account_type=HSAccountTypes.main, result=record)
+
+    previous = json_wrapper.backend()
+    json_wrapper.use_backend(backend)
+    try:
+        line = hs_lookup_formatter(job)
+        projected = hs_lookup_formatter(
+            job, fields=[HSType.overall, HSType.zulrah])
+    finally:
+        json_wrapper.use_backend(previous)
+
+    # the lines earlier versions wrote
+    assert line == json_wrapper.to_json(
+        {"rank": 7, "record": record.to_dict()})
+    assert projected == json_wrapper.to_json(
+        {"rank": 7, "record": record.to_dict(fields=[HSType.overall, HSType.zulrah])})
+
+
+def test_hs_lookup_formatter_escapes_non_ascii():
+    record = PlayerRecord(username="t\u00ebst", csv=[
+                          "-1,-1,-1"], ts=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc))
+    job = HSLookupJob(priority=3, username=record.username,
+                      account_type=HSAccountTypes.main, result=record)
+
+    json = hs_lookup_formatter(job)
+    assert json.startswith('{"rank": 3, "record": {')
+    assert '"t\\u00ebst"' in json
+
+
 def test_build_temp_file():
     file_name = "test.txt"
     account_type = HSAccountTypes.main
@@ -256,3 +680,38 @@ def test_build_temp_file():
     temp_file = build_temp_file(
         file_path=file_name, account_type=account_type, hs_type=hs_type)
     assert temp_file == "test.main.sol_heredit.test_io.temp"
+
+
+def test_build_temp_file_compressed():
+    temp_file = build_temp_file(
+        file_path="test.txt.gz", account_type=HSAccountTypes.main, hs_type=HSType.overall)
+    assert temp_file == "test.main.overall.test_io.temp.gz"
+
+
+def test_build_temp_file_stdout():
+    temp_file = build_temp_file(
+        file_path=STDOUT, account_type=HSAccountTypes.main, hs_type=HSType.overall)
+    assert temp_file == "stdout.main.overall.test_io.temp"
+
+
+def test_write_read_state():
+    state = {"mode": "streaming", "values": [1, 2, 3]}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "test.state")
+        write_state(file_path=file_path, state=state)
+
+        assert read_state(file_path=file_path) == state
+        assert not os.path.exists(f"{file_path}.partial")
+
+
+def test_read_state_no_file():
+    assert read_state(file_path="false_file") is None
+
+
+def test_read_state_invalid():
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        file.write(b'{"mode": ')
+        file.flush()
+
+        assert read_state(file_path=file.name) is None
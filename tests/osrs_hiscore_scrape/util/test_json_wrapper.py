@@ -2,7 +2,9 @@ import json
 
 import pytest
 
-from osrs_hiscore_scrape.util.json_wrapper import from_json, to_json
+from osrs_hiscore_scrape.util.json_wrapper import (available_backends, backend,
+                                                   dumps, from_json, loads,
+                                                   to_json, use_backend)
 
 
 def test_to_json_basic_types():
@@ -49,3 +51,40 @@ def test_from_json_with_kwargs():
 def test_json_raises():
     with pytest.raises(json.JSONDecodeError):
         from_json("{bad json}")
+
+
+@pytest.fixture(params=available_backends())
+def json_backend(request):
+    previous = backend()
+    use_backend(request.param)
+    yield request.param
+    use_backend(previous)
+
+
+def test_dumps_is_compact_and_same_for_every_backend(json_backend: str):
+    data = {"rank": 1, "record": {"username": "tést user", "skills": [1, 2]}}
+
+    assert backend() == json_backend
+    assert dumps(
+        data) == '{"rank":1,"record":{"username":"tést user","skills":[1,2]}}'
+    assert loads(dumps(data)) == data
+    assert from_json(dumps(data)) == data
+
+
+def test_dumps_spaced_is_the_to_json_format_for_every_backend(json_backend: str):
+    data = {"rank": 1, "record": {"username": "tést, user: \"x\"\n",
+                                  "empty": {}, "skills": [1, {"xp": 2.5}, []]}}
+
+    assert dumps(data, spaced=True) == to_json(data)
+    assert dumps(data, spaced=True).isascii()
+    assert dumps({"username": "test"}, spaced=True) == '{"username": "test"}'
+
+
+def test_loads_raises(json_backend: str):
+    with pytest.raises(json.JSONDecodeError):
+        loads("{bad json}")
+
+
+def test_use_backend_unknown():
+    with pytest.raises(ValueError):
+        use_backend("unknown")
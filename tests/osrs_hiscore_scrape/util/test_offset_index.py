@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+from osrs_hiscore_scrape.util.offset_index import (_ENTRY, OffsetIndex,
+                                                   index_path)
+
+
+def test_index_path():
+    assert index_path("out.txt") == "out.txt.idx"
+
+
+def test_add_keeps_stride():
+    index = OffsetIndex("unused", stride=10)
+
+    assert index.add(1, 0)
+    assert not index.add(5, 50)
+    assert not index.add(10, 100)
+    assert index.add(11, 110)
+    assert index.add(40, 400)
+
+    assert index.ranks == [1, 11, 40]
+    assert index.offsets == [0, 110, 400]
+
+
+def test_lookup():
+    index = OffsetIndex("unused", stride=10)
+    for rank, offset in [(1, 0), (11, 110), (21, 230)]:
+        index.add(rank, offset)
+
+    assert index.lookup(0) == 0
+    assert index.lookup(1) == 0
+    assert index.lookup(15) == 110
+    assert index.lookup(21) == 230
+    assert index.lookup(1_000) == 230
+
+
+def test_round_trip_and_append():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.txt.idx")
+        index = OffsetIndex.open(file_path, stride=2)
+        index.add(1, 0)
+        index.add(3, 30)
+        index.flush()
+
+        reopened = OffsetIndex.open(file_path, stride=100)
+        assert reopened.stride == 2
+        assert reopened.ranks == [1, 3]
+        reopened.add(5, 50)
+        reopened.flush()
+
+        loaded = OffsetIndex.load(file_path)
+        assert loaded is not None
+        assert list(zip(loaded.ranks, loaded.offsets)) == [
+            (1, 0), (3, 30), (5, 50)]
+
+
+def test_load_ignores_partial_entry():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.txt.idx")
+        index = OffsetIndex.open(file_path, stride=1)
+        index.add(1, 0)
+        index.add(2, 20)
+        index.flush()
+        with open(file_path, "ab") as f:
+            f.write(_ENTRY.pack(3, 30)[:5])
+
+        loaded = OffsetIndex.load(file_path)
+        assert loaded is not None
+        assert loaded.ranks == [1, 2]
+
+
+def test_load_invalid():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.txt.idx")
+        assert OffsetIndex.load(file_path) is None
+
+        with open(file_path, "wb") as f:
+            f.write(b"not an index")
+        assert OffsetIndex.load(file_path) is None
+
+
+def test_truncate():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "out.txt.idx")
+        index = OffsetIndex.open(file_path, stride=1)
+        for rank in range(1, 6):
+            index.add(rank, rank * 10)
+        index.flush()
+
+        index.truncate(30)
+        assert index.ranks == [1, 2]
+
+        loaded = OffsetIndex.load(file_path)
+        assert loaded is not None
+        assert loaded.ranks == [1, 2]
+
+        index.truncate(1_000)
+        assert index.ranks == [1, 2]
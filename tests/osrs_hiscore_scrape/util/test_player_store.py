@@ -0,0 +1,272 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from osrs_hiscore_scrape.cli.presets import _parse_key_value_pairs
+from osrs_hiscore_scrape.request.dto import HSFilterEntry
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import PlayerRecord
+from osrs_hiscore_scrape.util.player_store import (STAT_COLUMNS, PlayerStore,
+                                                   _stat_values,
+                                                   open_player_store,
+                                                   username_key)
+
+
+def _record(username: str, csv: list[str], age: timedelta = timedelta()) -> PlayerRecord:
+    return PlayerRecord(username=username, csv=csv, ts=datetime.now(timezone.utc) - age)
+
+
+def _player(username: str, attack: int, zulrah: int) -> PlayerRecord:
+    csv = []
+    for hs_type in HSType.get_csv_types():
+        if hs_type is HSType.attack:
+            csv.append(f"1,{attack},1000")
+        elif hs_type is HSType.zulrah:
+            csv.append(f"1,{zulrah}")
+        else:
+            csv.append("1,50,101333" if hs_type.is_skill() else "1,50")
+    return _record(username, csv)
+
+
+def test_username_key():
+    assert username_key(" Foo_Bar ") == username_key(
+        "foo bar") == username_key("FOO-BAR") == "foo bar"
+
+
+def test_put_get_roundtrip(sample_player_record_csv_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.db")
+        record = _record("Foo_Bar", sample_player_record_csv_list)
+
+        with PlayerStore(path) as store:
+            store.put(HSAccountTypes.main, record)
+
+        with PlayerStore(path) as store:
+            stored = store.get(HSAccountTypes.main, "foo bar")
+            assert stored is not None
+            assert stored.username == "Foo_Bar"
+            assert stored.ts == record.ts
+            assert stored.get_stat(
+                HSType.attack) == record.get_stat(HSType.attack)
+            assert store.get(HSAccountTypes.im, "foo bar") is None
+
+
+def test_get_respects_max_age(sample_player_record_csv_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        with PlayerStore(os.path.join(tmp, "players.db"), max_age=60) as store:
+            store.put(HSAccountTypes.main, _record(
+                "old", sample_player_record_csv_list, age=timedelta(hours=1)))
+
+            assert store.get(HSAccountTypes.main, "old") is None
+            assert store.get(HSAccountTypes.main, "old",
+                             max_age=2 * 60 * 60) is not None
+            assert store.get(HSAccountTypes.main, "old",
+                             max_age=-1) is not None
+            assert store.hits == 2 and store.misses == 1
+
+
+def test_zero_max_age_always_misses(sample_player_record_csv_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        with PlayerStore(os.path.join(tmp, "players.db"), max_age=0) as store:
+            store.put(HSAccountTypes.main, _record(
+                "new", sample_player_record_csv_list))
+            assert store.get(HSAccountTypes.main, "new") is None
+            assert len(store) == 1
+
+
+def test_older_record_does_not_replace_newer(sample_player_record_csv_list, sample_player_record_csv_list_incomplete):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.db")
+        newer = _record("foo", sample_player_record_csv_list)
+        older = _record(
+            "foo", sample_player_record_csv_list_incomplete, age=timedelta(days=1))
+
+        with PlayerStore(path) as store:
+            store.put(HSAccountTypes.main, newer)
+        # a fresh cache, the database has to keep the newer record on its own
+        with PlayerStore(path, max_age=-1) as store:
+            store.put(HSAccountTypes.main, older)
+        with PlayerStore(path, max_age=-1, cache_size=0) as store:
+            assert store.get(HSAccountTypes.main, "foo").ts == newer.ts
+
+
+def test_writes_are_batched(sample_player_record_csv_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.db")
+
+        def stored_rows() -> int:
+            with sqlite3.connect(path) as conn:
+                return conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+        with PlayerStore(path, batch_size=3, cache_size=1) as store:
+            for i in range(2):
+                store.put(HSAccountTypes.main, _record(
+                    f"p{i}", sample_player_record_csv_list))
+            assert stored_rows() == 0
+            # pending records are found even when the cache dropped them
+            assert store.get(HSAccountTypes.main, "p0") is not None
+
+            store.put(HSAccountTypes.main, _record(
+                "p2", sample_player_record_csv_list))
+            assert stored_rows() == 3
+
+            store.put_many(HSAccountTypes.im, [_record(
+                "p3", sample_player_record_csv_list)])
+            assert stored_rows() == 4
+
+
+def test_cache_is_bounded(sample_player_record_csv_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        with PlayerStore(os.path.join(tmp, "players.db"), cache_size=2) as store:
+            for i in range(5):
+                store.put(HSAccountTypes.main, _record(
+                    f"p{i}", sample_player_record_csv_list))
+            assert len(store._cache) == 2
+            assert store.get(HSAccountTypes.main, "p0") is not None
+
+
+@pytest.mark.asyncio
+async def test_open_player_store():
+    async with open_player_store(None) as store:
+        assert store is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        async with open_player_store(os.path.join(tmp, "players.db"), max_age=5) as store:
+            assert isinstance(store, PlayerStore)
+            assert store.max_age == 5
+
+
+def test_query_filters_and_orders(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        store.put_many(HSAccountTypes.main, [
+            _player("a", attack=40, zulrah=600),
+            _player("b", attack=70, zulrah=900),
+            _player("c", attack=50, zulrah=700),
+            _player("d", attack=10, zulrah=100),
+        ])
+        store.put(HSAccountTypes.im, _player("e", attack=1, zulrah=1000))
+
+        hs_filter = _parse_key_value_pairs("zulrah>=500,attack<60")
+        matched = store.query(HSAccountTypes.main,
+                              hs_filter, order_by=HSType.zulrah)
+        assert [record.username for record in matched] == ["c", "a"]
+
+        indexes = {row[0] for row in store._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_players_zulrah", "idx_players_attack"} <= indexes
+
+
+def test_query_checks_plain_predicates(tmp_path):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        store.put_many(HSAccountTypes.main, [_player("a", attack=40, zulrah=600),
+                                             _player("b", attack=70, zulrah=900)])
+
+        # without comparison and value the predicate is evaluated on every stored record
+        matched = store.query(HSAccountTypes.main, [
+                              HSFilterEntry(HSType.attack, lambda v: v % 7 == 0)])
+        assert [record.username for record in matched] == ["b"]
+
+
+def test_query_max_age(tmp_path, sample_player_record_csv_list):
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        store.put(HSAccountTypes.main, _record(
+            "old", sample_player_record_csv_list, age=timedelta(days=2)))
+        store.put(HSAccountTypes.main, _record(
+            "new", sample_player_record_csv_list))
+
+        assert [r.username for r in store.query(
+            HSAccountTypes.main, [], max_age=24 * 60 * 60)] == ["new"]
+        assert len(list(store.query(HSAccountTypes.main, []))) == 2
+
+
+def test_stat_columns_added_to_older_stores(tmp_path):
+    path = str(tmp_path / "players.db")
+    with PlayerStore(path) as store:
+        store.put(HSAccountTypes.main, _player("a", attack=40, zulrah=600))
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("ALTER TABLE players DROP COLUMN zulrah")
+
+    with PlayerStore(path) as store:
+        assert store._conn.execute(
+            "SELECT zulrah FROM players").fetchone() == (600,)
+        assert len(STAT_COLUMNS) == len(HSType)
+
+
+def test_stat_values_match_get_stat(sample_player_record):
+    for record in (sample_player_record, PlayerRecord("x", [], sample_player_record.ts)):
+        assert _stat_values(record) == [record.get_stat(
+            hs_type).get_value() for hs_type in HSType]
+
+
+def test_scores_roundtrip(tmp_path):
+    path = str(tmp_path / "players.db")
+    with PlayerStore(path) as store:
+        store.put_score(HSAccountTypes.main, HSType.zulrah, "Foo_Bar", 500)
+        # pending scores are visible before they're committed
+        assert store.get_scores(HSAccountTypes.main, HSType.zulrah, [
+                                "foo bar", "baz"]) == {"foo bar": 500}
+
+    with PlayerStore(path) as store:
+        store.put_score(HSAccountTypes.main, HSType.zulrah, "foo bar", 510)
+        store.flush()
+        assert store.get_scores(HSAccountTypes.main, HSType.zulrah, [
+                                "FOO BAR"]) == {"foo bar": 510}
+        assert store.get_scores(HSAccountTypes.main,
+                                HSType.vorkath, ["foo bar"]) == {}
+        assert store.get_scores(
+            HSAccountTypes.im, HSType.zulrah, ["foo bar"]) == {}
+
+
+def test_not_found_roundtrip(tmp_path, sample_player_record_csv_list):
+    path = str(tmp_path / "players.db")
+    with PlayerStore(path) as store:
+        store.put_not_found(HSAccountTypes.main, "Gone_Player")
+        assert store.is_not_found(HSAccountTypes.main, "gone player")
+        assert not store.is_not_found(HSAccountTypes.im, "gone player")
+        assert not store.is_not_found(HSAccountTypes.main, "someone else")
+
+    with PlayerStore(path) as store:
+        assert store.is_not_found(HSAccountTypes.main, "gone player")
+        assert store.not_found_hits == 1
+
+        # the name got taken again
+        store.put(HSAccountTypes.main, _record(
+            "gone player", sample_player_record_csv_list))
+
+    with PlayerStore(path) as store:
+        assert not store.is_not_found(HSAccountTypes.main, "gone player")
+
+
+def test_not_found_ttl(tmp_path):
+    path = str(tmp_path / "players.db")
+    with PlayerStore(path) as store:
+        store.put_not_found(HSAccountTypes.main, "gone")
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE not_found SET ts = ts - 3600")
+
+    with PlayerStore(path, not_found_ttl=60) as store:
+        assert not store.is_not_found(HSAccountTypes.main, "gone")
+    with PlayerStore(path, not_found_ttl=-1) as store:
+        assert store.is_not_found(HSAccountTypes.main, "gone")
+    with PlayerStore(path, not_found_ttl=0) as store:
+        assert not store.is_not_found(HSAccountTypes.main, "gone")
+        store.put_not_found(HSAccountTypes.main, "other")
+        assert not store.is_not_found(HSAccountTypes.main, "other")
+
+
+def test_not_found_filter_grows(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "osrs_hiscore_scrape.util.player_store.MIN_NOT_FOUND_CAPACITY", 4)
+    with PlayerStore(str(tmp_path / "players.db")) as store:
+        for i in range(10):
+            store.put_not_found(HSAccountTypes.main, f"gone {i}")
+
+        assert store._not_found.capacity >= 10
+        assert all(store.is_not_found(
+            HSAccountTypes.main, f"gone {i}") for i in range(10))
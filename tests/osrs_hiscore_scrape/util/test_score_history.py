@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryRecord
+from osrs_hiscore_scrape.util.score_history import ScoreHistory
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _scrape(scores: dict[str, int]) -> list[CategoryRecord]:
+    ordered = sorted(scores.items(), key=lambda item: -item[1])
+    return [CategoryRecord(rank=rank, score=score, username=name) for rank, (name, score) in enumerate(ordered, start=1)]
+
+
+def _add(history: ScoreHistory, days: int, scores: dict[str, int]):
+    return history.add_snapshot(HSAccountTypes.main, HSType.zulrah, _scrape(scores), T0 + timedelta(days=days))
+
+
+@pytest.fixture
+def history(tmp_path):
+    with ScoreHistory(str(tmp_path / "history.db")) as history:
+        _add(history, 0, {"a": 100, "b": 200, "c": 300})
+        _add(history, 7, {"a": 150, "b": 200, "c": 310, "d": 50})
+        _add(history, 14, {"a": 400, "b": 260, "d": 90})
+        yield history
+
+
+def test_only_deltas_are_kept(history):
+    rows = history._conn.execute(
+        "SELECT snapshot_id, COUNT(*) FROM deltas GROUP BY snapshot_id ORDER BY snapshot_id").fetchall()
+    # full first snapshot, then a, c and d changed/appeared, then a, b, d changed and c left
+    assert [count for _, count in rows] == [3, 3, 4]
+    assert history._conn.execute(
+        "SELECT COUNT(*) FROM usernames").fetchone() == (4,)
+
+
+def test_add_snapshot_stats(tmp_path):
+    with ScoreHistory(str(tmp_path / "history.db")) as history:
+        first = _add(history, 0, {"a": 1, "b": 2})
+        second = _add(history, 1, {"A": 5, "c": 3})
+
+    assert (first.records, first.appeared,
+            first.changed, first.left) == (2, 2, 0, 0)
+    assert (second.records, second.appeared,
+            second.changed, second.left) == (2, 1, 1, 1)
+
+
+def test_history(history):
+    assert history.history(HSAccountTypes.main, HSType.zulrah, "A") == [
+        (T0, 100), (T0 + timedelta(days=7), 150), (T0 + timedelta(days=14), 400)]
+    assert history.history(HSAccountTypes.main, HSType.zulrah, "c") == [
+        (T0, 300), (T0 + timedelta(days=7), 310), (T0 + timedelta(days=14), None)]
+    assert history.history(HSAccountTypes.main, HSType.vorkath, "a") == []
+    assert history.history(HSAccountTypes.main, HSType.zulrah, "nobody") == []
+
+
+def test_top_gainers(history):
+    assert history.top_gainers(HSAccountTypes.main, HSType.zulrah) == [
+        ("a", 300), ("b", 60)]
+    assert history.top_gainers(HSAccountTypes.main, HSType.zulrah,
+                               end=T0 + timedelta(days=10)) == [("a", 50), ("c", 10)]
+    assert history.top_gainers(HSAccountTypes.main, HSType.zulrah, start=T0 + timedelta(days=7)) == [
+        ("a", 250), ("b", 60), ("d", 40)]
+    assert history.top_gainers(
+        HSAccountTypes.main, HSType.zulrah, limit=1) == [("a", 300)]
+    # a start before the first snapshot counts from the first snapshot
+    assert history.top_gainers(HSAccountTypes.main, HSType.zulrah,
+                               start=T0 - timedelta(days=1)) == [("a", 300), ("b", 60)]
+
+
+def test_snapshots_must_be_newer(history):
+    with pytest.raises(ValueError):
+        _add(history, 14, {"a": 1})
+    assert history.snapshots(HSAccountTypes.main, HSType.zulrah) == [
+        T0, T0 + timedelta(days=7), T0 + timedelta(days=14)]
+    # the rejected snapshot left nothing behind
+    assert history.history(HSAccountTypes.main, HSType.zulrah,
+                           "a")[-1] == (T0 + timedelta(days=14), 400)
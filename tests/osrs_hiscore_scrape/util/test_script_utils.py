@@ -3,7 +3,7 @@ import sys
 
 import pytest
 
-from osrs_hiscore_scrape.cli.helpers import (argparse_wrapper,
+from osrs_hiscore_scrape.cli.helpers import (HEADLESS_ENV, argparse_wrapper,
                                              script_running_in_cmd_guard)
 
 
@@ -60,6 +60,32 @@ def test_exits_if_stdout_not_tty(monkeypatch, patch_exit):
     assert patch_exit["code"] == 1
 
 
+def test_headless_skips_guard(monkeypatch, patch_exit):
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    monkeypatch.delenv(HEADLESS_ENV, raising=False)
+
+    script_running_in_cmd_guard(headless=True)
+
+
+@pytest.mark.parametrize("value", ["1", "true", "YES"])
+def test_headless_env_skips_guard(value, monkeypatch, patch_exit):
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    monkeypatch.setenv(HEADLESS_ENV, value)
+
+    script_running_in_cmd_guard()
+
+
+def test_headless_env_disabled(monkeypatch, patch_exit):
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: True)
+    monkeypatch.setenv(HEADLESS_ENV, "0")
+
+    with pytest.raises(SystemExit):
+        script_running_in_cmd_guard()
+
+
 @pytest.mark.parametrize(
     "file_manager",
     [
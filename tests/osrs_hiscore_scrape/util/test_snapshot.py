@@ -0,0 +1,195 @@
+import datetime
+import os
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.request.records import (CategoryInfoMode,
+                                                 CategoryRecord)
+from osrs_hiscore_scrape.util.io import read_category_records, write_record
+from osrs_hiscore_scrape.util.snapshot import (CategoryOutputFormat,
+                                               CategorySnapshot,
+                                               SnapshotWriter, is_snapshot,
+                                               write_snapshot)
+
+
+def _records() -> list[CategoryRecord]:
+    # two contiguous runs with a gap, scores going up and down and non ascii usernames
+    ranks = list(range(1, 11)) + list(range(15, 23))
+    return [CategoryRecord(rank=rank, score=(1_000_000 // rank) if rank % 3 else 5, username=f"tëst {rank}")
+            for rank in ranks]
+
+
+def _as_tuples(records) -> list[tuple[int, int, str]]:
+    return [(r.rank, r.score, r.username) for r in records]
+
+
+@pytest.fixture
+def snapshot_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "snapshot.bin")
+        assert write_snapshot(file_path, iter(_records()), block_size=4) == 18
+        yield file_path
+
+
+def test_snapshot_round_trip(snapshot_file: str):
+    assert is_snapshot(snapshot_file)
+
+    with CategorySnapshot(snapshot_file) as snapshot:
+        assert len(snapshot) == 18
+        assert _as_tuples(snapshot) == _as_tuples(_records())
+
+        # blocks never span a gap in ranks
+        for first_rank, scores, usernames in snapshot.blocks():
+            assert len(scores) == len(usernames) <= 4
+            assert usernames[-1] == f"tëst {first_rank + len(scores) - 1}"
+
+
+@pytest.mark.parametrize(
+    "start_rank, end_rank",
+    [(None, None), (3, 7), (4, 5), (9, 16),
+     (11, 14), (20, None), (None, 2), (30, 40)]
+)
+def test_snapshot_rank_range(snapshot_file: str, start_rank: int | None, end_rank: int | None):
+    expected = [r for r in _records()
+                if (start_rank is None or r.rank >= start_rank) and (end_rank is None or r.rank <= end_rank)]
+
+    with CategorySnapshot(snapshot_file) as snapshot:
+        assert _as_tuples(snapshot.records(
+            start_rank=start_rank, end_rank=end_rank)) == _as_tuples(expected)
+
+
+@pytest.mark.parametrize("mode", [CategoryInfoMode.exact, CategoryInfoMode.streaming, CategoryInfoMode.columnar])
+def test_snapshot_feed_matches_add(snapshot_file: str, mode: CategoryInfoMode):
+    ts = datetime.datetime(2025, 1, 1)
+    added = mode.create(name="test", ts=ts)
+    for record in _records():
+        added.add(record)
+
+    fed = mode.create(name="test", ts=ts)
+    with CategorySnapshot(snapshot_file) as snapshot:
+        snapshot.feed(fed)
+
+    assert fed.to_dict() == added.to_dict()
+
+
+def test_snapshot_feed_ranked():
+    records = [CategoryRecord(
+        rank=rank, score=1_000 - rank, username=f"test{rank}") for rank in range(1, 101)]
+    ts = datetime.datetime(2025, 1, 1)
+
+    added = CategoryInfoMode.ranked.create(
+        name="test", ts=ts, expected_count=100)
+    for record in records:
+        added.add(record)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "snapshot.bin")
+        write_snapshot(file_path, iter(records), block_size=7)
+
+        fed = CategoryInfoMode.ranked.create(
+            name="test", ts=ts, expected_count=100)
+        with CategorySnapshot(file_path) as snapshot:
+            snapshot.feed(fed)
+
+    assert fed.to_dict() == added.to_dict()
+
+
+def _tied_records() -> list[CategoryRecord]:
+    scores = [200_000_000] * 500 + [199_999_999] + [5] * 700
+    return [CategoryRecord(rank=rank, score=score, username=f"test{rank}") for rank, score in enumerate(scores, start=1)]
+
+
+def test_snapshot_stores_ties_as_runs():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tied_file = os.path.join(temp_dir, "tied.bin")
+        plain_file = os.path.join(temp_dir, "plain.bin")
+        write_snapshot(tied_file, iter(_tied_records()))
+        write_snapshot(plain_file, iter(
+            CategoryRecord(rank=r.rank, score=r.score + r.rank, username=r.username) for r in _tied_records()))
+
+        assert os.path.getsize(tied_file) < os.path.getsize(plain_file)
+
+        with CategorySnapshot(tied_file) as snapshot:
+            assert _as_tuples(snapshot) == _as_tuples(_tied_records())
+            assert [runs for _, runs, _ in snapshot.runs()] == [
+                [(200_000_000, 500), (199_999_999, 1), (5, 700)]]
+            assert [runs for _, runs, _ in snapshot.runs(start_rank=400, end_rank=600)] == [
+                [(200_000_000, 101), (199_999_999, 1), (5, 99)]]
+
+
+@pytest.mark.parametrize("mode", list(CategoryInfoMode))
+def test_snapshot_feed_runs_matches_add(mode: CategoryInfoMode):
+    if mode is CategoryInfoMode.columnar:
+        pytest.importorskip("numpy")
+    records = _tied_records()
+    ts = datetime.datetime(2025, 1, 1)
+    options = {"expected_count": len(
+        records)} if mode is CategoryInfoMode.ranked else {}
+
+    added = mode.create(name="test", ts=ts, **options)
+    for record in records:
+        added.add(record)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "snapshot.bin")
+        write_snapshot(file_path, iter(records), block_size=256)
+
+        fed = mode.create(name="test", ts=ts, **options)
+        with CategorySnapshot(file_path) as snapshot:
+            snapshot.feed(fed)
+
+    added_dct, fed_dct = added.to_dict(), fed.to_dict()
+    for key in ("count", "total_score", "max", "min", "quartiles"):
+        assert fed_dct[key] == added_dct[key]
+    for section in ("population", "sample"):
+        for key, value in added_dct[section].items():
+            assert fed_dct[section][key] == pytest.approx(value)
+
+
+def test_snapshot_writer_rejects_unordered():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with SnapshotWriter(os.path.join(temp_dir, "snapshot.bin")) as writer:
+            writer.add(CategoryRecord(rank=5, score=1, username="a"))
+            with pytest.raises(ValueError):
+                writer.add(CategoryRecord(rank=4, score=1, username="b"))
+
+
+def test_snapshot_incomplete_raises(snapshot_file: str):
+    with open(snapshot_file, "r+b") as f:
+        f.truncate(os.path.getsize(snapshot_file) - 1)
+
+    with pytest.raises(ValueError):
+        CategorySnapshot(snapshot_file)
+
+
+def test_snapshot_not_a_snapshot():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+        write_record(file_path, str(_records()[0]))
+
+        assert not is_snapshot(file_path)
+        with pytest.raises(ValueError):
+            CategorySnapshot(file_path)
+
+
+def test_read_category_records_reads_snapshots(snapshot_file: str):
+    assert _as_tuples(read_category_records(
+        snapshot_file)) == _as_tuples(_records())
+
+
+def test_empty_snapshot():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "snapshot.bin")
+        write_snapshot(file_path, iter([]))
+
+        with CategorySnapshot(file_path) as snapshot:
+            assert len(snapshot) == 0
+            assert list(snapshot) == []
+
+
+def test_output_format_from_string():
+    assert CategoryOutputFormat.from_string(
+        "Snapshot") is CategoryOutputFormat.snapshot
+    with pytest.raises(KeyError):
+        CategoryOutputFormat.from_string("csv")
@@ -4,7 +4,9 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from osrs_hiscore_scrape.exception.records import NotFound, RetryFailed
-from osrs_hiscore_scrape.job.records import JobManager, JobQueue
+from osrs_hiscore_scrape.job.records import (HSLookupJob, JobManager, JobQueue,
+                                             SkippedJob)
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
 from osrs_hiscore_scrape.worker.records import Worker, create_workers
 
 
@@ -85,6 +87,49 @@ async def test_run_not_found_increments_counter(sample_fake_client_session):
     assert job_manager.value == 1
 
 
+@pytest.mark.asyncio
+async def test_run_forwards_skipped_jobs(sample_fake_client_session):
+    in_q = JobQueue()
+    out_q = JobQueue()
+    job_manager = JobManager(0, 1)
+
+    for priority in range(2):
+        await in_q.put(HSLookupJob(priority=priority, username=f"p{priority}", account_type=HSAccountTypes.main))
+
+    requested = []
+
+    async def request_fn(req, job):
+        requested.append(job.priority)
+        raise NotFound("not found")
+
+    async def enqueue_fn(out_q, job):
+        await out_q.put(job)
+
+    worker = Worker(
+        req=sample_fake_client_session,
+        in_queue=in_q,
+        out_queue=out_q,
+        job_manager=job_manager,
+        request_fn=request_fn,
+        enqueue_fn=enqueue_fn,
+        skip_fn=lambda req, job: job.priority == 0,
+        forward_skipped=True
+    )
+
+    async def stopper():
+        await asyncio.sleep(0.05)
+        await job_manager.await_until_finished()
+
+    asyncio.create_task(stopper())
+    await worker.run()
+
+    assert requested == [1]
+    forwarded = [await out_q.get(), await out_q.get()]
+    assert [type(job) for job in forwarded] == [SkippedJob, SkippedJob]
+    assert [job.priority for job in forwarded] == [0, 1]
+    assert job_manager.value == 2
+
+
 @pytest.mark.asyncio
 async def test_run_retry_failed_requeues_and_raises(sample_fake_client_session):
     in_q = JobQueue()
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+from osrs_hiscore_scrape.request.dto import GetMaxHighscorePageResult
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import (CategoryInfoMode,
+                                                 CategoryRecord,
+                                                 SampledCategoryInfo,
+                                                 StreamingCategoryInfo)
+from osrs_hiscore_scrape.request.request import RequestStats
+from osrs_hiscore_scrape.util.io import write_record
+from scripts.analyse_category import (create_category_info, plan_analysis,
+                                      restore_category_info, sample_category,
+                                      scraped_until, split_rank_range,
+                                      store_category_info)
+
+
+@pytest.mark.parametrize(
+    "start_rank, end_rank, shards, expected",
+    [
+        (1, 100, 1, [(1, 100)]),
+        (1, 100, 2, [(1, 50), (51, 100)]),
+        (1, 110, 2, [(1, 75), (76, 110)]),
+        (1, 30, 4, [(1, 25), (26, 30)]),
+    ]
+)
+def test_split_rank_range(start_rank: int, end_rank: int, shards: int, expected: list[tuple[int, int]]):
+    assert split_rank_range(start_rank=start_rank,
+                            end_rank=end_rank, shards=shards) == expected
+
+
+def _records(count: int) -> list[CategoryRecord]:
+    return [CategoryRecord(rank=rank, score=1_000 - rank, username=f"test{rank}") for rank in range(1, count + 1)]
+
+
+def test_create_columnar_category_info_with_percentiles_and_histogram():
+    pytest.importorskip("numpy")
+
+    category_info = create_category_info(hs_type=HSType.zulrah, stats_mode=CategoryInfoMode.columnar, quantile_error=0.01,
+                                         expected_count=10, percentiles=[1, 99], histogram_bins=4)
+    category_info.add_many(_records(10))
+
+    dct = category_info.to_dict()
+    assert list(dct["percentiles"]) == ["1", "99"]
+    assert sum(dct["histogram"]["counts"]) == 10
+
+
+def _new_info(mode: CategoryInfoMode, expected_count: int = 10):
+    return create_category_info(hs_type=HSType.zulrah, stats_mode=mode, quantile_error=0.01, expected_count=expected_count)
+
+
+def test_restore_replays_temp_file_without_snapshot():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+        for record in _records(10):
+            write_record(out_file=temp_file, data=str(record))
+
+        category_info = restore_category_info(
+            category_info=_new_info(CategoryInfoMode.exact), temp_file=temp_file)
+
+        assert category_info.count() == 10
+        assert category_info.min.rank == 10  # type: ignore
+
+
+def test_restore_prefers_snapshot():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+
+        stored = _new_info(CategoryInfoMode.streaming)
+        for record in _records(5):
+            stored.add(record)
+        store_category_info(category_info=stored, temp_file=temp_file)
+
+        category_info = restore_category_info(
+            category_info=_new_info(CategoryInfoMode.streaming), temp_file=temp_file)
+
+        assert isinstance(category_info, StreamingCategoryInfo)
+        assert category_info.to_dict() == stored.to_dict()
+
+
+def test_restore_ignores_snapshot_of_other_mode():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+
+        stored = _new_info(CategoryInfoMode.streaming)
+        for record in _records(5):
+            stored.add(record)
+            write_record(out_file=temp_file, data=str(record))
+        store_category_info(category_info=stored, temp_file=temp_file)
+
+        category_info = restore_category_info(
+            category_info=_new_info(CategoryInfoMode.exact), temp_file=temp_file)
+
+        assert not isinstance(category_info, StreamingCategoryInfo)
+        assert category_info.count() == 5
+
+
+def test_restore_replays_only_tail_after_checkpoint():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+        records = _records(10)
+
+        stored = _new_info(CategoryInfoMode.ranked)
+        for record in records[:6]:
+            stored.add(record)
+        for record in records[:4]:
+            write_record(out_file=temp_file, data=str(record))
+        # checkpoint covers records up to rank 6 while only 4 were written to the temp file
+        store_category_info(category_info=stored, temp_file=temp_file)
+
+        for record in records[4:]:
+            write_record(out_file=temp_file, data=str(record))
+
+        category_info = restore_category_info(
+            category_info=_new_info(CategoryInfoMode.ranked), temp_file=temp_file)
+
+        expected = _new_info(CategoryInfoMode.ranked)
+        for record in records:
+            expected.add(record)
+
+        restored_dct, expected_dct = category_info.to_dict(), expected.to_dict()
+        restored_dct.pop("timestamp")
+        expected_dct.pop("timestamp")
+
+        assert category_info.count() == 10
+        assert restored_dct == expected_dct
+
+
+class _PlanRequests:
+    proxy_list = None
+    stats = RequestStats(requests=17, seconds=8.5)
+
+
+def test_plan_analysis_leaves_out_scraped_pages():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+        max_page_res = GetMaxHighscorePageResult(page_nr=40, rank_nr=1_000)
+
+        def plan(**kwargs):
+            return plan_analysis(req=_PlanRequests(), account_type=HSAccountTypes.main, hs_type=HSType.zulrah,  # type: ignore
+                                 max_page_res=max_page_res, temp_file=temp_file, num_workers=8, **kwargs)
+
+        assert scraped_until(temp_file) == 0
+        assert plan().stages[0].requests == 40
+
+        stored = _new_info(CategoryInfoMode.ranked, expected_count=1_000)
+        for record in _records(60):
+            stored.add(record)
+        store_category_info(category_info=stored,
+                            temp_file=temp_file, temp_offset=0)
+        for record in _records(100)[60:]:
+            write_record(out_file=temp_file, data=str(record))
+
+        # the checkpoint covers rank 60, the temp file tail up to rank 100
+        assert scraped_until(temp_file) == 100
+        assert plan().stages[0].requests == 36
+
+        sharded = plan(shards=4)
+        assert (sharded.stages[0].requests,
+                sharded.stages[0].workers) == (40, 8)
+        assert sharded.discovery_requests == 17 and sharded.latency == 0.5
+
+
+def test_plan_analysis_of_a_complete_temp_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+        for record in _records(50):
+            write_record(out_file=temp_file, data=str(record))
+
+        plan = plan_analysis(req=_PlanRequests(), account_type=HSAccountTypes.main, hs_type=HSType.zulrah,  # type: ignore
+                             max_page_res=GetMaxHighscorePageResult(page_nr=2, rank_nr=50), temp_file=temp_file, num_workers=8)
+        assert plan.stages[0].requests == 0 and plan.seconds == 0.0
+
+
+def test_plan_analysis_with_a_complete_shard():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+        # the first of the shards 1-50 and 51-100 is done
+        for record in _records(50):
+            write_record(out_file=f"{temp_file}.1-50", data=str(record))
+
+        plan = plan_analysis(req=_PlanRequests(), account_type=HSAccountTypes.main, hs_type=HSType.zulrah,  # type: ignore
+                             max_page_res=GetMaxHighscorePageResult(page_nr=4, rank_nr=100), temp_file=temp_file,
+                             num_workers=8, shards=2)
+        assert plan.stages[0].requests == 2
+
+
+def test_store_skips_non_compact_modes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_file = os.path.join(temp_dir, "test.temp")
+
+        stored = _new_info(CategoryInfoMode.exact)
+        for record in _records(5):
+            stored.add(record)
+        store_category_info(category_info=stored, temp_file=temp_file)
+
+        assert not os.path.exists(f"{temp_file}.state")
+
+
+class _FakePages:
+    """ Serves the pages of a category sorted on score and counts the requests. """
+
+    def __init__(self, scores: list[int]):
+        self.scores = scores
+        self.requests = 0
+
+    async def get_hs_page(self, page_req):
+        self.requests += 1
+        first = (page_req.page_num - 1) * 25
+        return [CategoryRecord(rank=rank + 1, score=self.scores[rank], username=f"test{rank + 1}")
+                for rank in range(first, min(first + 25, len(self.scores)))]
+
+
+def test_sample_category_stops_at_precision():
+    scores = [5_000_000 // rank for rank in range(1, 200_001)]
+    req = _FakePages(scores)
+    category_info = SampledCategoryInfo(name="zulrah", ts=datetime.now(
+        timezone.utc), expected_count=len(scores), seed=3)
+
+    asyncio.run(sample_category(req=req, category_info=category_info, account_type=HSAccountTypes.main,  # type: ignore
+                                hs_type=HSType.zulrah, num_workers=4, precision=0.02))
+
+    dct = category_info.to_dict()
+    low, high = dct["estimate"]["mean"]
+    assert dct["estimate"]["relative_error"] <= 0.02
+    assert low <= sum(scores) / len(scores) <= high
+    assert req.requests < category_info.sample.page_count / 10
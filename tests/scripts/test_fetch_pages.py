@@ -0,0 +1,82 @@
+import os
+import tempfile
+
+import pytest
+
+from osrs_hiscore_scrape.job.checkpoint import JobJournal
+from osrs_hiscore_scrape.request.dto import GetMaxHighscorePageResult
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.request import RequestStats
+from osrs_hiscore_scrape.util.snapshot import CategoryOutputFormat
+from scripts.fetch_pages import main, plan_scrape, prepare_scrape_jobs
+
+
+class FakeRequests:
+    def __init__(self):
+        self.calls = 0
+        self.proxy_list = None
+        self.stats = RequestStats()
+
+    async def get_max_page(self, max_page_req):
+        self.calls += 1
+        return GetMaxHighscorePageResult(page_nr=4, rank_nr=100)
+
+
+@pytest.mark.asyncio
+async def test_prepare_scrape_jobs_resumes_from_journal():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        req = FakeRequests()
+        kwargs = dict(req=req, out_file=out_file, account_type=HSAccountTypes.main,
+                      hs_type=HSType.zulrah, start_rank=1, end_rank=-1)
+
+        journal = JobJournal(f"{out_file}.journal")
+        jobs = await prepare_scrape_jobs(journal=journal, **kwargs)
+        assert [job.page_num for job in jobs] == [1, 2, 3, 4]
+
+        with open(out_file, "w") as f:
+            f.write("page1\npage3\npartial")
+        journal.commit(1, len("page1\n"))
+        journal.commit(3, len("page1\npage3\n"))
+        journal.close()
+
+        journal = JobJournal(f"{out_file}.journal")
+        jobs = await prepare_scrape_jobs(journal=journal, **kwargs)
+        journal.close()
+
+        assert [job.page_num for job in jobs] == [2, 4]
+        assert req.calls == 1
+        with open(out_file, "r") as f:
+            assert f.read() == "page1\npage3\n"
+
+
+@pytest.mark.asyncio
+async def test_plan_scrape_uses_the_journal_of_an_interrupted_run():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_file = os.path.join(temp_dir, "out.txt")
+        req = FakeRequests()
+        kwargs = dict(req=req, account_type=HSAccountTypes.main, hs_type=HSType.zulrah,
+                      start_rank=1, end_rank=-1, num_workers=3)
+
+        plan = await plan_scrape(journal=JobJournal(f"{out_file}.journal"), **kwargs)
+        assert req.calls == 1
+        assert [(stage.name, stage.requests, stage.workers)
+                for stage in plan.stages] == [("pages", 4, 3)]
+
+        journal = JobJournal(f"{out_file}.journal")
+        await prepare_scrape_jobs(journal=journal, out_file=out_file, **{k: v for k, v in kwargs.items() if k != "num_workers"})
+        journal.commit(1, 0)
+        journal.close()
+        calls = req.calls
+
+        plan = await plan_scrape(journal=JobJournal(f"{out_file}.journal"), **kwargs)
+        assert req.calls == calls
+        assert plan.stages[0].requests == 3
+
+
+@pytest.mark.asyncio
+async def test_main_rejects_snapshot_to_stdout():
+    with pytest.raises(ValueError, match="stdout"):
+        await main("-", None, HSAccountTypes.main, HSType.overall, 1, -1, 1,
+                   output_format=CategoryOutputFormat.snapshot)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+
+import pytest
+
+from osrs_hiscore_scrape.cli.presets import _parse_key_value_pairs
+from osrs_hiscore_scrape.exception.records import NotFound
+from osrs_hiscore_scrape.job.checkpoint import JobJournal
+from osrs_hiscore_scrape.job.job_builder import build_hs_page_job
+from osrs_hiscore_scrape.request.dto import (GetMaxHighscorePageRequest,
+                                             GetMaxHighscorePageResult)
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryRecord
+from osrs_hiscore_scrape.request.request import RequestStats
+from scripts import filter_category
+from scripts.filter_category import (estimate_filter, journal_params,
+                                     plan_filter)
+
+CANDIDATES = 10_000
+
+
+class _FakeStat:
+    def __init__(self, value: int):
+        self.value = value
+
+    def get_value(self) -> int:
+        return self.value
+
+
+class _FakeRecord:
+    """ Player whose zulrah kc is their rank modulo 100 and attack their rank modulo 10. """
+
+    def __init__(self, rank: int):
+        self.stats = {HSType.zulrah: rank % 100, HSType.attack: rank % 10}
+
+    def get_stat(self, hs_type: HSType) -> _FakeStat:
+        return _FakeStat(self.stats[hs_type])
+
+    def meets_requirements(self, requirements) -> bool:
+        return all(entry.predicate(self.stats[entry.hstype]) for entry in requirements)
+
+
+class _FakeRequests:
+    def __init__(self):
+        self.lookups = 0
+        self.proxy_list = None
+        self.stats = RequestStats()
+
+    async def get_hs_page(self, page_req):
+        first = (page_req.page_num - 1) * 25 + 1
+        return [CategoryRecord(rank=rank, score=0, username=f"test{rank}") for rank in range(first, first + 25)]
+
+    async def get_user_stats(self, player_req):
+        self.lookups += 1
+        rank = int(player_req.username[4:])
+        if rank % 50 == 0:
+            raise NotFound("Not found")
+        return _FakeRecord(rank)
+
+
+@pytest.fixture
+def whole_category(monkeypatch):
+    async def discover(req, start_rank, end_rank, account_type, hs_type, hs_filter):
+        return build_hs_page_job(start_rank=1, end_rank=-1,
+                                 max_page_res=GetMaxHighscorePageResult(
+                                     page_nr=CANDIDATES // 25, rank_nr=CANDIDATES),
+                                 max_page_req=GetMaxHighscorePageRequest(hs_type=hs_type, account_type=account_type))
+    monkeypatch.setattr(filter_category, "discover_scrape_jobs", discover)
+
+
+def _estimate(req, hs_filter, skip_fn=None):
+    return asyncio.run(estimate_filter(req=req, start_rank=1, end_rank=-1, account_type=HSAccountTypes.main,  # type: ignore
+                                       hs_type=HSType.overall, hs_filter=hs_filter, sample_size=400, num_workers=8,
+                                       skip_fn=skip_fn, seed=1))
+
+
+def test_estimate_filter(whole_category):
+    req = _FakeRequests()
+    report = _estimate(req, _parse_key_value_pairs("zulrah>=50,attack<5"))
+
+    assert report["candidates"] == CANDIDATES and report["pages"] == CANDIDATES // 25
+    assert report["sampled"] == req.lookups == 400
+    # half of the players pass each entry and both together a quarter, minus the ones that aren't found
+    matches = report["matches"]
+    assert matches["low"] <= CANDIDATES * 0.245 <= matches["high"]
+    assert matches["high"] - matches["low"] < CANDIDATES * 0.2
+    for entry in report["entries"]:
+        assert entry["selectivity"]["low"] <= 0.5 <= entry["selectivity"]["high"]
+    assert report["lookups"] == CANDIDATES
+    assert report["eta_seconds"] >= 0 and report["throughput"]["lookups_per_second"]
+
+
+def test_estimate_filter_counts_skipped_as_not_matching(whole_category):
+    req = _FakeRequests()
+    report = _estimate(req, _parse_key_value_pairs(
+        "zulrah>=0"), skip_fn=lambda req, job: job.priority % 2 == 0)
+
+    assert req.lookups < 400
+    assert report["lookups"] == pytest.approx(CANDIDATES / 2, rel=0.2)
+    assert report["selectivity"]["low"] <= 0.49 <= report["selectivity"]["high"]
+    # entries are estimated over every candidate as well, skipped ones don't meet them
+    selectivity = report["entries"][0]["selectivity"]
+    assert selectivity["low"] <= 0.49 <= selectivity["high"]
+    assert selectivity["estimate"] == report["selectivity"]["estimate"]
+
+
+def test_plan_filter_resumes_the_discovered_range(whole_category, monkeypatch, tmp_path):
+    hs_filter = _parse_key_value_pairs("zulrah>=50")
+    kwargs = dict(req=_FakeRequests(), in_file=None, start_rank=1, end_rank=-1, account_type=HSAccountTypes.main,
+                  hs_type=HSType.overall, hs_filter=hs_filter, num_workers=8)
+    journal_file = os.path.join(tmp_path, "out.txt.journal")
+
+    plan = asyncio.run(plan_filter(journal=JobJournal(
+        journal_file), **kwargs))  # type: ignore
+    assert [(stage.name, stage.requests) for stage in plan.stages] == [
+        ("pages", CANDIDATES // 25), ("lookups", CANDIDATES)]
+
+    journal = JobJournal(journal_file)
+    journal.start(journal_params(None, 1, -1, HSAccountTypes.main, HSType.overall, hs_filter),  # type: ignore
+                  {"start_rank": 1, "end_rank": CANDIDATES, "end_page": CANDIDATES // 25}, offset=0)
+    for rank in range(1, 31):
+        journal.commit(rank, 0)
+    journal.close()
+
+    async def discover(*args, **kwargs):
+        raise AssertionError("the range should come from the journal")
+    monkeypatch.setattr(filter_category, "discover_scrape_jobs", discover)
+
+    plan = asyncio.run(plan_filter(journal=JobJournal(
+        journal_file), **kwargs))  # type: ignore
+    assert [stage.requests for stage in plan.stages] == [
+        CANDIDATES // 25 - 1, CANDIDATES - 30]
+
+
+def test_journal_params_differ_by_filter_threshold(tmp_path):
+    def params(hs_filter: str):
+        return journal_params(None, 1, -1, HSAccountTypes.main, HSType.overall,  # type: ignore
+                              _parse_key_value_pairs(hs_filter))
+
+    journal_file = os.path.join(tmp_path, "out.txt.journal")
+    journal = JobJournal(journal_file)
+    journal.start(params("zulrah>=100"), {
+                  "start_rank": 1, "end_rank": 10, "end_page": 1}, offset=0)
+    journal.close()
+
+    assert JobJournal(journal_file).peek(params("zulrah>=100")) is not None
+    assert JobJournal(journal_file).peek(params("zulrah>=500")) is None
+    assert JobJournal(journal_file).peek(params("zulrah<100")) is None
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from osrs_hiscore_scrape.cli.presets import _parse_key_value_pairs
+from osrs_hiscore_scrape.request.hs_account_types import HSAccountTypes
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import PlayerRecord
+from osrs_hiscore_scrape.util.player_store import PlayerStore
+from scripts.query_store import main
+
+
+@pytest.fixture
+def sample_player_record() -> PlayerRecord:
+    csv = ["1,50,101333" if hs_type.is_skill(
+    ) else "1,50" for hs_type in HSType.get_csv_types()]
+    return PlayerRecord("TestUser", csv, datetime(2023, 1, 1, tzinfo=timezone.utc))
+
+
+def test_main_writes_filter_category_lines(tmp_path, sample_player_record):
+    store_file, out_file = str(
+        tmp_path / "players.db"), str(tmp_path / "out.txt")
+    with PlayerStore(store_file) as store:
+        store.put(HSAccountTypes.main, sample_player_record)
+
+    count = main(store_file, out_file, None, HSAccountTypes.main, HSType.overall,
+                 _parse_key_value_pairs("attack>=1"), fields=[HSType.attack])
+
+    assert count == 1
+    with open(out_file) as f:
+        line = json.loads(f.readline())
+    assert line["rank"] == 1
+    assert line["record"]["username"] == sample_player_record.username
+    assert set(line["record"]) == {"username", "timestamp", "skills"}
+
+
+def test_main_imports_in_file(tmp_path, sample_player_record):
+    store_file, in_file, out_file = (
+        str(tmp_path / name) for name in ("players.db", "in.txt", "out.txt"))
+    with open(in_file, "w") as f:
+        f.write(json.dumps(
+            {"rank": 0, "record": sample_player_record.to_dict()}) + "\n")
+
+    assert main(store_file, out_file, in_file, HSAccountTypes.main, HSType.overall,
+                _parse_key_value_pairs("attack<0")) == 0
+    with PlayerStore(store_file) as store:
+        assert len(store) == 1
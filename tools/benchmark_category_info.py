@@ -0,0 +1,81 @@
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+
+from osrs_hiscore_scrape.request.records import (BaseCategoryInfo,
+                                                 CategoryInfoMode,
+                                                 CategoryRecord)
+
+DEFAULT_SIZES = [100_000, 1_000_000, 2_000_000]
+
+
+def build_records(size: int, seed: int = 0) -> list[CategoryRecord]:
+    """ Creates rank ordered records with a long tailed score distribution. """
+    rng = random.Random(seed)
+    scores = sorted((int(rng.paretovariate(1.2) * 1_000)
+                    for _ in range(size)), reverse=True)
+    return [CategoryRecord(rank=rank, score=score, username=f"user{rank}")
+            for rank, score in enumerate(scores, start=1)]
+
+
+def create(mode: CategoryInfoMode, size: int) -> BaseCategoryInfo:
+    options = {"expected_count": size} if mode is CategoryInfoMode.ranked else {}
+    return mode.create(name="benchmark", ts=datetime.datetime.now(datetime.timezone.utc), **options)
+
+
+def run(mode: CategoryInfoMode, records: list[CategoryRecord], trace_memory: bool) -> tuple[float, float, float | None]:
+    """
+    Returns add time, summary time (seconds) and peak traced memory (MB) in that order.
+    Tracing memory slows down the timings considerably, so it's opt-in.
+    """
+    if trace_memory:
+        tracemalloc.start()
+
+    category_info = create(mode, len(records))
+
+    start = time.perf_counter()
+    for record in records:
+        category_info.add(record)
+    added = time.perf_counter()
+    category_info.to_dict()
+    summarized = time.perf_counter()
+
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = peak / (1024 ** 2)
+
+    return (added - start, summarized - added, peak)
+
+
+def main(sizes: list[int], modes: list[CategoryInfoMode], trace_memory: bool):
+    print(f"{'size':>10} {'mode':>10} {'add (s)':>10} {'summary (s)':>12} {'peak (MB)':>10}")
+    for size in sizes:
+        records = build_records(size)
+        for mode in modes:
+            try:
+                add_time, summary_time, peak = run(
+                    mode, records, trace_memory)
+            except ImportError as e:
+                print(f"{size:>10} {mode.name:>10} skipped: {e}")
+                continue
+            peak_str = f"{peak:.1f}" if peak is not None else "-"
+            print(
+                f"{size:>10} {mode.name:>10} {add_time:>10.3f} {summary_time:>12.3f} {peak_str:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CategoryInfo statistics modes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Record counts to benchmark")
+    parser.add_argument("--modes", type=CategoryInfoMode.from_string, nargs="+",
+                        default=list(CategoryInfoMode), help="Statistics modes to benchmark")
+    parser.add_argument("--memory", action="store_true",
+                        help="Trace peak memory, slows down the timings")
+    args = parser.parse_args()
+
+    main(args.sizes, args.modes, args.memory)
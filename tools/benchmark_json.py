@@ -0,0 +1,75 @@
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from osrs_hiscore_scrape.request.hs_types import HSType
+from osrs_hiscore_scrape.request.records import CategoryRecord, PlayerRecord
+from osrs_hiscore_scrape.util import json_wrapper
+from osrs_hiscore_scrape.util.io import (ENCODING, read_category_records,
+                                         read_player_records)
+
+DEFAULT_LINES = 1_000_000
+
+
+def build_category_records(lines: int) -> list[CategoryRecord]:
+    return [CategoryRecord(rank=rank, score=10_000_000 - rank, username=f"user {rank}") for rank in range(1, lines + 1)]
+
+
+def build_player_records(lines: int) -> list[PlayerRecord]:
+    csv = [
+        f"{i},{i % 99 + 1},{i * 1000}" for i in range(len(HSType.get_csv_types()))]
+    ts = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    return [PlayerRecord(username=f"user {i}", csv=csv, ts=ts) for i in range(lines)]
+
+
+def legacy_format(record: CategoryRecord | PlayerRecord) -> str:
+    """ The previous serialization, stdlib encoder with the `default()` hook class. """
+    return json_wrapper.to_json(record.to_dict(), separators=(',', ':'))
+
+
+def run(records: list, reader, format) -> tuple[float, float]:
+    """ Returns the write and read time (seconds) of the records in that order. """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "records.txt")
+
+        start = time.perf_counter()
+        with open(file_path, "w", encoding=ENCODING) as f:
+            f.writelines(format(record) + "\n" for record in records)
+        written = time.perf_counter()
+        for _ in reader(file_path):
+            pass
+        read = time.perf_counter()
+
+    return (written - start, read - written)
+
+
+def main(lines: int, player_lines: int):
+    datasets = [("category", build_category_records(lines), read_category_records),
+                ("player", build_player_records(player_lines), read_player_records)]
+
+    print(f"{'records':>10} {'lines':>10} {'backend':>10} {'write (s)':>10} {'read (s)':>10}")
+    for name, records, reader in datasets:
+        json_wrapper.use_backend("json")
+        write_time, read_time = run(records, reader, legacy_format)
+        print(
+            f"{name:>10} {len(records):>10} {'legacy':>10} {write_time:>10.3f} {read_time:>10.3f}")
+
+        for backend in json_wrapper.available_backends():
+            json_wrapper.use_backend(backend)
+            write_time, read_time = run(records, reader, str)
+            print(
+                f"{name:>10} {len(records):>10} {backend:>10} {write_time:>10.3f} {read_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the JSON backends on record output files")
+    parser.add_argument("--lines", type=int, default=DEFAULT_LINES,
+                        help="Number of category record lines")
+    parser.add_argument("--player-lines", type=int, default=DEFAULT_LINES // 10,
+                        help="Number of player record lines")
+    args = parser.parse_args()
+
+    main(args.lines, args.player_lines)